@@ -107,14 +107,13 @@ def dashboard():
     if session.get('is_admin'):
         return redirect(url_for('api.admin_dashboard'))
 
-    from backend.models import Plant, User as UserModel, Product as ProductModel
+    from backend import fragments
+    from backend.models import User as UserModel
     username = session.get('username')
     user_id = session.get('user_id')
-    # Get available plants and user's garden
-    plants = Plant.get_all()
+    # Plant catalog and marketplace HTML, cached per catalog version
+    catalog = fragments.dashboard_catalog()
     garden = UserModel.get_garden(user_id)
-    # Get marketplace products
-    products = ProductModel.get_all()
 
     # Profile info
     profile = UserModel.get_by_username(username)
@@ -130,38 +129,29 @@ def dashboard():
         # For each garden item with a schedule, compute current day and create notifications for incomplete tasks
         for it in garden:
             sched_id = it.get('schedule_id')
-            if not sched_id:
+            # Progress counters tell us when nothing is left for today
+            if not sched_id or not (it.get('progress') or {}).get('due_today'):
                 continue
             sched = Schedule.get_by_id(sched_id)
             if not sched:
                 continue
             # compute current day based on schedule.created_at
-            try:
-                from datetime import datetime, timezone
-                created = sched.created_at
-                if isinstance(created, str):
-                    created_dt = datetime.fromisoformat(created)
-                else:
-                    created_dt = created
-                now = datetime.now(tz=created_dt.tzinfo) if created_dt.tzinfo else datetime.now()
-                start_date = created_dt.date()
-                diff = (now.date() - start_date).days
-                current_day = diff + 1 if diff >= 0 else 1
-            except Exception:
-                current_day = 1
+            current_day = sched.current_day()
             # fetch incomplete tasks for current_day
-            rows = ScheduleTask.get_for_schedule(sched.id)
+            rows = ScheduleTask.get_for_day(sched.id, current_day)
             for r in rows:
-                if r.get('day') == current_day and not r.get('completed'):
+                if not r.get('completed'):
                     task_text = r.get('task_text')
                     # avoid duplicate notifications for same task
                     if not Notification.exists(user_id, sched.id, current_day, task_text):
                         url = url_for('api.garden_schedule_view', schedule_id=sched.id) + f"#day-{current_day}"
                         Notification.create(user_id, task_text, schedule_id=sched.id, day=current_day, url=url)
                         notifications.insert(0, {'message': task_text, 'url': url})
+        unread_count = Notification.unread_count(user_id)
     except Exception as e:
         print(f"Warning generating due notifications: {e}")
         notifications = notifications if 'notifications' in locals() else []
+        unread_count = 0
 
     # fallback simple messages
     garden_count = len(garden) if garden else 0
@@ -172,7 +162,7 @@ def dashboard():
     if not notifications:
         notifications.append({'message': f'You have {garden_count} plants in your garden'})
 
-    return render_template('dashboard.html', username=username, plants=plants, garden=garden, products=products, profile=profile, notifications=notifications)
+    return render_template('dashboard.html', username=username, catalog=catalog, garden=garden, profile=profile, notifications=notifications, unread_count=unread_count)
 
 
 # AI Assistant (global) page and chat endpoints using Perplexity API
@@ -200,7 +190,8 @@ def ai_chat_get():
 @api_bp.route('/api/ai/chat', methods=['POST'])
 @login_required
 def ai_chat_post():
-    import os, requests, json
+    import requests
+    from backend import ai, ai_ledger, memory
     user_id = session.get('user_id')
     data = request.get_json(silent=True) or {}
     user_msg = (data.get('message') or '').strip()
@@ -209,8 +200,10 @@ def ai_chat_post():
 
     from database.connection import get_db_cursor, close_db
     conn, cur = get_db_cursor()
+    user_msg_id = None
     try:
-        cur.execute('INSERT INTO general_chats (user_id, role, message) VALUES (%s, %s, %s)', (user_id, 'user', user_msg))
+        cur.execute('INSERT INTO general_chats (user_id, role, message) VALUES (%s, %s, %s) RETURNING id', (user_id, 'user', user_msg))
+        user_msg_id = cur.fetchone()['id']
         conn.commit()
     except Exception as e:
         conn.rollback()
@@ -221,14 +214,15 @@ def ai_chat_post():
     gemini_key = _get_env('GEMINI_API_KEY')
     if not gemini_key:
         return jsonify({'assistant': 'AI is not configured. Set GEMINI_API_KEY to enable the assistant.'})
+    model = _get_env('GEMINI_MODEL') or ai.DEFAULT_MODEL
 
     # Build context from user's garden
     context_msg = None
+    names = []
     try:
         from backend.models import User as UserModel
         garden = UserModel.get_garden(user_id) or []
         if garden:
-            names = []
             for it in garden:
                 p = it.get('plant') or {}
                 nm = p.get('name') or ''
@@ -239,19 +233,18 @@ def ai_chat_post():
     except Exception:
         context_msg = None
 
-    # Fetch last 12 messages for lightweight history
-    conn, cur = get_db_cursor()
-    history = []
-    try:
-        cur.execute('SELECT role, message FROM general_chats WHERE user_id = %s ORDER BY id DESC LIMIT 12', (user_id,))
-        rows = cur.fetchall() or []
-        history = list(reversed(rows))
-    except Exception as e:
-        print(f"Error fetching general history: {e}")
-    finally:
-        close_db(conn, cur)
+    # Generic questions with the same garden context share one cached answer.
+    # Clients can opt out per message with {"cache": false}.
+    cache_key = None
+    if data.get('cache', True) is not False and ai.is_cacheable_question(user_msg):
+        cache_key = ai.response_cache_key(user_msg, names, model)
+        cached = ai.response_cache.get(cache_key)
+        if cached is not None:
+            ai_ledger.record('chat', model, cache_hit=True)
+            _save_general_chat(user_id, 'assistant', cached)
+            memory.schedule_refresh(user_id, gemini_key, model=model)
+            return jsonify({'assistant': cached, 'cached': True})
 
-    chat_context = "\n".join([f"{m['role']}: {m['message']}" for m in history])
     preface = (
         "You are a friendly gardening assistant. Be concise and practical. "
         "If the user has plants, tailor advice to them when relevant."
@@ -259,33 +252,27 @@ def ai_chat_post():
     if context_msg:
         preface += "\n" + context_msg
 
-    prompt = (
-        f"{preface}\n\n"
-        f"Conversation so far:\n{chat_context}\n\n"
-        f"User: {user_msg}\nAssistant:"
-    )
+    if cache_key:
+        # Shared answers are built only from what the cache key covers: no summary or history
+        prompt = f"{preface}\n\nUser: {user_msg}\nAssistant:"
+    else:
+        # Rolling summary of older conversation + the last few raw turns
+        summary, history = memory.get_prompt_context(user_id, before_id=user_msg_id)
+        chat_context = "\n".join([f"{m['role']}: {m['message']}" for m in history])
+        if summary:
+            preface += "\nSummary of earlier conversation: " + summary
+        prompt = (
+            f"{preface}\n\n"
+            f"Conversation so far:\n{chat_context}\n\n"
+            f"User: {user_msg}\nAssistant:"
+        )
 
     ai_text = ''
     try:
-        model = _get_env('GEMINI_MODEL') or 'gemini-2.0-flash'
-        url = f"https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent"
-        headers = {'Content-Type': 'application/json', 'X-goog-api-key': gemini_key}
-        payload = {'contents': [{'parts': [{'text': prompt}]}]}
-        resp = requests.post(url, headers=headers, json=payload, timeout=60)
-        resp.raise_for_status()
-        result = resp.json()
-        def find_first_text(obj):
-            if isinstance(obj, str): return obj
-            if isinstance(obj, dict):
-                for v in obj.values():
-                    r = find_first_text(v)
-                    if r: return r
-            if isinstance(obj, list):
-                for it in obj:
-                    r = find_first_text(it)
-                    if r: return r
-            return None
-        ai_text = find_first_text(result) or ''
+        ai_text = ai.generate_text(gemini_key, prompt, model=model, timeout=60, feature='chat',
+                                   cache_hit=False if cache_key else None)
+        if cache_key and ai_text:
+            ai.response_cache.set(cache_key, ai_text)
     except requests.HTTPError as e:
         body = ''
         try:
@@ -298,17 +285,44 @@ def ai_chat_post():
         print(f"Gemini chat error: {e}")
         ai_text = "Sorry, I couldn't generate a response right now."
 
+    _save_general_chat(user_id, 'assistant', ai_text)
+
+    # Fold older turns into the rolling summary off the request path
+    memory.schedule_refresh(user_id, gemini_key, model=model)
+
+    return jsonify({'assistant': ai_text})
+
+def _save_general_chat(user_id, role, message):
+    from database.connection import get_db_cursor, close_db
     conn, cur = get_db_cursor()
     try:
-        cur.execute('INSERT INTO general_chats (user_id, role, message) VALUES (%s, %s, %s)', (user_id, 'assistant', ai_text))
+        cur.execute('INSERT INTO general_chats (user_id, role, message) VALUES (%s, %s, %s)', (user_id, role, message))
         conn.commit()
     except Exception as e:
         conn.rollback()
-        print(f"Error saving general assistant chat: {e}")
+        print(f"Error saving general {role} chat: {e}")
     finally:
         close_db(conn, cur)
 
-    return jsonify({'assistant': ai_text})
+# Gemini usage per feature from the ai_calls ledger
+@api_bp.route('/admin/ai-usage')
+@admin_required
+def admin_ai_usage():
+    from backend import ai, ai_ledger
+    from backend.models import AICall
+    from config import Config
+    days = max(1, min(request.args.get('days', 7, type=int) or 7, 365))
+    rows = AICall.usage_by_feature(days, Config.AI_PRICE_INPUT_PER_MTOK, Config.AI_PRICE_OUTPUT_PER_MTOK)
+    if request.accept_mimetypes.best == 'application/json':
+        return jsonify({'days': days, 'features': rows, 'dropped': ai_ledger.ledger.dropped,
+                        'cache': ai.response_cache.stats()})
+    return render_template('admin_ai_usage.html', rows=rows, days=days, dropped=ai_ledger.ledger.dropped)
+
+@api_bp.route('/api/ai/cache/stats')
+@admin_required
+def ai_cache_stats():
+    from backend import ai
+    return jsonify(ai.response_cache.stats())
 
 # Toggle a schedule task (mark completed/uncompleted)
 @api_bp.route('/garden/schedule/task/toggle', methods=['POST'])
@@ -339,6 +353,60 @@ def garden_schedule_task_toggle():
         return jsonify({'error': 'Server error'}), 500
 
 
+# Apply several task changes (or complete a whole day) with one summary notification
+@api_bp.route('/garden/schedule/<int:schedule_id>/tasks/batch', methods=['POST'])
+@login_required
+def garden_schedule_tasks_batch(schedule_id):
+    user_id = session.get('user_id')
+    data = request.get_json(silent=True) or {}
+    try:
+        changes = [
+            (int(c['day']), int(c['task_index']), str(c.get('completed')).lower() in ('1', 'true', 'yes'))
+            for c in (data.get('changes') or [])
+        ]
+        complete_day = int(data['complete_day']) if data.get('complete_day') is not None else None
+    except Exception:
+        return jsonify({'error': 'Invalid parameters'}), 400
+    if not changes and complete_day is None:
+        return jsonify({'error': 'No changes'}), 400
+    if len(changes) > 500:
+        return jsonify({'error': 'Too many changes'}), 400
+
+    from backend.models import ScheduleTask
+    res = ScheduleTask.apply_batch(user_id, schedule_id, changes=changes, complete_day=complete_day)
+    if isinstance(res, tuple):
+        body, code = res
+        return jsonify(body), code
+    return jsonify(res)
+
+# Server-sent events: new notifications for the current user as they are inserted
+@api_bp.route('/api/notifications/stream')
+@login_required
+def notifications_stream():
+    import json
+    import queue
+    from flask import Response, stream_with_context
+    from backend.notify import hub
+    user_id = session.get('user_id')
+
+    def events():
+        q = hub.subscribe(user_id)
+        try:
+            yield 'retry: 5000\n\n'
+            while True:
+                try:
+                    payload = q.get(timeout=25)
+                except queue.Empty:
+                    # Comment line keeps proxies from closing an idle stream
+                    yield ': keepalive\n\n'
+                    continue
+                yield f"id: {payload.get('id')}\nevent: notification\ndata: {json.dumps(payload)}\n\n"
+        finally:
+            hub.unsubscribe(user_id, q)
+
+    headers = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    return Response(stream_with_context(events()), mimetype='text/event-stream', headers=headers)
+
 # Clear all notifications for the current user
 @api_bp.route('/notifications/clear', methods=['POST'])
 @login_required
@@ -449,8 +517,21 @@ def logout():
 @api_bp.route('/admin')
 @admin_required
 def admin_dashboard():
-    users = User.get_all()
-    return render_template('admin.html', users=users)
+    q = (request.args.get('q') or '').strip()
+    role = request.args.get('role') or None
+    if role not in (None, 'user', 'sub_admin', 'market_sub_admin'):
+        role = None
+    after_id = request.args.get('after', type=int)
+    before_id = request.args.get('before', type=int)
+    users, more = User.search(q=q, role=role, after_id=after_id, before_id=before_id, limit=50)
+    backward = before_id is not None and after_id is None
+    page = {'q': q, 'role': role or '', 'next_after': None, 'prev_before': None}
+    if users:
+        if more or backward:
+            page['next_after'] = users[-1].id
+        if (more and backward) or (after_id is not None and not backward):
+            page['prev_before'] = users[0].id
+    return render_template('admin.html', users=users, page=page)
 
 # Marketplace admin routes
 @api_bp.route('/admin/market')
@@ -654,6 +735,69 @@ def get_garden_item_api(garden_id):
         return jsonify({'error': 'Garden item not found'}), 404
     return jsonify(item)
 
+# Garden items due for watering today (and overdue ones)
+@api_bp.route('/api/garden/watering/due')
+@login_required
+def garden_watering_due():
+    from backend.models import User as UserModel
+    rows = UserModel.get_watering_due(session.get('user_id'))
+    return jsonify([
+        {
+            'garden_id': r['garden_id'],
+            'name': r['name'],
+            'next_watering_due': r['next_watering_due'].isoformat() if r['next_watering_due'] else None,
+            'overdue_days': r['overdue_days'],
+            'url': url_for('api.garden_edit', garden_id=r['garden_id'])
+        }
+        for r in rows
+    ])
+
+# Tasks across all current schedules by date; ?format=ics streams an iCalendar file
+@api_bp.route('/api/garden/calendar')
+@login_required
+def garden_calendar():
+    from datetime import date, timedelta
+    from flask import Response, stream_with_context
+    from backend.models import Schedule
+    from backend import ical
+    user_id = session.get('user_id')
+    try:
+        start = date.fromisoformat(request.args['from']) if request.args.get('from') else date.today()
+        end = date.fromisoformat(request.args['to']) if request.args.get('to') else start + timedelta(days=6)
+    except ValueError:
+        return jsonify({'error': 'from and to must be dates (YYYY-MM-DD)'}), 400
+    if end < start:
+        return jsonify({'error': 'to must not be before from'}), 400
+    if (end - start).days > 366:
+        return jsonify({'error': 'Date range is limited to one year'}), 400
+
+    rows = Schedule.iter_calendar(user_id, start, end)
+    if (request.args.get('format') or '').lower() == 'ics':
+        headers = {'Content-Disposition': f'attachment; filename="garden-{start.isoformat()}-{end.isoformat()}.ics"'}
+        return Response(stream_with_context(ical.calendar_lines(rows, host=request.host)),
+                        mimetype='text/calendar', headers=headers)
+
+    days = []
+    try:
+        for r in rows:
+            key = r['date'].isoformat()
+            if not days or days[-1]['date'] != key:
+                days.append({'date': key, 'tasks': []})
+            days[-1]['tasks'].append({
+                'garden_id': r['garden_id'],
+                'plant_name': r['plant_name'],
+                'schedule_id': r['schedule_id'],
+                'day': r['day'],
+                'task_index': r['task_index'],
+                'task_text': r['task_text'],
+                'completed': bool(r['completed']),
+                'url': url_for('api.garden_schedule_view', schedule_id=r['schedule_id']) + f"#day-{r['day']}"
+            })
+    except Exception as e:
+        print(f"Error building garden calendar: {e}")
+        return jsonify({'error': 'Failed to load calendar'}), 500
+    return jsonify({'from': start.isoformat(), 'to': end.isoformat(), 'days': days})
+
 # AI Chat endpoints for schedule-specific assistant
 @api_bp.route('/api/schedule/<int:schedule_id>/chat', methods=['GET'])
 @login_required
@@ -677,9 +821,10 @@ def schedule_chat_get(schedule_id):
 @api_bp.route('/api/schedule/<int:schedule_id>/chat', methods=['POST'])
 @login_required
 def schedule_chat_post(schedule_id):
+    from backend import ai
     from backend.models import Schedule
     from database.connection import get_db_cursor, close_db
-    import os, requests, json
+    import os, json
     sched = Schedule.get_by_id(schedule_id)
     if not sched or sched.user_id != session.get('user_id'):
         return jsonify({'error': 'Not authorized'}), 403
@@ -725,7 +870,9 @@ def schedule_chat_post(schedule_id):
     finally:
         close_db(conn, cur)
 
-    schedule_json = sched.schedule_json or '[]'
+    # Only the days around today are relevant to the conversation
+    current_day = sched.current_day()
+    schedule_json = Schedule.get_days_json(schedule_id, max(1, current_day - 7), current_day + 21)
     try:
         plant_json = json.dumps(plant, default=str) if plant else '{}'
         item_json = json.dumps(item, default=str) if item else '{}'
@@ -745,25 +892,8 @@ def schedule_chat_post(schedule_id):
     )
 
     try:
-        model = os.getenv('GEMINI_MODEL') or 'gemini-2.0-flash'
-        url = f"https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent"
-        headers = {'Content-Type': 'application/json', 'X-goog-api-key': gemini_key}
-        payload = {'contents': [{'parts': [{'text': prompt}]}]}
-        resp = requests.post(url, headers=headers, json=payload, timeout=60)
-        resp.raise_for_status()
-        result = resp.json()
-        def find_first_text(obj):
-            if isinstance(obj, str): return obj
-            if isinstance(obj, dict):
-                for v in obj.values():
-                    r = find_first_text(v)
-                    if r: return r
-            if isinstance(obj, list):
-                for it in obj:
-                    r = find_first_text(it)
-                    if r: return r
-            return None
-        ai_text = find_first_text(result) or ''
+        model = os.getenv('GEMINI_MODEL') or ai.DEFAULT_MODEL
+        ai_text = ai.generate_text(gemini_key, prompt, model=model, timeout=60, feature='schedule_chat')
     except Exception as e:
         print(f"Gemini chat error: {e}")
         ai_text = "Sorry, I couldn't generate a response right now."
@@ -783,9 +913,10 @@ def schedule_chat_post(schedule_id):
 @api_bp.route('/api/schedule/<int:schedule_id>/chat/upload', methods=['POST'])
 @login_required
 def schedule_chat_upload(schedule_id):
+    from backend import ai
     from backend.models import Schedule
     from database.connection import get_db_cursor, close_db
-    import os, time, base64, mimetypes, json, requests
+    import os, time, base64, mimetypes, json
     sched = Schedule.get_by_id(schedule_id)
     if not sched or sched.user_id != session.get('user_id'):
         return jsonify({'error': 'Not authorized'}), 403
@@ -838,7 +969,8 @@ def schedule_chat_upload(schedule_id):
     except Exception:
         plant = None
 
-    schedule_json = sched.schedule_json or '[]'
+    current_day = sched.current_day()
+    schedule_json = Schedule.get_days_json(schedule_id, max(1, current_day - 7), current_day + 21)
     plant_json = json.dumps(plant, default=str) if plant else '{}'
     item_json = json.dumps(item, default=str) if item else '{}'
 
@@ -852,36 +984,13 @@ def schedule_chat_upload(schedule_id):
     prompt = f"PLANT_JSON: {plant_json}\nITEM_JSON: {item_json}\nSCHEDULE_JSON: {schedule_json}\n\nAnalyze this image."  # context before image
 
     try:
-        model = os.getenv('GEMINI_MODEL') or 'gemini-2.0-flash'
-        url = f"https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent"
-        headers = {'Content-Type': 'application/json', 'X-goog-api-key': gemini_key}
-        payload = {
-            'contents': [
-                {
-                    'parts': [
-                        {'text': guidance},
-                        {'text': prompt},
-                        {'inline_data': {'mime_type': mime, 'data': b64}}
-                    ]
-                }
-            ]
-        }
-        resp = requests.post(url, headers=headers, json=payload, timeout=90)
-        resp.raise_for_status()
-        result = resp.json()
-        # extract first text
-        def find_first_text(obj):
-            if isinstance(obj, str): return obj
-            if isinstance(obj, dict):
-                for v in obj.values():
-                    r = find_first_text(v)
-                    if r: return r
-            if isinstance(obj, list):
-                for it in obj:
-                    r = find_first_text(it)
-                    if r: return r
-            return None
-        ai_text = find_first_text(result) or ''
+        model = os.getenv('GEMINI_MODEL') or ai.DEFAULT_MODEL
+        parts = [
+            {'text': guidance},
+            {'text': prompt},
+            {'inline_data': {'mime_type': mime, 'data': b64}}
+        ]
+        ai_text = ai.generate_parts(gemini_key, parts, model=model, timeout=90, feature='schedule_vision')
     except Exception as e:
         print(f"Gemini vision error: {e}")
         ai_text = "I couldn't analyze the image right now. Please try again."
@@ -907,6 +1016,8 @@ def garden_schedule_create(garden_id):
         flash('Admins cannot create schedules')
         return redirect(url_for('api.admin_dashboard'))
     from backend.models import User as UserModel, Schedule
+    from backend import ai, schedule_gen
+    import json
     user_id = session.get('user_id')
     items = UserModel.get_garden(user_id)
     item = next((i for i in items if i['garden_id'] == garden_id), None)
@@ -914,243 +1025,31 @@ def garden_schedule_create(garden_id):
         flash('Garden item not found')
         return redirect(url_for('api.my_garden'))
 
-    # Prepare prompt for AI using plant and user item info
+    # The AI receives the full plant and user item info
     plant = item['plant']
     duration = plant.get('duration_days') or 30
     # Read selected plant stage from form (optional)
     stage = (request.form.get('stage') or '').strip().lower()
-    allowed_stages = {'seed','seedling','vegetative','flowering','fruiting','mature'}
-    stage = stage if stage in allowed_stages else 'seed'
-    # Include full plant and user-garden item data (JSON) in the prompt so Gemini has all context
-    try:
-        plant_json = json.dumps(plant, default=str)
-    except Exception:
-        plant_json = '{}'
-    try:
-        item_json = json.dumps(item, default=str)
-    except Exception:
-        item_json = '{}'
-
-    prompt = (
-        f"You are a helpful assistant that creates detailed, practical, day-by-day care schedules for plants. "
-        f"Important constraints: Use ONLY the plant data (PLANT_JSON) and the user's garden item data (ITEM_JSON) provided below. Do NOT use any outside knowledge, web searches, or assumptions about plant varieties beyond what is in the JSON. If a field is missing, assume safe, minimal care actions. Do NOT include any explanations, guidance, or metadata — return ONLY the JSON array output described below.\n\n"
-        f"User-selected current plant stage: {stage}.\n"
-        f"Stage requirements: If stage is 'seed', Day 1 must include a task that clearly indicates 'Seeding' and appropriate initial watering. If 'seedling', start with seedling/transplant care. If 'vegetative', focus on growth maintenance. If 'flowering' or 'fruiting', include tasks relevant to those stages (e.g., support, pruning, harvesting readiness checks). Avoid tasks that are inappropriate for the selected stage.\n\n"
-        f"Output format (must be followed exactly): Return a JSON array with {duration} objects. Each object must be: {{\"day\": <number starting at 1>, \"tasks\": [<string>, ...]}}. Days must be sequential starting at 1 and there must be exactly {duration} entries. Tasks should be concise action items (e.g., \"water 200ml\", \"check soil moisture\", \"fertilize once\"). Do not include any fields other than 'day' and 'tasks'.\n\n"
-        f"Context (use only these):\nPLANT_JSON: {plant_json}\n\nITEM_JSON: {item_json}\n\n"
-        f"Tailor tasks to the plant and item fields (for example: watering_interval_days, duration_days, type, quantity, planted_on) and the selected stage. Do not reference other plants or external sources.\n\n"
-        f"Begin output now — ONLY the JSON array and nothing else."
-    )
+    stage = stage if stage in schedule_gen.ALLOWED_STAGES else 'seed'
+    # 'ai' (Gemini, falling back to rules when unavailable) or 'rules' (instant)
+    mode = (request.form.get('mode') or 'ai').strip().lower()
+    mode = mode if mode in schedule_gen.SCHEDULE_MODES else 'ai'
 
-    import os, requests, json, re
     gemini_key = _get_env('GEMINI_API_KEY')
 
-    if not gemini_key:
-        error_msg = 'GEMINI_API_KEY is required. Set the GEMINI_API_KEY environment variable to use Gemini.'
-        return render_template('schedule_creator.html', plant=plant, item=item, error=error_msg)
-
-    ai_text = None
     try:
-        # Require Gemini only — do not fallback to OpenAI per user request
-        if not gemini_key:
-            error_msg = 'GEMINI_API_KEY environment variable is required to generate schedules using Gemini.'
-            return render_template('schedule_creator.html', plant=plant, item=item, error=error_msg)
-
-        # Use modern Gemini generateContent endpoint and pass API key in X-goog-api-key header
-        model = os.getenv('GEMINI_MODEL') or 'gemini-2.0-flash'
-        url = f"https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent"
-        headers = {'Content-Type': 'application/json', 'X-goog-api-key': gemini_key}
-        payload = {
-            'contents': [
-                {
-                    'parts': [
-                        {'text': prompt}
-                    ]
-                }
-            ]
-        }
-
-        # Perform request with retries for transient errors
-        import time
-        resp = None
-        last_exception = None
-        for attempt in range(1, 4):
-            try:
-                resp = requests.post(url, headers=headers, json=payload, timeout=60)
-                resp.raise_for_status()
-                break
-            except requests.HTTPError as e:
-                status = getattr(e.response, 'status_code', None)
-                # Do not retry on client errors like 401/403/404 — return helpful message
-                if status in (400, 401, 403, 404):
-                    body = ''
-                    try:
-                        body = e.response.text
-                    except Exception:
-                        body = ''
-                    raise Exception(f'Gemini API returned {status}: {body}')
-                last_exception = e
-                # Exponential backoff for transient errors
-                if attempt < 3:
-                    time.sleep(0.5 * (2 ** (attempt - 1)))
-                    continue
-                raise
-            except Exception as e:
-                last_exception = e
-                if attempt < 3:
-                    time.sleep(0.5 * (2 ** (attempt - 1)))
-                    continue
-                raise
-        if resp is None:
-            raise Exception(f'Failed to call Gemini API: {last_exception}')
-
-        result = resp.json()
-        # Robust extraction for different Gemini response shapes
-        ai_text = None
-        try:
-            # Newer responses include 'candidates' with content blocks
-            if isinstance(result, dict):
-                if 'candidates' in result and len(result['candidates']) > 0:
-                    candidate = result['candidates'][0]
-                    # candidate.content may be list of dicts with type 'output_text' and 'text'
-                    content = candidate.get('content') or candidate.get('outputs') or candidate.get('result')
-                    if isinstance(content, list):
-                        parts = []
-                        for c in content:
-                            if isinstance(c, dict):
-                                text = c.get('text') or c.get('content') or c.get('output')
-                                if text:
-                                    parts.append(str(text))
-                                else:
-                                    # nested content
-                                    for v in c.values():
-                                        if isinstance(v, str):
-                                            parts.append(v)
-                        ai_text = '\n'.join(parts)
-                    else:
-                        ai_text = str(content)
-                # Some responses use 'results' -> each has 'content' list
-                elif 'results' in result and isinstance(result['results'], list) and len(result['results'])>0:
-                    parts = []
-                    for r in result['results']:
-                        if isinstance(r, dict):
-                            content = r.get('content')
-                            if isinstance(content, list):
-                                for c in content:
-                                    if isinstance(c, dict):
-                                        t = c.get('text') or c.get('output')
-                                        if t: parts.append(t)
-                    ai_text = '\n'.join(parts)
-                else:
-                    # fallback to any textual field
-                    # try to find first string in the JSON
-                    def find_first_text(obj):
-                        if isinstance(obj, str):
-                            return obj
-                        if isinstance(obj, dict):
-                            for k,v in obj.items():
-                                res = find_first_text(v)
-                                if res: return res
-                        if isinstance(obj, list):
-                            for item in obj:
-                                res = find_first_text(item)
-                                if res: return res
-                        return None
-                    ai_text = find_first_text(result) or json.dumps(result)
-        except Exception:
-            ai_text = json.dumps(result)
-
-        # Helper to find first string in nested JSON
-        def find_first_text(obj):
-            if isinstance(obj, str):
-                return obj
-            if isinstance(obj, dict):
-                for k, v in obj.items():
-                    res = find_first_text(v)
-                    if res:
-                        return res
-            if isinstance(obj, list):
-                for item in obj:
-                    res = find_first_text(item)
-                    if res:
-                        return res
-            return None
-
-        # Try to extract JSON array from ai_text and ensure it has exactly the requested duration days.
-        def extract_json_array(text):
-            if not text:
-                return None
-            start = text.find('[')
-            end = text.rfind(']')
-            if start == -1 or end == -1:
-                return None
-            json_text = text[start:end+1]
-            try:
-                parsed = json.loads(json_text)
-                return parsed
-            except Exception:
-                return None
-
-        parsed = extract_json_array(ai_text)
-        schedule_json = None
-        # If parsed and correct length, accept. Otherwise, attempt up to 2 corrective retries with explicit prompt asking for exact days.
-        attempts = 0
-        max_attempts = 2
-        current_text = ai_text
-        while attempts <= max_attempts:
-            parsed = extract_json_array(current_text)
-            if isinstance(parsed, list) and len(parsed) == int(duration):
-                schedule_json = json.dumps(parsed)
-                break
-            if attempts == max_attempts:
-                # final fallback: if parsed exists (even wrong length) accept it, else save raw AI text
-                if isinstance(parsed, list):
-                    schedule_json = json.dumps(parsed)
-                else:
-                    schedule_json = json.dumps({'ai_text': ai_text})
-                break
-            # Build a clarifying prompt that requests exact number of days and strict JSON-only output
-            clar_prompt = (
-                f"You must return EXACTLY {duration} items. Return ONLY a JSON array with {duration} objects. "
-                "Each object should be {\"day\": <number starting at 1>, \"tasks\": [<string>, ...]}. "
-                "Do not include any explanation, code fences, or extra text. Use concise actionable tasks appropriate for the plant, the selected stage, and user data provided earlier. "
-                f"User-selected stage: {stage}. If stage is 'seed', Day 1 must include a task that clearly indicates 'Seeding' and appropriate initial watering. "
-                f"Use ONLY the following context (PLANT_JSON and ITEM_JSON) and nothing else: \nPLANT_JSON: {plant_json}\nITEM_JSON: {item_json}\n"
-            )
-            # Call Gemini again with the clarification
-            payload2 = {'contents': [{'parts': [{'text': clar_prompt}]}]}
-            try:
-                resp2 = requests.post(url, headers=headers, json=payload2, timeout=120)
-                resp2.raise_for_status()
-                res2 = resp2.json()
-                new_text = find_first_text(res2) or json.dumps(res2)
-                current_text = new_text
-            except Exception as e:
-                # If retry fails, break and fallback
-                print(f"Retry {attempts+1} call to Gemini failed: {e}")
-                if isinstance(parsed, list):
-                    schedule_json = json.dumps(parsed)
-                else:
-                    schedule_json = json.dumps({'ai_text': ai_text, 'retry_error': str(e)})
-                break
-            attempts += 1
-
-        schedule = Schedule.create(garden_id=garden_id, user_id=user_id, schedule_json=schedule_json)
+        # Structured JSON output, parsed as it streams; only missing days are re-requested
+        model = _get_env('GEMINI_MODEL') or ai.DEFAULT_MODEL
+        days, ai_text, source = schedule_gen.build_schedule_days(mode, gemini_key, plant, item, stage, int(duration), model=model,
+                                                                 feature='schedule_create')
+        if mode == 'ai' and source == 'rules':
+            flash('AI is unavailable right now, so an instant rule-based schedule was created. You can enrich it with AI later.')
+        # Days and their checklist tasks are saved together in one transaction
+        schedule = Schedule.create(garden_id, user_id, days, source=source, stage=stage, raw_ai_text=ai_text)
         if schedule:
-            # Persist individual tasks for checklist
-            try:
-                parsed_schedule = json.loads(schedule.schedule_json) if schedule.schedule_json else []
-            except Exception:
-                parsed_schedule = []
-            try:
-                from backend.models import ScheduleTask
-                ScheduleTask.create_many(schedule.id, parsed_schedule)
-            except Exception as e:
-                print(f"Warning: failed to persist schedule tasks: {e}")
-
             # If called inline from schedule_creator page, render the creator with checkboxes
             inline = request.form.get('inline') or request.args.get('inline')
-            schedule_data = parsed_schedule
+            schedule_data = days
 
             if inline == '1':
                 plant_context = item.get('plant') if isinstance(item, dict) else None
@@ -1166,6 +1065,88 @@ def garden_schedule_create(garden_id):
         error_msg = f'Failed to generate schedule: {e}'
         return render_template('schedule_creator.html', plant=plant, item=item, error=error_msg)
 
+# Regenerate only the remaining days of an existing schedule, keeping completion history
+@api_bp.route('/garden/schedule/<int:schedule_id>/regenerate', methods=['POST'])
+@login_required
+def garden_schedule_regenerate(schedule_id):
+    from backend.models import User as UserModel, Schedule, ScheduleTask
+    from backend import ai, schedule_gen
+    schedule = Schedule.get_by_id(schedule_id)
+    if not schedule or schedule.user_id != session.get('user_id'):
+        flash('Not authorized')
+        return redirect(url_for('api.my_garden'))
+    items = UserModel.get_garden(session.get('user_id'))
+    item = next((i for i in items if i['garden_id'] == schedule.garden_id), None)
+    if not item:
+        flash('Garden item not found')
+        return redirect(url_for('api.my_garden'))
+
+    plant = item['plant']
+    duration = int(plant.get('duration_days') or 30)
+    try:
+        from_day = int(request.form.get('from_day') or schedule.current_day())
+    except ValueError:
+        flash('Invalid day')
+        return redirect(url_for('api.garden_schedule_view', schedule_id=schedule_id))
+    from_day = max(1, from_day)
+    if from_day > duration:
+        flash('Nothing to regenerate after the last day of the schedule')
+        return redirect(url_for('api.garden_schedule_view', schedule_id=schedule_id))
+    stage = schedule.stage if schedule.stage in schedule_gen.ALLOWED_STAGES else 'seed'
+    mode = (request.form.get('mode') or 'ai').strip().lower()
+    mode = mode if mode in schedule_gen.SCHEDULE_MODES else 'ai'
+
+    # Days with completed tasks are kept as they are
+    keep = ScheduleTask.get_completed_days(schedule_id, from_day)
+    days = [d for d in range(from_day, duration + 1) if d not in keep]
+    if not days:
+        flash('All remaining days already have completed tasks; nothing to regenerate')
+        return redirect(url_for('api.garden_schedule_view', schedule_id=schedule_id))
+
+    try:
+        model = _get_env('GEMINI_MODEL') or ai.DEFAULT_MODEL
+        new_days, _ai_text, source = schedule_gen.build_schedule_days(mode, _get_env('GEMINI_API_KEY'), plant, item, stage, duration, days=days, model=model,
+                                                                      feature='schedule_regenerate')
+        diff = Schedule.replace_days_from(schedule_id, from_day, new_days, source)
+        if diff is None:
+            flash('Schedule not found')
+        else:
+            flash(f"Regenerated days {from_day}-{duration}: {diff['inserted']} added, {diff['updated']} changed, {diff['deleted']} removed, {diff['unchanged']} unchanged")
+    except Exception as e:
+        print(f"Error regenerating schedule: {e}")
+        flash('Failed to regenerate schedule')
+    return redirect(url_for('api.garden_schedule_view', schedule_id=schedule_id) + f"#day-{from_day}")
+
+# Generate schedules for every garden item that does not have one yet
+@api_bp.route('/garden/schedules/generate-all', methods=['POST'])
+@login_required
+def garden_schedules_generate_all():
+    if session.get('is_admin'):
+        return jsonify({'error': 'Admins cannot create schedules'}), 403
+    from backend.models import User as UserModel
+    from backend import ai, schedule_gen
+    from backend.schedule_batch import batch_scheduler
+    user_id = session.get('user_id')
+    data = request.get_json(silent=True) or request.form
+    stage = (data.get('stage') or '').strip().lower()
+    stage = stage if stage in schedule_gen.ALLOWED_STAGES else 'seed'
+    mode = (data.get('mode') or 'ai').strip().lower()
+    mode = mode if mode in schedule_gen.SCHEDULE_MODES else 'ai'
+
+    items = [i for i in UserModel.get_garden(user_id) if not i.get('schedule_id')]
+    model = _get_env('GEMINI_MODEL') or ai.DEFAULT_MODEL
+    job = batch_scheduler.submit(user_id, items, stage, mode, _get_env('GEMINI_API_KEY'), model)
+    return jsonify(job), 202
+
+@api_bp.route('/api/garden/schedules/jobs/<job_id>')
+@login_required
+def garden_schedules_job_status(job_id):
+    from backend.schedule_batch import batch_scheduler
+    job = batch_scheduler.get_job(job_id, session.get('user_id'))
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job)
+
 # Schedule creator page (GET) — shows plant details and a form to generate schedule
 @api_bp.route('/garden/schedule/new/<int:garden_id>', methods=['GET'])
 @login_required
@@ -1199,37 +1180,42 @@ def garden_schedule_view(schedule_id):
     if schedule.user_id != session.get('user_id'):
         flash('Not authorized')
         return redirect(url_for('api.my_garden'))
-    import json
-    try:
-        data = json.loads(schedule.schedule_json)
-    except Exception:
-        data = {'raw': schedule.schedule_json}
+
+    # Render a window of days around today; ?from=&to= page through long schedules
+    window = 60
+    duration = schedule.duration_days or 0
+    if duration and duration <= window:
+        from_day, to_day = 1, duration
+    else:
+        try:
+            from_day = max(1, int(request.args.get('from') or max(1, schedule.current_day() - 7)))
+        except ValueError:
+            from_day = 1
+        try:
+            to_day = max(from_day, int(request.args.get('to') or from_day + window - 1))
+        except ValueError:
+            to_day = from_day + window - 1
+    data = Schedule.get_days(schedule.id, from_day, to_day)
+    raw_text = Schedule.get_raw_ai_text(schedule.id) if not data and from_day == 1 else None
 
     # Try to locate the corresponding garden item to include plant details
     plant = None
     item = None
-    tasks_map = {}
     try:
-        from backend.models import User as UserModel, ScheduleTask
         items = UserModel.get_garden(session.get('user_id'))
         item = next((i for i in items if i['garden_id'] == schedule.garden_id), None)
         if item:
             plant = item.get('plant')
-        # fetch persisted tasks
-        rows = ScheduleTask.get_for_schedule(schedule.id)
-        for r in rows:
-            day = r.get('day')
-            if day not in tasks_map:
-                tasks_map[day] = []
-            tasks_map[day].append({
-                'task_index': r.get('task_index'),
-                'task_text': r.get('task_text'),
-                'completed': bool(r.get('completed'))
-            })
     except Exception as e:
-        print(f"Warning: could not fetch schedule tasks: {e}")
+        print(f"Warning: could not fetch garden item: {e}")
 
-    return render_template('garden_schedule_view.html', schedule=schedule, data=data, plant=plant, item=item, tasks_map=tasks_map)
+    page = {
+        'from_day': from_day,
+        'to_day': to_day,
+        'prev_from': max(1, from_day - window) if from_day > 1 else None,
+        'next_from': to_day + 1 if duration and to_day < duration else None
+    }
+    return render_template('garden_schedule_view.html', schedule=schedule, data=data, raw_text=raw_text, plant=plant, item=item, page=page)
 
 @api_bp.route('/admin/users/add', methods=['POST'])
 @admin_required
@@ -1258,17 +1244,99 @@ def admin_add_user():
         flash('Failed to add user')
     return redirect(url_for('api.admin_dashboard'))
 
+# Bulk CSV/JSONL import and streaming export, shared by the catalog and user admin pages
+def _bulk_import(label, import_rows, summary, redirect_endpoint):
+    """Read the uploaded file, pass its (line_no, row) pairs to import_rows and report.
+
+    summary(report) is the flash message; JSON clients get the report itself.
+    """
+    from backend import catalog_io
+    upload = request.files.get('file')
+    wants_json = request.accept_mimetypes.best == 'application/json'
+    if not upload or not upload.filename:
+        if wants_json:
+            return jsonify({'error': 'No file uploaded'}), 400
+        flash('Choose a CSV or JSONL file to import')
+        return redirect(url_for(redirect_endpoint))
+    try:
+        fmt = catalog_io.detect_format(upload.filename, request.form.get('format'))
+        report = import_rows(catalog_io.read_rows(upload.stream, fmt))
+    except ValueError as e:
+        if wants_json:
+            return jsonify({'error': str(e)}), 400
+        flash(str(e))
+        return redirect(url_for(redirect_endpoint))
+    except Exception as e:
+        print(f"Error importing {label}: {e}")
+        if wants_json:
+            return jsonify({'error': 'Import failed'}), 500
+        flash('Import failed')
+        return redirect(url_for(redirect_endpoint))
+    if wants_json:
+        return jsonify(report)
+    flash(summary(report))
+    for err in report['errors'][:20]:
+        flash(f"Line {err['line']}: {err['error']}")
+    return redirect(url_for(redirect_endpoint))
+
+
+def _bulk_export(name, export_rows):
+    """Stream export_rows(fmt) as a CSV or JSONL (?format=jsonl) download named name.<fmt>"""
+    from flask import Response, stream_with_context
+    fmt = 'jsonl' if (request.args.get('format') or '').lower() == 'jsonl' else 'csv'
+    mimetype = 'application/x-ndjson' if fmt == 'jsonl' else 'text/csv'
+    headers = {'Content-Disposition': f'attachment; filename="{name}.{fmt}"'}
+    return Response(stream_with_context(export_rows(fmt)), mimetype=mimetype, headers=headers)
+
+
+def _catalog_import(kind, redirect_endpoint):
+    from backend import catalog_io
+    return _bulk_import(kind, lambda rows: catalog_io.import_rows(kind, rows),
+                        lambda r: f"Imported {r['inserted']} new and updated {r['updated']} existing; {r['error_count']} row(s) rejected",
+                        redirect_endpoint)
+
+
+def _catalog_export(kind):
+    from backend import catalog_io
+    return _bulk_export(kind, lambda fmt: catalog_io.export_rows(kind, fmt))
+
+
+# Bulk user provisioning from CSV/JSONL (username, email, password, role)
+@api_bp.route('/admin/users/import', methods=['POST'])
+@admin_required
+def admin_import_users():
+    from backend import user_io
+    return _bulk_import('users', user_io.import_users,
+                        lambda r: f"Created {r['created']} user(s); {r['error_count']} row(s) rejected",
+                        'api.admin_dashboard')
+
+# Streaming user export (never includes password hashes)
+@api_bp.route('/admin/users/export')
+@admin_required
+def admin_export_users():
+    from backend import user_io
+    return _bulk_export('users', user_io.export_users)
+
 @api_bp.route('/admin/users/delete/<int:user_id>', methods=['POST'])
 @admin_required
 def admin_delete_user(user_id):
+    wants_json = request.accept_mimetypes.best == 'application/json'
     try:
-        if User.delete_by_id(user_id):
-            flash('User deleted successfully')
-        else:
-            flash('User not found or could not be deleted')
+        deleted = User.delete_by_id(user_id)
+        if deleted:
+            from backend.user_purge import purge_in_background
+            purge_in_background()
     except Exception as e:
         print(f"Error deleting user: {e}")
+        if wants_json:
+            return jsonify({'error': 'Failed to delete user'}), 500
         flash('Failed to delete user')
+        return redirect(url_for('api.admin_dashboard'))
+    if wants_json:
+        if not deleted:
+            return jsonify({'error': 'User not found or could not be deleted'}), 404
+        return jsonify({'message': 'User deleted successfully', 'id': user_id})
+    flash('User deleted successfully' if deleted else 'User not found or could not be deleted')
     return redirect(url_for('api.admin_dashboard'))
 
 # Market sub-admin dashboard
@@ -1325,6 +1393,30 @@ def admin_add_plant():
         flash('Failed to add plant')
     return redirect(url_for('api.admin_plants'))
 
+# Bulk catalog import/export (CSV or JSONL)
+@api_bp.route('/admin/plants/import', methods=['POST'])
+@admin_or_subadmin_required
+def admin_import_plants():
+    return _catalog_import('plants', 'api.admin_plants')
+
+
+@api_bp.route('/admin/plants/export')
+@admin_or_subadmin_required
+def admin_export_plants():
+    return _catalog_export('plants')
+
+
+@api_bp.route('/admin/market/import', methods=['POST'])
+@admin_or_market_required
+def admin_import_products():
+    return _catalog_import('products', 'api.admin_market')
+
+
+@api_bp.route('/admin/market/export')
+@admin_or_market_required
+def admin_export_products():
+    return _catalog_export('products')
+
 @api_bp.route('/admin/plants/edit/<int:plant_id>', methods=['GET', 'POST'])
 @admin_or_subadmin_required
 def admin_edit_plant(plant_id):
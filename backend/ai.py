@@ -0,0 +1,227 @@
+import hashlib
+import json
+import re
+import threading
+import time
+
+import requests
+
+from config import Config
+from backend import ai_ledger
+from backend.cache import TTLCache
+
+GEMINI_BASE_URL = Config.GEMINI_BASE_URL.rstrip('/')
+DEFAULT_MODEL = 'gemini-2.0-flash'
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling Gemini while the circuit breaker is open"""
+
+
+class CircuitBreaker:
+    """Stop calling a failing upstream for a cooldown period after repeated failures.
+
+    After `failure_threshold` consecutive failures the circuit opens; once
+    `reset_seconds` have passed a single trial call is let through
+    (half-open) and its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, failure_threshold=3, reset_seconds=60):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return 'closed'
+            if time.monotonic() - self._opened_at >= self.reset_seconds:
+                return 'half_open'
+            return 'open'
+
+    def allow(self):
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_seconds or self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+
+
+gemini_circuit = CircuitBreaker(Config.AI_CIRCUIT_FAILURES, Config.AI_CIRCUIT_RESET_SECONDS)
+
+
+def _is_upstream_failure(exc):
+    """Timeouts, connection errors, 429 and 5xx count against the circuit; other 4xx do not"""
+    if isinstance(exc, requests.HTTPError):
+        status = getattr(exc.response, 'status_code', None)
+        return status is None or status == 429 or status >= 500
+    return isinstance(exc, requests.RequestException)
+
+
+def find_first_text(obj):
+    """Return the first string found in a nested Gemini response"""
+    if isinstance(obj, str):
+        return obj
+    if isinstance(obj, dict):
+        for v in obj.values():
+            r = find_first_text(v)
+            if r:
+                return r
+    if isinstance(obj, list):
+        for it in obj:
+            r = find_first_text(it)
+            if r:
+                return r
+    return None
+
+
+def usage_tokens(obj):
+    """(prompt tokens, response tokens) from a Gemini response's usageMetadata"""
+    meta = (obj.get('usageMetadata') if isinstance(obj, dict) else None) or {}
+    return meta.get('promptTokenCount'), meta.get('candidatesTokenCount')
+
+
+def generate_text(api_key, prompt, model=None, timeout=60, feature='chat', retries=0, cache_hit=None):
+    """Send a single text prompt to Gemini and return the reply text.
+
+    Raises requests exceptions on transport/HTTP errors so callers can decide
+    on their own fallback message.
+    """
+    return generate_parts(api_key, [{'text': prompt}], model=model, timeout=timeout,
+                          feature=feature, retries=retries, cache_hit=cache_hit)
+
+
+def generate_parts(api_key, parts, model=None, timeout=60, feature='chat', retries=0, cache_hit=None):
+    """Send one user turn made of parts (text and/or inline_data) and return the reply text.
+
+    Every call, failed or not, is recorded in the ai_calls ledger under feature.
+    """
+    model = model or DEFAULT_MODEL
+    if not gemini_circuit.allow():
+        ai_ledger.record(feature, model, retries=retries, cache_hit=cache_hit, error='CircuitOpenError')
+        raise CircuitOpenError('Gemini circuit breaker is open')
+    url = f"{GEMINI_BASE_URL}/{model}:generateContent"
+    headers = {'Content-Type': 'application/json', 'X-goog-api-key': api_key}
+    payload = {'contents': [{'parts': parts}]}
+    started = time.monotonic()
+    try:
+        resp = requests.post(url, headers=headers, json=payload, timeout=timeout)
+        resp.raise_for_status()
+        result = resp.json()
+    except Exception as e:
+        if _is_upstream_failure(e):
+            gemini_circuit.record_failure()
+        else:
+            gemini_circuit.record_success()
+        ai_ledger.record(feature, model, started, retries=retries, cache_hit=cache_hit, error=e)
+        raise
+    gemini_circuit.record_success()
+    ai_ledger.record(feature, model, started, usage=usage_tokens(result), retries=retries, cache_hit=cache_hit)
+    return find_first_text(result) or ''
+
+
+# Response cache for generic assistant questions
+response_cache = TTLCache(max_entries=Config.AI_CACHE_MAX_ENTRIES, ttl_seconds=Config.AI_CACHE_TTL_SECONDS)
+
+_FILLER_WORDS = {'please', 'pls', 'hi', 'hello', 'hey', 'thanks', 'thank', 'you', 'so', 'um', 'uh', 'ok', 'okay'}
+# Follow-ups ("what about it?") and personal details depend on the conversation, not just the question
+_PERSONAL_PATTERN = re.compile(
+    r"\b(it|its|this|that|these|those|they|them|above|earlier|previous|before|again|"
+    r"you said|my name|i am|i'm|me|yesterday|today|tomorrow)\b|@|\d{3,}"
+)
+
+
+def normalize_question(text):
+    """Lowercase, strip punctuation and filler words so trivially different phrasings share a key"""
+    words = re.sub(r"[^a-z0-9\s]", ' ', (text or '').lower()).split()
+    return ' '.join(w for w in words if w not in _FILLER_WORDS)
+
+
+def is_cacheable_question(text):
+    """Return False for questions whose answer depends on the user or the conversation"""
+    if not text or len(text) > Config.AI_CACHE_MAX_QUESTION_CHARS:
+        return False
+    return _PERSONAL_PATTERN.search(text.lower()) is None
+
+
+def response_cache_key(question, plant_names, model):
+    plants = '|'.join(sorted({(n or '').strip().lower() for n in plant_names if n}))
+    raw = f"{model}\n{plants}\n{normalize_question(question)}"
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def _generation_config(response_schema):
+    return {'responseMimeType': 'application/json', 'responseSchema': response_schema}
+
+
+def stream_json(api_key, prompt, response_schema, model=None, timeout=120, feature='schedule', retries=0):
+    """Stream a schema-constrained JSON reply from Gemini, yielding text chunks as they arrive.
+
+    Uses streamGenerateContent with server-sent events so callers can parse
+    partial output and keep whatever arrived before a timeout or truncation.
+    """
+    model = model or DEFAULT_MODEL
+    url = f"{GEMINI_BASE_URL}/{model}:streamGenerateContent?alt=sse"
+    headers = {'Content-Type': 'application/json', 'X-goog-api-key': api_key}
+    payload = {
+        'contents': [{'parts': [{'text': prompt}]}],
+        'generationConfig': _generation_config(response_schema)
+    }
+    if not gemini_circuit.allow():
+        ai_ledger.record(feature, model, retries=retries, error='CircuitOpenError')
+        raise CircuitOpenError('Gemini circuit breaker is open')
+    started = time.monotonic()
+    usage = (None, None)
+    error = None
+    try:
+        with requests.post(url, headers=headers, json=payload, timeout=(10, timeout), stream=True) as resp:
+            resp.raise_for_status()
+            for line in resp.iter_lines(decode_unicode=True):
+                if not line or not line.startswith('data:'):
+                    continue
+                try:
+                    event = json.loads(line[5:].strip())
+                except ValueError:
+                    continue
+                if isinstance(event, dict) and event.get('usageMetadata'):
+                    # Counts are cumulative; the last event carries the totals
+                    usage = usage_tokens(event)
+                for cand in event.get('candidates') or []:
+                    for part in (cand.get('content') or {}).get('parts') or []:
+                        text = part.get('text')
+                        if text:
+                            yield text
+    except GeneratorExit:
+        # The consumer stopped reading a healthy stream; settle a half-open trial
+        gemini_circuit.record_success()
+        raise
+    except Exception as e:
+        error = e
+        if _is_upstream_failure(e):
+            gemini_circuit.record_failure()
+        else:
+            gemini_circuit.record_success()
+        raise
+    finally:
+        # Also runs when the consumer stops reading early
+        ai_ledger.record(feature, model, started, usage=usage, retries=retries, error=error)
+    gemini_circuit.record_success()
@@ -0,0 +1,120 @@
+"""Ledger of Gemini calls: model, feature, tokens, latency, retries, cache use and errors.
+
+record() only puts a row on an in-memory queue. A background thread writes
+queued rows to the ai_calls table with COPY, in batches of up to
+AI_LEDGER_BATCH_SIZE or every AI_LEDGER_FLUSH_SECONDS, so accounting never
+adds a database round trip to the request path. When the queue is full, rows
+are dropped and counted rather than blocking the caller.
+"""
+import atexit
+import queue
+import threading
+import time
+
+from config import Config
+from database.connection import get_db_connection
+
+COLUMNS = ('feature', 'endpoint', 'user_id', 'model', 'prompt_tokens', 'response_tokens',
+           'latency_ms', 'retries', 'cache_hit', 'error_class')
+
+
+def error_class(exc):
+    """Short error label: the exception class, plus the HTTP status when there is one"""
+    status = getattr(getattr(exc, 'response', None), 'status_code', None)
+    name = type(exc).__name__
+    return f'{name} {status}' if status else name
+
+
+def _request_info():
+    """(endpoint, user_id) of the current Flask request, or (None, None) off-request"""
+    try:
+        from flask import has_request_context, request, session
+        if has_request_context():
+            rule = request.url_rule.rule if request.url_rule is not None else request.path
+            return rule, session.get('user_id')
+    except Exception:
+        pass
+    return None, None
+
+
+class AICallLedger:
+    def __init__(self, batch_size=200, flush_seconds=2.0, max_queue=10000):
+        self.batch_size = max(1, batch_size)
+        self.flush_seconds = flush_seconds
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    def record(self, feature, model, started=None, usage=(None, None), retries=0, cache_hit=None, error=None):
+        """Queue one call. started is a time.monotonic() value; usage is (prompt, response) tokens"""
+        endpoint, user_id = _request_info()
+        latency_ms = int((time.monotonic() - started) * 1000) if started is not None else 0
+        prompt_tokens, response_tokens = usage or (None, None)
+        row = (feature, endpoint, user_id, model, prompt_tokens, response_tokens, latency_ms,
+               retries or 0, cache_hit, error_class(error) if isinstance(error, BaseException) else error)
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            self.dropped += 1
+            return
+        self._ensure_writer()
+
+    def _ensure_writer(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_seconds
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._write(batch)
+
+    def _write(self, batch):
+        conn = None
+        try:
+            conn = get_db_connection()
+            with conn.cursor() as cur:
+                with cur.copy(f"COPY ai_calls ({', '.join(COLUMNS)}) FROM STDIN") as copy:
+                    for row in batch:
+                        copy.write_row(row)
+            conn.commit()
+        except Exception as e:
+            print(f"Warning: failed to write {len(batch)} AI call record(s): {e}")
+        finally:
+            if conn:
+                conn.close()
+
+    def flush(self):
+        """Write whatever is still queued; called at interpreter exit"""
+        batch = []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+            if len(batch) >= self.batch_size:
+                self._write(batch)
+                batch = []
+        if batch:
+            self._write(batch)
+
+
+ledger = AICallLedger(Config.AI_LEDGER_BATCH_SIZE, Config.AI_LEDGER_FLUSH_SECONDS)
+atexit.register(ledger.flush)
+
+
+def record(feature, model, started=None, usage=(None, None), retries=0, cache_hit=None, error=None):
+    ledger.record(feature, model, started, usage=usage, retries=retries, cache_hit=cache_hit, error=error)
@@ -12,6 +12,10 @@ def create_app():
     # Register API routes
     from api.routes import api_bp
     app.register_blueprint(api_bp)
+
+    # Per-route latency, SQL counts and /metrics
+    from backend import metrics
+    metrics.init_app(app)
     
     return app
 
@@ -31,8 +35,8 @@ def init_database():
     try:
         if schema:
             try:
-                # Execute schema (split by semicolon for multiple statements)
-                statements = [stmt.strip() for stmt in schema.split(';') if stmt.strip()]
+                # Execute schema statement by statement (function bodies may contain semicolons)
+                statements = split_sql_statements(schema)
                 for statement in statements:
                     cur.execute(statement)
                 conn.commit()
@@ -71,7 +75,9 @@ def init_database():
             "ALTER TABLE plants ADD COLUMN IF NOT EXISTS duration_days INTEGER",
             "ALTER TABLE plants ADD COLUMN IF NOT EXISTS type VARCHAR(100)",
             "ALTER TABLE plants ADD COLUMN IF NOT EXISTS photo_url TEXT",
-            "ALTER TABLE plants ADD COLUMN IF NOT EXISTS description TEXT"
+            "ALTER TABLE plants ADD COLUMN IF NOT EXISTS description TEXT",
+            # Natural key used by bulk catalog import (backend/catalog_io.py)
+            "CREATE INDEX IF NOT EXISTS idx_plants_scientific_name_lower ON plants (lower(scientific_name))"
         ]
         for stmt in alter_statements:
             try:
@@ -101,7 +107,13 @@ def init_database():
             "ALTER TABLE user_gardens ADD COLUMN IF NOT EXISTS location VARCHAR(100)",
             "ALTER TABLE user_gardens ADD COLUMN IF NOT EXISTS watering_interval_days INTEGER",
             "ALTER TABLE user_gardens ADD COLUMN IF NOT EXISTS notes TEXT",
-            "ALTER TABLE user_gardens ADD COLUMN IF NOT EXISTS last_watered TIMESTAMP"
+            "ALTER TABLE user_gardens ADD COLUMN IF NOT EXISTS last_watered TIMESTAMP",
+            "ALTER TABLE user_gardens ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP",
+            # Watering engine (backend/watering.py): next due date and last reminder sent
+            "ALTER TABLE user_gardens ADD COLUMN IF NOT EXISTS next_watering_due DATE",
+            "ALTER TABLE user_gardens ADD COLUMN IF NOT EXISTS watering_reminded_on DATE",
+            "CREATE INDEX IF NOT EXISTS idx_user_gardens_user_watering ON user_gardens (user_id, next_watering_due)",
+            "CREATE INDEX IF NOT EXISTS idx_user_gardens_watering_due ON user_gardens (next_watering_due) WHERE next_watering_due IS NOT NULL"
         ]
         for stmt in garden_alter_statements:
             try:
@@ -135,10 +147,68 @@ def init_database():
                     id SERIAL PRIMARY KEY,
                     garden_id INTEGER NOT NULL,
                     user_id INTEGER NOT NULL,
-                    schedule_json TEXT NOT NULL,
+                    schedule_json TEXT NULL,
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                 )
             ''')
+            cur.execute("ALTER TABLE schedules ADD COLUMN IF NOT EXISTS source VARCHAR(20) DEFAULT 'ai'")
+            cur.execute("ALTER TABLE schedules ADD COLUMN IF NOT EXISTS stage VARCHAR(20)")
+            # Normalized storage: schedule_days/schedule_tasks replace schedule_json
+            cur.execute("ALTER TABLE schedules ALTER COLUMN schedule_json DROP NOT NULL")
+            cur.execute("ALTER TABLE schedules ADD COLUMN IF NOT EXISTS raw_ai_text TEXT")
+            cur.execute("ALTER TABLE schedules ADD COLUMN IF NOT EXISTS duration_days INTEGER")
+            cur.execute('''
+                CREATE TABLE IF NOT EXISTS schedule_tasks (
+                    id SERIAL PRIMARY KEY,
+                    schedule_id INTEGER NOT NULL REFERENCES schedules(id) ON DELETE CASCADE,
+                    day INTEGER NOT NULL,
+                    task_index INTEGER NOT NULL,
+                    task_text TEXT NOT NULL,
+                    completed BOOLEAN DEFAULT FALSE,
+                    completed_at TIMESTAMP NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    UNIQUE (schedule_id, day, task_index)
+                )
+            ''')
+            cur.execute('''
+                CREATE TABLE IF NOT EXISTS schedule_days (
+                    schedule_id INTEGER NOT NULL REFERENCES schedules(id) ON DELETE CASCADE,
+                    day INTEGER NOT NULL,
+                    task_count INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (schedule_id, day)
+                )
+            ''')
+            # Progress counters maintained by triggers on schedule_tasks
+            cur.execute("SELECT 1 FROM information_schema.columns WHERE table_name = 'schedules' AND column_name = 'total_tasks'")
+            progress_existed = cur.fetchone() is not None
+            for stmt in [
+                "ALTER TABLE schedules ADD COLUMN IF NOT EXISTS total_tasks INTEGER NOT NULL DEFAULT 0",
+                "ALTER TABLE schedules ADD COLUMN IF NOT EXISTS completed_tasks INTEGER NOT NULL DEFAULT 0",
+                "ALTER TABLE schedules ADD COLUMN IF NOT EXISTS last_completed_day INTEGER",
+                "ALTER TABLE schedule_days ADD COLUMN IF NOT EXISTS completed_count INTEGER NOT NULL DEFAULT 0",
+                "ALTER TABLE schedule_days ADD COLUMN IF NOT EXISTS tasks_before INTEGER NOT NULL DEFAULT 0"
+            ]:
+                cur.execute(stmt)
+            cur.execute(SCHEDULE_PROGRESS_FUNCTION)
+            for stmt in SCHEDULE_PROGRESS_TRIGGERS.split(';'):
+                if stmt.strip():
+                    cur.execute(stmt)
+            if not progress_existed:
+                for stmt in SCHEDULE_PROGRESS_BACKFILL.split(';'):
+                    if stmt.strip():
+                        cur.execute(stmt)
+            # Latest schedule per garden item, kept by Schedule.create
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_schedules_garden_id ON schedules (garden_id, id DESC)")
+            cur.execute("SELECT 1 FROM information_schema.columns WHERE table_name = 'user_gardens' AND column_name = 'current_schedule_id'")
+            current_existed = cur.fetchone() is not None
+            cur.execute("ALTER TABLE user_gardens ADD COLUMN IF NOT EXISTS current_schedule_id INTEGER REFERENCES schedules(id) ON DELETE SET NULL")
+            if not current_existed:
+                cur.execute('''
+                    UPDATE user_gardens ug
+                    SET current_schedule_id = s.id
+                    FROM (SELECT DISTINCT ON (garden_id) garden_id, id FROM schedules ORDER BY garden_id, id DESC) s
+                    WHERE ug.id = s.garden_id
+                ''')
             # Chat messages for schedules (per-schedule AI chat)
             cur.execute('''
                 CREATE TABLE IF NOT EXISTS schedule_chats (
@@ -172,12 +242,28 @@ def init_database():
                 cur.execute("CREATE INDEX IF NOT EXISTS idx_general_chats_user ON general_chats(user_id)")
             except Exception as _e:
                 print(f"⚠️ Warning creating general_chats index: {_e}")
+            # Rolling conversation summaries for the global AI assistant
+            cur.execute('''
+                CREATE TABLE IF NOT EXISTS general_chat_summaries (
+                    user_id INTEGER PRIMARY KEY,
+                    summary TEXT NOT NULL DEFAULT '',
+                    last_message_id INTEGER NOT NULL DEFAULT 0,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
             conn.commit()
-            print("✅ general_chats table ensured")
+            print("✅ general_chats and general_chat_summaries tables ensured")
         except Exception as e:
             print(f"⚠️ Warning: failed to ensure schedules or chats table: {e}")
             conn.rollback()
 
+        # Move legacy schedule_json blobs into schedule_days/schedule_tasks
+        try:
+            migrate_schedule_json(conn, cur)
+        except Exception as e:
+            print(f"⚠️ Warning: failed to migrate schedule_json: {e}")
+            conn.rollback()
+
         # Ensure market_products table exists and columns are present
         try:
             cur.execute('''
@@ -207,7 +293,8 @@ def init_database():
                 "ALTER TABLE market_products ADD COLUMN IF NOT EXISTS brand VARCHAR(100)",
                 "ALTER TABLE market_products ADD COLUMN IF NOT EXISTS description TEXT",
                 "ALTER TABLE market_products ADD COLUMN IF NOT EXISTS created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP",
-                "ALTER TABLE market_products ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP"
+                "ALTER TABLE market_products ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP",
+                "CREATE INDEX IF NOT EXISTS idx_market_products_name_brand_lower ON market_products (lower(name), lower(COALESCE(brand, '')))"
             ]
             for stmt in market_alter_statements:
                 try:
@@ -219,8 +306,228 @@ def init_database():
         except Exception as e:
             print(f"⚠️ Warning: failed to ensure market_products table: {e}")
             conn.rollback()
+
+        # Catalog versions, bumped by triggers whenever plants or products change
+        try:
+            cur.execute('''
+                CREATE TABLE IF NOT EXISTS catalog_versions (
+                    name VARCHAR(50) PRIMARY KEY,
+                    version BIGINT NOT NULL DEFAULT 0,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            cur.execute("INSERT INTO catalog_versions (name) VALUES ('plants'), ('products') ON CONFLICT (name) DO NOTHING")
+            cur.execute(CATALOG_VERSION_FUNCTION)
+            for stmt in CATALOG_VERSION_TRIGGERS.split(';'):
+                if stmt.strip():
+                    cur.execute(stmt)
+            conn.commit()
+            print("✅ catalog_versions ensured")
+        except Exception as e:
+            print(f"⚠️ Warning: failed to ensure catalog_versions: {e}")
+            conn.rollback()
+
+        # Cascading foreign keys from user-owned tables (backend/user_purge.py)
+        try:
+            from backend.user_purge import ensure_foreign_keys
+            if ensure_foreign_keys(conn, cur) == 0:
+                print("✅ foreign keys ensured")
+        except Exception as e:
+            print(f"⚠️ Warning: failed to ensure foreign keys: {e}")
+            conn.rollback()
     except Exception as e:
         print(f"❌ Unexpected error initializing database: {e}")
         conn.rollback()
     finally:
         close_db(conn, cur)
+
+
+def split_sql_statements(sql):
+    """Split a SQL script on semicolons that are not inside quotes, $$ bodies or -- comments"""
+    import re
+    statements = []
+    buf = []
+    i = 0
+    n = len(sql)
+    while i < n:
+        ch = sql[i]
+        if ch == '-' and sql.startswith('--', i):
+            end = sql.find('\n', i)
+            end = n if end == -1 else end
+            buf.append(sql[i:end])
+            i = end
+        elif ch == "'":
+            end = i + 1
+            while end < n:
+                if sql[end] == "'" and sql.startswith("''", end):
+                    end += 2
+                    continue
+                if sql[end] == "'":
+                    break
+                end += 1
+            buf.append(sql[i:end + 1])
+            i = end + 1
+        elif ch == '$':
+            m = re.match(r'\$[A-Za-z_]*\$', sql[i:])
+            if m:
+                tag = m.group(0)
+                end = sql.find(tag, i + len(tag))
+                end = n if end == -1 else end + len(tag)
+                buf.append(sql[i:end])
+                i = end
+            else:
+                buf.append(ch)
+                i += 1
+        elif ch == ';':
+            stmt = ''.join(buf).strip()
+            if stmt:
+                statements.append(stmt)
+            buf = []
+            i += 1
+        else:
+            buf.append(ch)
+            i += 1
+    stmt = ''.join(buf).strip()
+    if stmt:
+        statements.append(stmt)
+    # Drop chunks that are only comments
+    return [s for s in statements if any(line.strip() and not line.strip().startswith('--') for line in s.splitlines())]
+
+
+# Keep schedules/schedule_days progress counters in step with schedule_tasks.
+# Statement-level triggers with transition tables, so batch updates cost one
+# counter update per schedule. The only definition: schema.sql leaves these
+# to init_database, which runs the backfill once, when the columns are added.
+SCHEDULE_PROGRESS_FUNCTION = '''
+CREATE OR REPLACE FUNCTION schedule_progress_apply() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE schedules s
+        SET total_tasks = s.total_tasks - o.total, completed_tasks = s.completed_tasks - o.done
+        FROM (SELECT schedule_id, COUNT(*) AS total, COUNT(*) FILTER (WHERE completed) AS done FROM old_rows GROUP BY schedule_id) o
+        WHERE s.id = o.schedule_id;
+        UPDATE schedule_days d
+        SET completed_count = d.completed_count - o.done
+        FROM (SELECT schedule_id, day, COUNT(*) AS done FROM old_rows WHERE completed GROUP BY schedule_id, day) o
+        WHERE d.schedule_id = o.schedule_id AND d.day = o.day;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        UPDATE schedules s
+        SET total_tasks = s.total_tasks + n.total, completed_tasks = s.completed_tasks + n.done,
+            last_completed_day = GREATEST(s.last_completed_day, n.last_day)
+        FROM (SELECT schedule_id, COUNT(*) AS total, COUNT(*) FILTER (WHERE completed) AS done,
+                     MAX(day) FILTER (WHERE completed) AS last_day
+              FROM new_rows GROUP BY schedule_id) n
+        WHERE s.id = n.schedule_id;
+        UPDATE schedule_days d
+        SET completed_count = d.completed_count + n.done
+        FROM (SELECT schedule_id, day, COUNT(*) AS done FROM new_rows WHERE completed GROUP BY schedule_id, day) n
+        WHERE d.schedule_id = n.schedule_id AND d.day = n.day;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        -- Only schedules whose latest completed day was just unmarked need a recount
+        UPDATE schedules s
+        SET last_completed_day = (SELECT MAX(t.day) FROM schedule_tasks t WHERE t.schedule_id = s.id AND t.completed)
+        WHERE (s.id, s.last_completed_day) IN (SELECT schedule_id, day FROM old_rows WHERE completed);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+'''
+
+SCHEDULE_PROGRESS_TRIGGERS = '''
+DROP TRIGGER IF EXISTS schedule_tasks_progress_insert ON schedule_tasks;
+CREATE TRIGGER schedule_tasks_progress_insert AFTER INSERT ON schedule_tasks
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION schedule_progress_apply();
+DROP TRIGGER IF EXISTS schedule_tasks_progress_update ON schedule_tasks;
+CREATE TRIGGER schedule_tasks_progress_update AFTER UPDATE ON schedule_tasks
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION schedule_progress_apply();
+DROP TRIGGER IF EXISTS schedule_tasks_progress_delete ON schedule_tasks;
+CREATE TRIGGER schedule_tasks_progress_delete AFTER DELETE ON schedule_tasks
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION schedule_progress_apply();
+'''
+
+SCHEDULE_PROGRESS_BACKFILL = '''
+UPDATE schedules s
+SET total_tasks = x.total, completed_tasks = x.done, last_completed_day = x.last_day
+FROM (SELECT schedule_id, COUNT(*) AS total, COUNT(*) FILTER (WHERE completed) AS done,
+             MAX(day) FILTER (WHERE completed) AS last_day
+      FROM schedule_tasks GROUP BY schedule_id) x
+WHERE s.id = x.schedule_id;
+UPDATE schedule_days d
+SET completed_count = COALESCE(c.done, 0), tasks_before = x.before
+FROM (SELECT schedule_id, day,
+             COALESCE(SUM(task_count) OVER (PARTITION BY schedule_id ORDER BY day ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING), 0) AS before
+      FROM schedule_days) x
+LEFT JOIN (SELECT schedule_id, day, COUNT(*) AS done FROM schedule_tasks WHERE completed GROUP BY schedule_id, day) c
+       ON c.schedule_id = x.schedule_id AND c.day = x.day
+WHERE d.schedule_id = x.schedule_id AND d.day = x.day
+  -- The columns were just added as 0: only rows with something to set are written
+  AND (x.before <> 0 OR c.done IS NOT NULL);
+'''
+
+
+# Cached page fragments are keyed by these versions (backend/fragments.py).
+# One bump per statement, so a bulk import invalidates once, and it commits
+# or rolls back with the change itself.
+CATALOG_VERSION_FUNCTION = '''
+CREATE OR REPLACE FUNCTION catalog_version_bump() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO catalog_versions AS v (name, version) VALUES (TG_ARGV[0], 1)
+    ON CONFLICT (name) DO UPDATE SET version = v.version + 1, updated_at = CURRENT_TIMESTAMP;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+'''
+
+CATALOG_VERSION_TRIGGERS = '''
+DROP TRIGGER IF EXISTS plants_catalog_version ON plants;
+CREATE TRIGGER plants_catalog_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON plants
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_version_bump('plants');
+DROP TRIGGER IF EXISTS market_products_catalog_version ON market_products;
+CREATE TRIGGER market_products_catalog_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON market_products
+    FOR EACH STATEMENT EXECUTE FUNCTION catalog_version_bump('products');
+'''
+
+
+def migrate_schedule_json(conn, cur, batch_size=200):
+    """Copy days/tasks from legacy schedules.schedule_json into schedule_days/schedule_tasks.
+
+    Runs in batches, committing after each. Unparseable or non-list blobs, and
+    lists whose days cannot be written, are moved to raw_ai_text. schedule_json
+    is cleared once a row is migrated, so re-running only touches schedules
+    that are still pending.
+    """
+    import json
+    from backend.models import insert_schedule_days
+    migrated = 0
+    while True:
+        cur.execute('SELECT id, schedule_json FROM schedules WHERE schedule_json IS NOT NULL ORDER BY id ASC LIMIT %s', (batch_size,))
+        rows = cur.fetchall()
+        if not rows:
+            break
+        for r in rows:
+            try:
+                parsed = json.loads(r['schedule_json'])
+            except Exception:
+                parsed = None
+            if isinstance(parsed, list):
+                # One bad row must not roll back the batch and stall every later startup on it
+                cur.execute('SAVEPOINT migrate_schedule')
+                try:
+                    last_day = insert_schedule_days(cur, r['id'], parsed)
+                    cur.execute('UPDATE schedules SET schedule_json = NULL, duration_days = COALESCE(duration_days, %s) WHERE id = %s', (last_day, r['id']))
+                    cur.execute('RELEASE SAVEPOINT migrate_schedule')
+                    continue
+                except Exception as e:
+                    cur.execute('ROLLBACK TO SAVEPOINT migrate_schedule')
+                    print(f"⚠️ Warning: schedule {r['id']} has unusable schedule_json, moving it to raw_ai_text: {e}")
+            raw = parsed.get('ai_text') if isinstance(parsed, dict) and parsed.get('ai_text') else r['schedule_json']
+            cur.execute('UPDATE schedules SET schedule_json = NULL, raw_ai_text = COALESCE(raw_ai_text, %s) WHERE id = %s', (raw, r['id']))
+        conn.commit()
+        migrated += len(rows)
+    if migrated:
+        print(f"✅ Migrated {migrated} schedule(s) from schedule_json to schedule_days/schedule_tasks")
@@ -0,0 +1,274 @@
+"""Bulk CSV/JSONL import and streaming export for plants and market products.
+
+Uploads are read row by row and validated in chunks. Valid rows are loaded
+with COPY into a temporary staging table, and the staging table is merged
+into the catalog in two set-based statements. Rows whose natural key
+already exists are updated; the rest are inserted. Invalid rows are
+reported with their line number instead of failing the import. Exports
+stream from a server-side cursor.
+"""
+import csv
+import io
+import json
+import math
+
+from database.connection import get_db_connection
+
+MAX_REPORTED_ERRORS = 1000
+# Column limits, so out-of-range values are reported per line instead of failing the COPY or merge
+INT_MAX = 2147483647
+PRICE_MAX = 99999999.99  # NUMERIC(10,2)
+
+
+def normalize_url(url):
+    u = (url or '').strip()
+    if u and not u.lower().startswith(('http://', 'https://')):
+        u = 'https://' + u
+    return u
+
+
+def _text(value):
+    return str(value).strip() if value is not None else ''
+
+
+def _required(value, field):
+    value = _text(value)
+    if not value:
+        raise ValueError(f'{field} is required')
+    return value
+
+
+def _optional(value, field):
+    return _text(value) or None
+
+
+def _max_length(validator, limit):
+    """Wrap a text validator with the VARCHAR(limit) of its target column"""
+    def check(value, field):
+        value = validator(value, field)
+        if value is not None and len(value) > limit:
+            raise ValueError(f'{field} must be at most {limit} characters')
+        return value
+    return check
+
+
+def _positive_int(value, field):
+    try:
+        n = int(_text(value))
+    except ValueError:
+        raise ValueError(f'{field} must be a whole number')
+    if n < 1:
+        raise ValueError(f'{field} must be at least 1')
+    if n > INT_MAX:
+        raise ValueError(f'{field} must be at most {INT_MAX}')
+    return n
+
+
+def _non_negative_int(value, field):
+    try:
+        n = int(_text(value))
+    except ValueError:
+        raise ValueError(f'{field} must be a whole number')
+    if n < 0:
+        raise ValueError(f'{field} must not be negative')
+    if n > INT_MAX:
+        raise ValueError(f'{field} must be at most {INT_MAX}')
+    return n
+
+
+def _price(value, field):
+    try:
+        n = float(_text(value))
+    except ValueError:
+        raise ValueError(f'{field} must be a number')
+    if not math.isfinite(n):
+        raise ValueError(f'{field} must be a number')
+    if n < 0:
+        raise ValueError(f'{field} must not be negative')
+    n = round(n, 2)
+    if n > PRICE_MAX:
+        raise ValueError(f'{field} must be at most {PRICE_MAX:.2f}')
+    return n
+
+
+def _url(value, field):
+    return normalize_url(_required(value, field))
+
+
+# Column name -> validator, in COPY order. Required fields match the admin forms.
+CATALOGS = {
+    'plants': {
+        'table': 'plants',
+        'columns': {
+            'name': _max_length(_required, 255),
+            'scientific_name': _max_length(_required, 255),
+            'duration_days': _positive_int,
+            'type': _max_length(_required, 100),
+            'photo_url': _required,
+            'description': _required
+        },
+        'staging_types': {'duration_days': 'INTEGER'},
+        # Natural key used to match existing rows ({a} is the table alias)
+        'key': ('lower({a}.scientific_name)',),
+    },
+    'products': {
+        'table': 'market_products',
+        'columns': {
+            'name': _max_length(_required, 255),
+            'type': _max_length(_required, 100),
+            'image_url': _url,
+            'buy_url': _url,
+            'price': _price,
+            'quantity': _non_negative_int,
+            'unit': _max_length(_required, 50),
+            'brand': _max_length(_optional, 100),
+            'description': _optional
+        },
+        'staging_types': {'price': 'NUMERIC(10,2)', 'quantity': 'INTEGER'},
+        'key': ('lower({a}.name)', "lower(COALESCE({a}.brand, ''))"),
+    }
+}
+
+
+def detect_format(filename, fmt=None):
+    fmt = (fmt or '').lower() or (filename or '').rsplit('.', 1)[-1].lower()
+    if fmt in ('jsonl', 'ndjson', 'json'):
+        return 'jsonl'
+    if fmt == 'csv':
+        return 'csv'
+    raise ValueError('Unsupported format; use .csv or .jsonl')
+
+
+def read_rows(stream, fmt):
+    """Yield (line_no, dict) from a binary or text stream without reading it all into memory"""
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='') if isinstance(stream.read(0), bytes) else stream
+    if fmt == 'csv':
+        reader = csv.DictReader(text)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for line_no, line in enumerate(text, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield line_no, ValueError(f'invalid JSON: {e.msg}')
+            continue
+        yield line_no, row if isinstance(row, dict) else ValueError('expected a JSON object')
+
+
+def validate(kind, row):
+    spec = CATALOGS[kind]['columns']
+    if isinstance(row, Exception):
+        raise row
+    return tuple(check(row.get(col), col) for col, check in spec.items())
+
+
+def import_rows(kind, rows, chunk_size=5000):
+    """Validate and upsert (line_no, row) pairs into the catalog in one transaction.
+
+    Returns {'inserted', 'updated', 'error_count', 'errors': [{'line', 'error'}]}.
+    Later rows win when the same key appears more than once in the file.
+    """
+    spec = CATALOGS[kind]
+    table = spec['table']
+    cols = list(spec['columns'])
+    col_list = ', '.join(cols)
+    staging_cols = ', '.join(f"{c} {spec['staging_types'].get(c, 'TEXT')}" for c in cols)
+    key = spec['key']
+    errors = []
+    error_count = 0
+
+    conn = get_db_connection()
+    try:
+        cur = conn.cursor()
+        cur.execute(f'CREATE TEMP TABLE catalog_staging (line_no INTEGER, {staging_cols}) ON COMMIT DROP')
+
+        def flush(chunk):
+            with cur.copy(f'COPY catalog_staging (line_no, {col_list}) FROM STDIN') as copy:
+                for rec in chunk:
+                    copy.write_row(rec)
+
+        chunk = []
+        for line_no, row in rows:
+            try:
+                chunk.append((line_no,) + validate(kind, row))
+            except ValueError as e:
+                error_count += 1
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    errors.append({'line': line_no, 'error': str(e)})
+                continue
+            if len(chunk) >= chunk_size:
+                flush(chunk)
+                chunk = []
+        if chunk:
+            flush(chunk)
+
+        key_expr = ', '.join(k.format(a='catalog_staging') for k in key)
+        match = ' AND '.join(f"{k.format(a='t')} = {k.format(a='s')}" for k in key)
+        set_clause = ', '.join(f'{c} = s.{c}' for c in cols)
+        cur.execute(f'''
+            CREATE TEMP TABLE catalog_latest ON COMMIT DROP AS
+            SELECT DISTINCT ON ({key_expr}) * FROM catalog_staging ORDER BY {key_expr}, line_no DESC
+        ''')
+        cur.execute(f'''
+            UPDATE {table} t SET {set_clause}, updated_at = CURRENT_TIMESTAMP
+            FROM catalog_latest s WHERE {match}
+        ''')
+        updated = cur.rowcount
+        cur.execute(f'''
+            INSERT INTO {table} ({col_list})
+            SELECT {col_list} FROM catalog_latest s
+            WHERE NOT EXISTS (SELECT 1 FROM {table} t WHERE {match})
+            ORDER BY line_no
+        ''')
+        inserted = cur.rowcount
+        conn.commit()
+        return {'inserted': inserted, 'updated': updated, 'error_count': error_count, 'errors': errors}
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def export_rows(kind, fmt='csv', batch_size=2000):
+    """Yield the catalog as CSV or JSONL text, reading through a server-side cursor"""
+    spec = CATALOGS[kind]
+    cols = ['id'] + list(spec['columns'])
+    return stream_rows(f"SELECT {', '.join(cols)} FROM {spec['table']} ORDER BY id", cols, fmt,
+                       cursor_name=f'{kind}_export', batch_size=batch_size)
+
+
+def stream_rows(query, cols, fmt='csv', cursor_name='export', batch_size=2000):
+    """Yield the rows of query as CSV (with a header) or JSONL text in ~64 KB pieces.
+
+    Reads through a named server-side cursor, so memory stays flat however
+    many rows there are. Shared by the catalog and user exports.
+    """
+    conn = get_db_connection()
+    try:
+        with conn.transaction():
+            cur = conn.cursor(name=cursor_name)
+            cur.itersize = batch_size
+            cur.execute(query)
+            buf = io.StringIO()
+            writer = csv.writer(buf)
+            if fmt == 'csv':
+                writer.writerow(cols)
+            for row in cur:
+                if fmt == 'csv':
+                    writer.writerow([row[c] for c in cols])
+                else:
+                    buf.write(json.dumps({c: row[c] for c in cols}, default=str) + '\n')
+                if buf.tell() >= 64 * 1024:
+                    yield buf.getvalue()
+                    buf.seek(0)
+                    buf.truncate()
+            cur.close()
+            if buf.tell():
+                yield buf.getvalue()
+    finally:
+        conn.close()
@@ -0,0 +1,65 @@
+"""Cached HTML for the parts of pages that are the same for every user.
+
+The dashboard's plant catalog, filed list and marketplace grid only change
+when plants or products change. Each is rendered once per catalog version
+(kept in catalog_versions by triggers) and served from `store` until the
+version moves on, so a dashboard request only renders the user's own garden,
+notifications and profile. Old versions are never looked up again and age
+out of the store.
+
+`store` is anything with get(key) and set(key, value) holding strings. The
+default is an in-process TTLCache; call configure() with a shared store
+(e.g. a small Redis wrapper) so that workers render each version only once.
+"""
+from flask import render_template
+from markupsafe import Markup
+
+from backend.cache import TTLCache
+from config import Config
+
+store = TTLCache(max_entries=Config.FRAGMENT_CACHE_MAX_ENTRIES, ttl_seconds=Config.FRAGMENT_CACHE_TTL_SECONDS)
+
+
+def configure(new_store):
+    """Replace the fragment store, e.g. with one shared between processes"""
+    global store
+    store = new_store
+
+
+def fragment(name, version, render):
+    """HTML of fragment `name` at `version`, from the store or freshly rendered.
+
+    render() is only called on a miss. Without a version (catalog_versions
+    unreadable) the fragment is rendered and not cached.
+    """
+    if version is None:
+        return Markup(render())
+    key = f'{name}:{version}'
+    html = store.get(key)
+    if html is None:
+        html = render()
+        store.set(key, html)
+    return Markup(html)
+
+
+def dashboard_catalog():
+    """Rendered catalog blocks of dashboard.html: {'plants', 'filed', 'market'}"""
+    from backend.models import CatalogVersion, Plant, Product
+    # Read the versions before the rows: an edit in between is then cached
+    # under the older version and re-rendered on the next request
+    versions = CatalogVersion.current()
+    loaded = {}
+
+    def plants():
+        if 'plants' not in loaded:
+            loaded['plants'] = Plant.get_all()
+        return loaded['plants']
+
+    return {
+        'plants': fragment('dashboard_plants', versions.get('plants'),
+                           lambda: render_template('fragments/dashboard_plants.html', plants=plants())),
+        'filed': fragment('dashboard_filed', versions.get('plants'),
+                          lambda: render_template('fragments/dashboard_filed.html', plants=plants())),
+        'market': fragment('dashboard_market', versions.get('products'),
+                           lambda: render_template('fragments/dashboard_market.html', products=Product.get_all())),
+    }
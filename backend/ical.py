@@ -0,0 +1,48 @@
+"""Minimal iCalendar (RFC 5545) writer for schedule tasks, one line at a time"""
+from datetime import datetime, timedelta, timezone
+
+PRODID = '-//Virtual Garden Planner//Garden Calendar//EN'
+
+
+def escape_text(value):
+    return (str(value or '').replace('\\', '\\\\').replace(';', '\\;')
+            .replace(',', '\\,').replace('\r\n', '\\n').replace('\n', '\\n'))
+
+
+def fold(line):
+    """Fold content lines longer than 75 octets as required by the spec"""
+    raw = line.encode('utf-8')
+    if len(raw) <= 75:
+        return line + '\r\n'
+    parts = []
+    while raw:
+        limit = 75 if not parts else 74
+        cut = min(limit, len(raw))
+        # Don't split a multi-byte UTF-8 sequence
+        while cut < len(raw) and (raw[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(raw[:cut].decode('utf-8'))
+        raw = raw[cut:]
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def calendar_lines(tasks, host='garden.local', name='Garden tasks'):
+    """Yield VCALENDAR text for an iterable of task rows (date, schedule_id, day, task_index, task_text, plant_name, completed)"""
+    stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    yield fold('BEGIN:VCALENDAR')
+    yield fold('VERSION:2.0')
+    yield fold(f'PRODID:{PRODID}')
+    yield fold(f'X-WR-CALNAME:{escape_text(name)}')
+    for t in tasks:
+        start = t['date']
+        yield fold('BEGIN:VEVENT')
+        yield fold(f"UID:task-{t['schedule_id']}-{t['day']}-{t['task_index']}@{host}")
+        yield fold(f'DTSTAMP:{stamp}')
+        yield fold(f"DTSTART;VALUE=DATE:{start.strftime('%Y%m%d')}")
+        yield fold(f"DTEND;VALUE=DATE:{(start + timedelta(days=1)).strftime('%Y%m%d')}")
+        yield fold(f"SUMMARY:{escape_text(t['plant_name'] + ': ' + t['task_text'])}")
+        yield fold(f"DESCRIPTION:{escape_text('Day ' + str(t['day']) + ' of the ' + t['plant_name'] + ' schedule')}")
+        if t.get('completed'):
+            yield fold('STATUS:COMPLETED')
+        yield fold('END:VEVENT')
+    yield fold('END:VCALENDAR')
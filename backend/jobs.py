@@ -0,0 +1,125 @@
+"""Maintenance jobs, run from cron or by hand.
+
+Usage:
+    python -m backend.jobs notifications [--days N] [--archive] [--batch-size N]
+    python -m backend.jobs watering [--batch-size N]
+    python -m backend.jobs import-catalog {plants,products} FILE
+    python -m backend.jobs import-users FILE [--workers N]
+    python -m backend.jobs export-users [--format csv|jsonl]
+    python -m backend.jobs purge-users [--batch-size N]
+    python -m backend.jobs orphans [--batch-size N]
+"""
+import argparse
+
+from config import Config
+
+
+def purge_notifications(days=None, archive=None, batch_size=1000):
+    from backend.models import Notification
+    days = Config.NOTIFICATION_RETENTION_DAYS if days is None else days
+    archive = Config.NOTIFICATION_ARCHIVE if archive is None else archive
+    removed = Notification.purge_read(days, batch_size=batch_size, archive=archive)
+    print(f"✅ {'Archived' if archive else 'Deleted'} {removed} read notification(s) older than {days} days")
+    return removed
+
+
+def watering_reminders(batch_size=50000):
+    from backend import watering
+    changed = watering.refresh_due_dates(batch_size=batch_size)
+    sent = watering.send_reminders(batch_size=batch_size)
+    print(f"✅ Updated {changed} watering due date(s), sent {sent} reminder(s)")
+    return changed, sent
+
+
+def import_catalog(kind, path):
+    from backend import catalog_io
+    with open(path, 'rb') as f:
+        report = catalog_io.import_rows(kind, catalog_io.read_rows(f, catalog_io.detect_format(path)))
+    print(f"✅ Imported {report['inserted']} new and updated {report['updated']} existing {kind}; {report['error_count']} row(s) rejected")
+    for err in report['errors']:
+        print(f"  line {err['line']}: {err['error']}")
+    return report
+
+
+def import_users(path, workers=None):
+    from backend import catalog_io, user_io
+    with open(path, 'rb') as f:
+        report = user_io.import_users(catalog_io.read_rows(f, catalog_io.detect_format(path)), workers=workers)
+    print(f"✅ Created {report['created']} user(s); {report['error_count']} row(s) rejected")
+    for err in report['errors']:
+        print(f"  line {err['line']}: {err['error']}")
+    return report
+
+
+def export_users(fmt='csv'):
+    import sys
+    from backend import user_io
+    for part in user_io.export_users(fmt):
+        sys.stdout.write(part)
+
+
+def purge_users(batch_size=None):
+    from backend import user_purge
+    users, rows = user_purge.purge_deleted_users(batch_size)
+    print(f"✅ Purged {users} deleted user(s), {rows} row(s)")
+    return users, rows
+
+
+def remove_orphans(batch_size=None):
+    from backend import user_purge
+    report = user_purge.remove_orphans(batch_size)
+    for name, count in report.items():
+        if count:
+            print(f"  {name}: {count}")
+    print(f"✅ Removed orphans; {report['unvalidated']} foreign key(s) still unvalidated")
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m backend.jobs')
+    sub = parser.add_subparsers(dest='job', required=True)
+
+    p = sub.add_parser('notifications', help='Delete or archive old read notifications')
+    p.add_argument('--days', type=int, default=None)
+    p.add_argument('--archive', action='store_true', default=None)
+    p.add_argument('--batch-size', type=int, default=1000)
+
+    p = sub.add_parser('watering', help='Recompute watering due dates and send reminders')
+    p.add_argument('--batch-size', type=int, default=50000)
+
+    p = sub.add_parser('import-catalog', help='Bulk import plants or market products from CSV/JSONL')
+    p.add_argument('kind', choices=['plants', 'products'])
+    p.add_argument('path')
+
+    p = sub.add_parser('import-users', help='Bulk create users from CSV/JSONL (username, email, password, role)')
+    p.add_argument('path')
+    p.add_argument('--workers', type=int, default=None, help='Password hashing processes')
+
+    p = sub.add_parser('export-users', help='Write users (without password hashes) to stdout')
+    p.add_argument('--format', choices=['csv', 'jsonl'], default='csv')
+
+    p = sub.add_parser('purge-users', help='Remove the data of users deleted from the admin panel')
+    p.add_argument('--batch-size', type=int, default=None)
+
+    p = sub.add_parser('orphans', help='Delete rows and upload dirs whose owner no longer exists')
+    p.add_argument('--batch-size', type=int, default=None)
+
+    args = parser.parse_args(argv)
+    if args.job == 'notifications':
+        purge_notifications(args.days, args.archive, args.batch_size)
+    elif args.job == 'watering':
+        watering_reminders(args.batch_size)
+    elif args.job == 'import-catalog':
+        import_catalog(args.kind, args.path)
+    elif args.job == 'import-users':
+        import_users(args.path, args.workers)
+    elif args.job == 'export-users':
+        export_users(args.format)
+    elif args.job == 'purge-users':
+        purge_users(args.batch_size)
+    elif args.job == 'orphans':
+        remove_orphans(args.batch_size)
+
+
+if __name__ == '__main__':
+    main()
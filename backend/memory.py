@@ -0,0 +1,83 @@
+"""Rolling conversation memory for the global AI assistant.
+
+Prompts carry a per-user summary plus the last few raw turns; older messages
+are folded into the summary on a background thread.
+"""
+import threading
+
+from config import Config
+from backend import ai
+from backend.models import ChatSummary
+
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+
+
+def get_prompt_context(user_id, before_id=None):
+    """Return (summary_text, recent_messages) for building an assistant prompt.
+
+    recent_messages are the last CHAT_RECENT_TURNS messages not yet folded into
+    the summary, oldest first. Messages with id >= before_id are skipped so the
+    message currently being answered is not repeated in the history.
+    """
+    row = ChatSummary.get_for_user(user_id)
+    summary = (row or {}).get('summary') or ''
+    last_id = (row or {}).get('last_message_id') or 0
+    if Config.CHAT_RECENT_TURNS <= 0:
+        return summary, []
+    return summary, ChatSummary.get_recent(user_id, last_id, Config.CHAT_RECENT_TURNS, before_id=before_id)
+
+
+def schedule_refresh(user_id, api_key, model=None, pending=None):
+    """Fold older messages into the summary in the background if enough are pending.
+
+    pending is the number of unsummarized messages when the caller already
+    knows it; otherwise it is counted. No thread is started below the
+    threshold. At most one refresh runs per user at a time; extra calls are
+    ignored.
+    """
+    if pending is None:
+        pending = ChatSummary.count_pending(user_id)
+    if pending - max(Config.CHAT_RECENT_TURNS, 0) < Config.CHAT_SUMMARY_EVERY:
+        return False
+    with _refreshing_lock:
+        if user_id in _refreshing:
+            return False
+        _refreshing.add(user_id)
+    t = threading.Thread(target=_refresh, args=(user_id, api_key, model), daemon=True)
+    t.start()
+    return True
+
+
+def _refresh(user_id, api_key, model):
+    try:
+        row = ChatSummary.get_for_user(user_id)
+        summary = (row or {}).get('summary') or ''
+        last_id = (row or {}).get('last_message_id') or 0
+        # Keep the recent window raw; fold the oldest messages before it, a bounded chunk at a time
+        n = ChatSummary.count_pending(user_id) - max(Config.CHAT_RECENT_TURNS, 0)
+        if n < Config.CHAT_SUMMARY_EVERY:
+            return
+        foldable = ChatSummary.get_messages_after(user_id, last_id, min(n, max(Config.CHAT_SUMMARY_FOLD_MAX, 1)))
+        if not foldable:
+            return
+
+        transcript = "\n".join([f"{m['role']}: {m['message'] or ''}" for m in foldable])
+        prompt = (
+            "You maintain a running memory of a conversation between a user and a gardening assistant. "
+            "Update the summary below with the new messages. Keep facts about the user's plants, "
+            "location, problems, decisions and open questions; drop greetings and repetition. "
+            f"Write plain prose of at most {Config.CHAT_SUMMARY_MAX_CHARS} characters and return ONLY the summary.\n\n"
+            f"CURRENT SUMMARY:\n{summary or '(empty)'}\n\n"
+            f"NEW MESSAGES:\n{transcript}\n\n"
+            "UPDATED SUMMARY:"
+        )
+        new_summary = ai.generate_text(api_key, prompt, model=model, timeout=60, feature='chat_summary').strip()
+        if not new_summary:
+            return
+        ChatSummary.save(user_id, new_summary[:Config.CHAT_SUMMARY_MAX_CHARS], foldable[-1]['id'])
+    except Exception as e:
+        print(f"Warning: failed to refresh chat summary for user {user_id}: {e}")
+    finally:
+        with _refreshing_lock:
+            _refreshing.discard(user_id)
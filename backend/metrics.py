@@ -0,0 +1,167 @@
+"""Request and SQL metrics, exposed at /metrics in Prometheus text format.
+
+Every request records its latency per route, plus the number of SQL
+statements it ran and their total time. The statements are counted by the
+instrumented cursors in database/connection.py. A request that runs more
+than Config.REQUEST_QUERY_WARN statements is logged with its most repeated
+statement, which is usually a query inside a loop (N+1). Histograms live
+in process memory, so each worker process exports its own series.
+"""
+import threading
+import time
+
+from flask import Response, g, request
+
+from config import Config
+from database.connection import QueryStats, query_observers, query_stats
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names, values, extra=None):
+    pairs = list(zip(names, values)) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_labels(self.labels, key)} {_number(value)}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series['counts'][i] += 1
+            series['sum'] += value
+            series['count'] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                for bound, count in zip(self.buckets, series['counts']):
+                    lines.append(f"{self.name}_bucket{_labels(self.labels, key, ('le', _number(bound)))} {count}")
+                lines.append(f"{self.name}_bucket{_labels(self.labels, key, ('le', '+Inf'))} {series['count']}")
+                lines.append(f"{self.name}_sum{_labels(self.labels, key)} {_number(series['sum'])}")
+                lines.append(f"{self.name}_count{_labels(self.labels, key)} {series['count']}")
+        return lines
+
+
+REQUEST_SECONDS = Histogram('http_request_duration_seconds', 'Request latency by route', ('method', 'route', 'status'))
+REQUEST_QUERIES = Histogram('http_request_sql_queries', 'SQL statements per request', ('route',), QUERY_COUNT_BUCKETS)
+REQUEST_SQL_SECONDS = Histogram('http_request_sql_duration_seconds', 'Cumulative SQL time per request', ('route',))
+SQL_QUERIES = Counter('sql_queries_total', 'SQL statements executed, inside or outside requests')
+SLOW_QUERIES = Counter('sql_slow_queries_total', 'Statements slower than SLOW_QUERY_MS', ('route',))
+N_PLUS_ONE = Counter('http_request_query_limit_exceeded_total', 'Requests that ran more than REQUEST_QUERY_WARN statements', ('route',))
+
+REGISTRY = [REQUEST_SECONDS, REQUEST_QUERIES, REQUEST_SQL_SECONDS, SQL_QUERIES, SLOW_QUERIES, N_PLUS_ONE]
+
+
+def register(metric):
+    """Add a metric defined elsewhere to the /metrics output"""
+    REGISTRY.append(metric)
+    return metric
+
+
+def render():
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+def _on_query(query, seconds, stats):
+    SQL_QUERIES.inc()
+    if seconds * 1000 >= Config.SLOW_QUERY_MS:
+        SLOW_QUERIES.inc(stats.route if stats is not None else '-')
+
+
+def _route():
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+
+def _before_request():
+    g._metrics_start = time.perf_counter()
+    g._metrics_stats = QueryStats(f'{request.method} {_route()}')
+    g._metrics_token = query_stats.set(g._metrics_stats)
+
+
+def _after_request(response):
+    start = g.pop('_metrics_start', None)
+    stats = g.get('_metrics_stats')
+    if start is None or stats is None:
+        return response
+    route = _route()
+    REQUEST_SECONDS.observe(time.perf_counter() - start, request.method, route, response.status_code)
+    REQUEST_QUERIES.observe(stats.count, route)
+    REQUEST_SQL_SECONDS.observe(stats.seconds, route)
+    if stats.count > Config.REQUEST_QUERY_WARN:
+        N_PLUS_ONE.inc(route)
+        query, repeats = stats.most_repeated()
+        print(f"⚠️ {stats.route} ran {stats.count} queries ({stats.seconds * 1000:.0f} ms SQL); "
+              f"most repeated x{repeats}: {' '.join(query.split())[:300]}")
+    return response
+
+
+def _teardown_request(exc=None):
+    token = g.pop('_metrics_token', None)
+    if token is not None:
+        try:
+            query_stats.reset(token)
+        except ValueError:
+            # Torn down in a different context (e.g. after a streamed response)
+            query_stats.set(None)
+
+
+def metrics_view():
+    if Config.METRICS_TOKEN and request.headers.get('Authorization') != f'Bearer {Config.METRICS_TOKEN}':
+        return Response('Forbidden\n', status=403, mimetype='text/plain')
+    return Response(render(), mimetype='text/plain; version=0.0.4')
+
+
+def init_app(app):
+    if _on_query not in query_observers:
+        query_observers.append(_on_query)
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
@@ -1,8 +1,15 @@
-from database.connection import get_db_cursor, close_db
+from database.connection import get_db_connection, get_db_cursor, close_db
 from werkzeug.security import generate_password_hash, check_password_hash
 
+# Next watering date of a user_gardens row: interval days after the last
+# watering (or planting, or adding the item); NULL when no interval is set
+NEXT_WATERING_DUE_SQL = (
+    "CASE WHEN watering_interval_days > 0 THEN "
+    "COALESCE(last_watered::date, planted_on, created_at::date, CURRENT_DATE) + watering_interval_days END"
+)
+
 class User:
-    def __init__(self, id=None, username=None, email=None, password_hash=None, role='user', created_at=None, updated_at=None):
+    def __init__(self, id=None, username=None, email=None, password_hash=None, role='user', created_at=None, updated_at=None, deleted_at=None):
         self.id = id
         self.username = username
         self.email = email
@@ -10,6 +17,7 @@ class User:
         self.role = role or 'user'
         self.created_at = created_at
         self.updated_at = updated_at
+        self.deleted_at = deleted_at
     
     @classmethod
     def create(cls, username, email, password, role='user'):
@@ -44,7 +52,7 @@ class User:
         """Get user by username"""
         conn, cur = get_db_cursor()
         try:
-            cur.execute('SELECT * FROM users WHERE username = %s', (username,))
+            cur.execute('SELECT * FROM users WHERE username = %s AND deleted_at IS NULL', (username,))
             user_data = cur.fetchone()
             if user_data:
                 return cls(**user_data)
@@ -60,7 +68,7 @@ class User:
         """Get user by email"""
         conn, cur = get_db_cursor()
         try:
-            cur.execute('SELECT * FROM users WHERE email = %s', (email,))
+            cur.execute('SELECT * FROM users WHERE email = %s AND deleted_at IS NULL', (email,))
             user_data = cur.fetchone()
             if user_data:
                 return cls(**user_data)
@@ -93,7 +101,7 @@ class User:
         """Return all users (excluding password hash)"""
         conn, cur = get_db_cursor()
         try:
-            cur.execute('SELECT id, username, email, role, created_at, updated_at FROM users ORDER BY id ASC')
+            cur.execute('SELECT id, username, email, role, created_at, updated_at FROM users WHERE deleted_at IS NULL ORDER BY id ASC')
             rows = cur.fetchall()
             return [cls(**r) for r in rows]
         except Exception as e:
@@ -102,12 +110,54 @@ class User:
         finally:
             close_db(conn, cur)
 
+    @classmethod
+    def search(cls, q=None, role=None, after_id=None, before_id=None, limit=50):
+        """Return one page of users (excluding password hash) ordered by id.
+
+        Keyset pagination: pass after_id for the next page or before_id for the
+        previous one. q matches a username or email prefix, case-insensitively.
+        Returns (users, more) where more says whether rows remain beyond this
+        page in the direction of travel.
+        """
+        where, params = ['deleted_at IS NULL'], []
+        if q:
+            prefix = q.strip().lower().replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+            where.append('(lower(username) LIKE %s OR lower(email) LIKE %s)')
+            params += [prefix, prefix]
+        if role:
+            where.append('role = %s')
+            params.append(role)
+        backward = before_id is not None and after_id is None
+        if backward:
+            where.append('id < %s')
+            params.append(before_id)
+        elif after_id is not None:
+            where.append('id > %s')
+            params.append(after_id)
+        sql = 'SELECT id, username, email, role, created_at, updated_at FROM users WHERE ' + ' AND '.join(where)
+        sql += f" ORDER BY id {'DESC' if backward else 'ASC'} LIMIT %s"
+        params.append(limit + 1)
+        conn, cur = get_db_cursor()
+        try:
+            cur.execute(sql, params)
+            rows = cur.fetchall()
+            more = len(rows) > limit
+            rows = rows[:limit]
+            if backward:
+                rows.reverse()
+            return [cls(**r) for r in rows], more
+        except Exception as e:
+            print(f"Error searching users: {e}")
+            return [], False
+        finally:
+            close_db(conn, cur)
+
     @classmethod
     def delete_by_id(cls, user_id):
-        """Delete a user by id"""
+        """Mark a user deleted; their data is removed by backend.user_purge in batches"""
         conn, cur = get_db_cursor()
         try:
-            cur.execute('DELETE FROM users WHERE id = %s', (user_id,))
+            cur.execute('UPDATE users SET deleted_at = CURRENT_TIMESTAMP WHERE id = %s AND deleted_at IS NULL', (user_id,))
             deleted = cur.rowcount
             conn.commit()
             return deleted > 0
@@ -132,6 +182,7 @@ class User:
             ''', (nickname, planted_on, quantity, location, watering_interval_days, notes, last_watered, user_id, plant_id))
             res = cur.fetchone()
             if res:
+                cur.execute(f'UPDATE user_gardens SET next_watering_due = {NEXT_WATERING_DUE_SQL} WHERE id = %s', (res['id'],))
                 conn.commit()
                 return True
 
@@ -142,6 +193,8 @@ class User:
                 RETURNING id
             ''', (user_id, plant_id, nickname, planted_on, quantity, location, watering_interval_days, notes, last_watered))
             res2 = cur.fetchone()
+            if res2:
+                cur.execute(f'UPDATE user_gardens SET next_watering_due = {NEXT_WATERING_DUE_SQL} WHERE id = %s', (res2['id'],))
             conn.commit()
             return res2 is not None
         except Exception as e:
@@ -172,11 +225,22 @@ class User:
         conn, cur = get_db_cursor()
         try:
             cur.execute('''
-                SELECT ug.id as garden_id, ug.user_id, ug.plant_id, ug.nickname, ug.planted_on, ug.quantity, ug.location, ug.watering_interval_days, ug.notes, ug.last_watered,
-                       (SELECT s.id FROM schedules s WHERE s.garden_id = ug.id ORDER BY s.id DESC LIMIT 1) as schedule_id,
-                       p.id as plant_id, p.name, p.scientific_name, p.duration_days, p.type, p.photo_url, p.description
+                SELECT ug.id as garden_id, ug.user_id, ug.plant_id, ug.nickname, ug.planted_on, ug.quantity, ug.location, ug.watering_interval_days, ug.notes, ug.last_watered, ug.next_watering_due,
+                       ug.current_schedule_id as schedule_id,
+                       p.id as plant_id, p.name, p.scientific_name, p.duration_days, p.type, p.photo_url, p.description,
+                       s.total_tasks, s.completed_tasks, s.last_completed_day, s.duration_days as schedule_days,
+                       GREATEST(1, CURRENT_DATE - s.created_at::date + 1) as current_day,
+                       sd.task_count as today_tasks, sd.completed_count as today_completed, sd.tasks_before,
+                       cb.completed_before
                 FROM user_gardens ug
                 JOIN plants p ON p.id = ug.plant_id
+                LEFT JOIN schedules s ON s.id = ug.current_schedule_id
+                LEFT JOIN schedule_days sd ON sd.schedule_id = s.id AND sd.day = GREATEST(1, CURRENT_DATE - s.created_at::date + 1)
+                LEFT JOIN LATERAL (
+                    SELECT COALESCE(SUM(b.completed_count), 0) AS completed_before
+                    FROM schedule_days b
+                    WHERE b.schedule_id = s.id AND b.day < GREATEST(1, CURRENT_DATE - s.created_at::date + 1)
+                ) cb ON s.id IS NOT NULL
                 WHERE ug.user_id = %s
                 ORDER BY ug.id ASC
             ''', (user_id,))
@@ -194,7 +258,9 @@ class User:
                     'watering_interval_days': r.get('watering_interval_days'),
                     'notes': r.get('notes'),
                     'last_watered': r.get('last_watered'),
+                    'next_watering_due': r.get('next_watering_due'),
                     'schedule_id': r.get('schedule_id'),
+                    'progress': cls._progress(r) if r.get('schedule_id') else None,
                     'plant': {
                         'id': r['plant_id'],
                         'name': r['name'],
@@ -213,6 +279,26 @@ class User:
         finally:
             close_db(conn, cur)
 
+    @staticmethod
+    def _progress(r):
+        """Progress of the current schedule from its precomputed counters"""
+        total = r.get('total_tasks') or 0
+        completed = r.get('completed_tasks') or 0
+        today_completed = r.get('today_completed') or 0
+        # Past the last day there is no schedule_days row: every task is in the past
+        before = r.get('tasks_before') if r.get('tasks_before') is not None else total
+        # Tasks ticked off ahead of time on future days do not offset overdue ones
+        completed_before = r.get('completed_before') or 0
+        return {
+            'total': total,
+            'completed': completed,
+            'percent': round(100 * completed / total) if total else 0,
+            'last_completed_day': r.get('last_completed_day'),
+            'current_day': r.get('current_day'),
+            'due_today': max(0, (r.get('today_tasks') or 0) - today_completed),
+            'overdue': max(0, before - completed_before)
+        }
+
     @classmethod
     def update_garden_item(cls, garden_id, user_id, nickname=None, planted_on=None, quantity=None, location=None, watering_interval_days=None, notes=None, last_watered=None):
         conn, cur = get_db_cursor()
@@ -241,6 +327,14 @@ class User:
             query = f'UPDATE user_gardens SET {set_clause} WHERE id = %s AND user_id = %s RETURNING id'
             cur.execute(query, tuple(values))
             res = cur.fetchone()
+            if res and (last_watered is not None or watering_interval_days is not None or planted_on is not None):
+                # Reschedule just this item; the sweep in backend/watering.py only repairs drift
+                cur.execute(f'''
+                    UPDATE user_gardens
+                    SET next_watering_due = {NEXT_WATERING_DUE_SQL},
+                        watering_reminded_on = CASE WHEN {NEXT_WATERING_DUE_SQL} > CURRENT_DATE THEN NULL ELSE watering_reminded_on END
+                    WHERE id = %s
+                ''', (garden_id,))
             conn.commit()
             return res is not None
         except Exception as e:
@@ -250,6 +344,26 @@ class User:
         finally:
             close_db(conn, cur)
 
+    @classmethod
+    def get_watering_due(cls, user_id):
+        """Garden items due (or overdue) for watering today, most overdue first"""
+        conn, cur = get_db_cursor()
+        try:
+            cur.execute('''
+                SELECT ug.id AS garden_id, COALESCE(ug.nickname, p.name) AS name, ug.next_watering_due,
+                       CURRENT_DATE - ug.next_watering_due AS overdue_days, ug.watering_interval_days, ug.last_watered
+                FROM user_gardens ug
+                JOIN plants p ON p.id = ug.plant_id
+                WHERE ug.user_id = %s AND ug.next_watering_due <= CURRENT_DATE
+                ORDER BY ug.next_watering_due ASC
+            ''', (user_id,))
+            return cur.fetchall()
+        except Exception as e:
+            print(f"Error fetching watering due items: {e}")
+            return []
+        finally:
+            close_db(conn, cur)
+
     @classmethod
     def get_last_garden_item(cls, user_id):
         """Return the most recently added Plant in user's garden or None"""
@@ -274,24 +388,84 @@ class User:
             close_db(conn, cur)
 
 
+def insert_schedule_days(cur, schedule_id, days):
+    """Write schedule_days and schedule_tasks rows for a list of {day, tasks} dicts on an open cursor.
+
+    Existing task rows keep their completion state; only their text is updated.
+    New day rows start from the completed tasks already stored for that day
+    (legacy schedule_json migration), since re-writing those tasks nets out in
+    the progress trigger. Returns the highest day number written.
+    """
+    day_rows = []
+    task_rows = []
+    for i, day_obj in enumerate(days or [], start=1):
+        day_num = day_obj.get('day') if isinstance(day_obj, dict) and day_obj.get('day') else i
+        tasks = day_obj.get('tasks') if isinstance(day_obj, dict) else []
+        if not isinstance(tasks, list):
+            tasks = []
+        day_rows.append((schedule_id, day_num, len(tasks), schedule_id, day_num))
+        for idx, t in enumerate(tasks):
+            task_rows.append((schedule_id, day_num, idx, t if isinstance(t, str) else str(t)))
+    if day_rows:
+        cur.executemany('''
+            INSERT INTO schedule_days (schedule_id, day, task_count, completed_count)
+            VALUES (%s, %s, %s, (SELECT COUNT(*) FROM schedule_tasks t WHERE t.schedule_id = %s AND t.day = %s AND t.completed))
+            ON CONFLICT (schedule_id, day) DO UPDATE SET task_count = EXCLUDED.task_count
+        ''', day_rows)
+    if task_rows:
+        cur.executemany('''
+            INSERT INTO schedule_tasks (schedule_id, day, task_index, task_text, completed) VALUES (%s, %s, %s, %s, FALSE)
+            ON CONFLICT (schedule_id, day, task_index) DO UPDATE SET task_text = EXCLUDED.task_text
+        ''', task_rows)
+    refresh_day_offsets(cur, schedule_id)
+    return max((r[1] for r in day_rows), default=0)
+
+
+def refresh_day_offsets(cur, schedule_id):
+    """Recompute schedule_days.tasks_before (tasks on all earlier days) after days change"""
+    cur.execute('''
+        UPDATE schedule_days d
+        SET tasks_before = x.before
+        FROM (
+            SELECT day, COALESCE(SUM(task_count) OVER (ORDER BY day ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING), 0) AS before
+            FROM schedule_days WHERE schedule_id = %s
+        ) x
+        WHERE d.schedule_id = %s AND d.day = x.day AND d.tasks_before <> x.before
+    ''', (schedule_id, schedule_id))
+
+
 class Schedule:
-    def __init__(self, id=None, garden_id=None, user_id=None, schedule_json=None, created_at=None):
+    # Columns loaded for normal use; raw_ai_text is only read for auditing
+    COLUMNS = 'id, garden_id, user_id, created_at, source, stage, duration_days'
+
+    def __init__(self, id=None, garden_id=None, user_id=None, schedule_json=None, created_at=None, source=None, stage=None, duration_days=None, raw_ai_text=None):
         self.id = id
         self.garden_id = garden_id
         self.user_id = user_id
+        # Legacy blob; days and tasks now live in schedule_days/schedule_tasks
         self.schedule_json = schedule_json
         self.created_at = created_at
+        # 'ai', 'rules' or 'ai+rules' (AI output with rule-based days filling gaps)
+        self.source = source
+        self.stage = stage
+        self.duration_days = duration_days
+        self.raw_ai_text = raw_ai_text
 
     @classmethod
-    def create(cls, garden_id, user_id, schedule_json):
+    def create(cls, garden_id, user_id, days, source='ai', stage=None, raw_ai_text=None):
+        """Create a schedule with its days and tasks in one transaction"""
         conn, cur = get_db_cursor()
         try:
-            cur.execute('INSERT INTO schedules (garden_id, user_id, schedule_json) VALUES (%s, %s, %s) RETURNING id, created_at', (garden_id, user_id, schedule_json))
+            cur.execute('INSERT INTO schedules (garden_id, user_id, source, stage, raw_ai_text) VALUES (%s, %s, %s, %s, %s) RETURNING id, created_at', (garden_id, user_id, source, stage, raw_ai_text))
             res = cur.fetchone()
+            if not res:
+                conn.rollback()
+                return None
+            last_day = insert_schedule_days(cur, res['id'], days)
+            cur.execute('UPDATE schedules SET duration_days = %s WHERE id = %s', (last_day, res['id']))
+            cur.execute('UPDATE user_gardens SET current_schedule_id = %s WHERE id = %s AND (current_schedule_id IS NULL OR current_schedule_id < %s)', (res['id'], garden_id, res['id']))
             conn.commit()
-            if res:
-                return cls(id=res['id'], garden_id=garden_id, user_id=user_id, schedule_json=schedule_json, created_at=res['created_at'])
-            return None
+            return cls(id=res['id'], garden_id=garden_id, user_id=user_id, created_at=res['created_at'], source=source, stage=stage, duration_days=last_day)
         except Exception as e:
             conn.rollback()
             print(f"Error creating schedule: {e}")
@@ -303,7 +477,7 @@ class Schedule:
     def get_by_id(cls, schedule_id):
         conn, cur = get_db_cursor()
         try:
-            cur.execute('SELECT * FROM schedules WHERE id = %s', (schedule_id,))
+            cur.execute(f'SELECT {cls.COLUMNS} FROM schedules WHERE id = %s', (schedule_id,))
             row = cur.fetchone()
             if row:
                 return cls(**row)
@@ -318,7 +492,7 @@ class Schedule:
     def get_by_garden(cls, garden_id):
         conn, cur = get_db_cursor()
         try:
-            cur.execute('SELECT * FROM schedules WHERE garden_id = %s ORDER BY id DESC', (garden_id,))
+            cur.execute(f'SELECT {cls.COLUMNS} FROM schedules WHERE garden_id = %s ORDER BY id DESC', (garden_id,))
             rows = cur.fetchall()
             return [cls(**r) for r in rows]
         except Exception as e:
@@ -327,6 +501,156 @@ class Schedule:
         finally:
             close_db(conn, cur)
 
+    @classmethod
+    def get_raw_ai_text(cls, schedule_id):
+        conn, cur = get_db_cursor()
+        try:
+            cur.execute('SELECT raw_ai_text FROM schedules WHERE id = %s', (schedule_id,))
+            row = cur.fetchone()
+            return row['raw_ai_text'] if row else None
+        except Exception as e:
+            print(f"Error getting raw schedule text: {e}")
+            return None
+        finally:
+            close_db(conn, cur)
+
+    @classmethod
+    def get_days(cls, schedule_id, from_day=1, to_day=None):
+        """Return [{day, tasks: [{task_index, task_text, completed}]}] for days in [from_day, to_day]"""
+        conn, cur = get_db_cursor()
+        try:
+            cur.execute('''
+                SELECT d.day, t.task_index, t.task_text, t.completed
+                FROM schedule_days d
+                LEFT JOIN schedule_tasks t ON t.schedule_id = d.schedule_id AND t.day = d.day
+                WHERE d.schedule_id = %s AND d.day >= %s AND (%s::int IS NULL OR d.day <= %s::int)
+                ORDER BY d.day ASC, t.task_index ASC
+            ''', (schedule_id, from_day, to_day, to_day))
+            days = []
+            for r in cur.fetchall():
+                if not days or days[-1]['day'] != r['day']:
+                    days.append({'day': r['day'], 'tasks': []})
+                if r['task_index'] is not None:
+                    days[-1]['tasks'].append({
+                        'task_index': r['task_index'],
+                        'task_text': r['task_text'],
+                        'completed': bool(r['completed'])
+                    })
+            return days
+        except Exception as e:
+            print(f"Error fetching schedule days: {e}")
+            return []
+        finally:
+            close_db(conn, cur)
+
+    @classmethod
+    def get_days_json(cls, schedule_id, from_day=1, to_day=None):
+        """Compact JSON of a day range for AI prompts; completed tasks are prefixed with [done]"""
+        import json
+        days = cls.get_days(schedule_id, from_day, to_day)
+        return json.dumps([
+            {'day': d['day'], 'tasks': [('[done] ' if t['completed'] else '') + t['task_text'] for t in d['tasks']]}
+            for d in days
+        ])
+
+    @classmethod
+    def iter_calendar(cls, user_id, start_date, end_date):
+        """Yield the user's tasks dated between start_date and end_date (inclusive), ordered by date.
+
+        Relative day numbers are mapped to dates in SQL from each current
+        schedule's created_at, and rows are read through a server-side cursor
+        so large ranges can be streamed.
+        """
+        conn = get_db_connection()
+        try:
+            with conn.transaction():
+                cur = conn.cursor(name='garden_calendar')
+                cur.itersize = 500
+                cur.execute('''
+                    SELECT (s.created_at::date + t.day - 1) AS date, ug.id AS garden_id, p.name AS plant_name,
+                           s.id AS schedule_id, t.day, t.task_index, t.task_text, t.completed
+                    FROM user_gardens ug
+                    JOIN plants p ON p.id = ug.plant_id
+                    JOIN schedules s ON s.id = ug.current_schedule_id
+                    JOIN schedule_tasks t ON t.schedule_id = s.id
+                         AND t.day BETWEEN (%s::date - s.created_at::date + 1) AND (%s::date - s.created_at::date + 1)
+                    WHERE ug.user_id = %s
+                    ORDER BY date, p.name, s.id, t.task_index
+                ''', (start_date, end_date, user_id))
+                for row in cur:
+                    yield row
+                cur.close()
+        finally:
+            conn.close()
+
+    def current_day(self):
+        """Day number of today within the schedule (day 1 is the creation date)"""
+        from datetime import datetime
+        created = self.created_at
+        try:
+            created_dt = datetime.fromisoformat(created) if isinstance(created, str) else created
+            now = datetime.now(tz=created_dt.tzinfo) if created_dt.tzinfo else datetime.now()
+            diff = (now.date() - created_dt.date()).days
+            return diff + 1 if diff >= 0 else 1
+        except Exception:
+            return 1
+
+    @classmethod
+    def replace_days_from(cls, schedule_id, from_day, new_days, source):
+        """Replace the schedule's days in new_days (all >= from_day) and diff their tasks in one transaction.
+
+        Days before from_day and days not in new_days are left untouched, so
+        their completion history survives. Within replaced days, unchanged
+        tasks keep their rows, changed text is updated and reset, extra old
+        tasks are deleted and new ones inserted. Returns a dict of counts.
+        """
+        conn, cur = get_db_cursor()
+        try:
+            cur.execute('SELECT source FROM schedules WHERE id = %s FOR UPDATE', (schedule_id,))
+            row = cur.fetchone()
+            if not row:
+                return None
+            old_source = row.get('source') or 'ai'
+            new_source = source if from_day <= 1 or source == old_source else 'ai+rules'
+
+            # Diff tasks of the replaced days against what is stored
+            replaced = sorted({d['day'] for d in new_days})
+            cur.execute('SELECT day, task_index, task_text FROM schedule_tasks WHERE schedule_id = %s AND day = ANY(%s)', (schedule_id, replaced))
+            stored = {(r['day'], r['task_index']): r['task_text'] for r in cur.fetchall()}
+            wanted = {}
+            for d in new_days:
+                for idx, text in enumerate(d.get('tasks') or []):
+                    wanted[(d['day'], idx)] = text
+
+            inserts = [(schedule_id, k[0], k[1], t) for k, t in wanted.items() if k not in stored]
+            updates = [(t, schedule_id, k[0], k[1]) for k, t in wanted.items() if k in stored and stored[k] != t]
+            deletes = [(schedule_id, k[0], k[1]) for k in stored if k not in wanted]
+            if inserts:
+                cur.executemany('INSERT INTO schedule_tasks (schedule_id, day, task_index, task_text, completed) VALUES (%s, %s, %s, %s, FALSE)', inserts)
+            if updates:
+                cur.executemany('UPDATE schedule_tasks SET task_text = %s, completed = FALSE, completed_at = NULL WHERE schedule_id = %s AND day = %s AND task_index = %s', updates)
+            if deletes:
+                cur.executemany('DELETE FROM schedule_tasks WHERE schedule_id = %s AND day = %s AND task_index = %s', deletes)
+            cur.executemany('''
+                INSERT INTO schedule_days (schedule_id, day, task_count) VALUES (%s, %s, %s)
+                ON CONFLICT (schedule_id, day) DO UPDATE SET task_count = EXCLUDED.task_count
+            ''', [(schedule_id, d['day'], len(d.get('tasks') or [])) for d in new_days])
+            refresh_day_offsets(cur, schedule_id)
+            cur.execute('UPDATE schedules SET source = %s, duration_days = GREATEST(COALESCE(duration_days, 0), %s) WHERE id = %s', (new_source, max(replaced, default=0), schedule_id))
+            conn.commit()
+            return {
+                'inserted': len(inserts),
+                'updated': len(updates),
+                'deleted': len(deletes),
+                'unchanged': len(wanted) - len(inserts) - len(updates)
+            }
+        except Exception as e:
+            conn.rollback()
+            print(f"Error replacing schedule days: {e}")
+            raise e
+        finally:
+            close_db(conn, cur)
+
 
 class Plant:
     def __init__(self, id=None, name=None, scientific_name=None, duration_days=None, type=None, photo_url=None, description=None, created_at=None, updated_at=None):
@@ -433,20 +757,11 @@ class Plant:
 class ScheduleTask:
     @classmethod
     def create_many(cls, schedule_id, schedule_list):
-        """Insert tasks for a schedule into schedule_tasks table"""
+        """Insert days and tasks for a schedule into schedule_days/schedule_tasks"""
         conn, cur = get_db_cursor()
         try:
             # schedule_list expected as list of {day, tasks}
-            for i, day_obj in enumerate(schedule_list, start=1):
-                day_num = day_obj.get('day') if isinstance(day_obj, dict) and day_obj.get('day') else i
-                tasks = day_obj.get('tasks') if isinstance(day_obj, dict) else []
-                if not isinstance(tasks, list):
-                    continue
-                for idx, t in enumerate(tasks):
-                    cur.execute('''
-                        INSERT INTO schedule_tasks (schedule_id, day, task_index, task_text, completed) VALUES (%s, %s, %s, %s, %s)
-                        ON CONFLICT (schedule_id, day, task_index) DO UPDATE SET task_text = EXCLUDED.task_text
-                    ''', (schedule_id, day_num, idx, t, False))
+            insert_schedule_days(cur, schedule_id, schedule_list)
             conn.commit()
             return True
         except Exception as e:
@@ -458,91 +773,138 @@ class ScheduleTask:
 
     @classmethod
     def toggle(cls, user_id, schedule_id, day, task_index, completed=False):
+        """Set a task's completion and record a notification in a single statement.
+
+        Ownership check, update and notification insert run as one CTE on one
+        connection; the notification is only written when the task exists and
+        belongs to the user. Returns the message and the task's new state.
+        """
+        prefix = f"Task {'completed' if completed else 'unmarked'} for Day {day}: "
+        url = f"/garden/schedule/{schedule_id}#day-{day}"
+        conn, cur = get_db_cursor()
+        try:
+            cur.execute('''
+                WITH owner AS (
+                    SELECT id FROM schedules WHERE id = %(schedule_id)s AND user_id = %(user_id)s
+                ), upd AS (
+                    UPDATE schedule_tasks t
+                    SET completed = %(completed)s,
+                        completed_at = CASE WHEN %(completed)s THEN CURRENT_TIMESTAMP ELSE NULL END
+                    FROM owner
+                    WHERE t.schedule_id = owner.id AND t.day = %(day)s AND t.task_index = %(task_index)s
+                    RETURNING t.task_text, t.completed
+                ), note AS (
+                    INSERT INTO notifications (user_id, message, schedule_id, day, url)
+                    SELECT %(user_id)s, %(prefix)s || upd.task_text, %(schedule_id)s, %(day)s, %(url)s FROM upd
+                    RETURNING message
+                )
+                SELECT EXISTS (SELECT 1 FROM owner) AS owned,
+                       (SELECT completed FROM upd) AS completed,
+                       (SELECT message FROM note) AS message
+            ''', {'schedule_id': schedule_id, 'user_id': user_id, 'day': day, 'task_index': task_index,
+                  'completed': bool(completed), 'prefix': prefix, 'url': url})
+            res = cur.fetchone()
+            conn.commit()
+            if not res['owned']:
+                return {'error': 'Not authorized'}, 403
+            if res['completed'] is None:
+                return {'error': 'Task not found'}, 404
+            return {'message': res['message'], 'completed': res['completed']}
+        except Exception as e:
+            conn.rollback()
+            print(f"Error toggling task: {e}")
+            return {'error': str(e)}, 500
+        finally:
+            close_db(conn, cur)
+
+    @classmethod
+    def apply_batch(cls, user_id, schedule_id, changes=None, complete_day=None):
+        """Apply many completion changes to a schedule in one transaction.
+
+        changes is a list of (day, task_index, completed); complete_day marks
+        every task of that day completed. Only tasks whose state actually
+        changes are written, and a single summary notification is created.
+        Returns counts of completed/unmarked tasks.
+        """
+        changes = changes or []
         conn, cur = get_db_cursor()
         try:
-            # Ensure schedule belongs to user
-            cur.execute('SELECT user_id, schedule_json FROM schedules WHERE id = %s', (schedule_id,))
+            cur.execute('SELECT user_id FROM schedules WHERE id = %s', (schedule_id,))
             row = cur.fetchone()
             if not row or row.get('user_id') != user_id:
                 return {'error': 'Not authorized'}, 403
 
-            # Attempt to update existing task row
-            if completed:
+            changed = []
+            if changes:
                 cur.execute('''
-                    UPDATE schedule_tasks
-                    SET completed = TRUE, completed_at = CURRENT_TIMESTAMP
-                    WHERE schedule_id = %s AND day = %s AND task_index = %s
-                    RETURNING task_text
-                ''', (schedule_id, day, task_index))
-            else:
+                    UPDATE schedule_tasks t
+                    SET completed = v.completed,
+                        completed_at = CASE WHEN v.completed THEN CURRENT_TIMESTAMP ELSE NULL END
+                    FROM unnest(%s::int[], %s::int[], %s::boolean[]) AS v(day, task_index, completed)
+                    WHERE t.schedule_id = %s AND t.day = v.day AND t.task_index = v.task_index
+                      AND t.completed IS DISTINCT FROM v.completed
+                    RETURNING t.day, t.completed
+                ''', ([c[0] for c in changes], [c[1] for c in changes], [bool(c[2]) for c in changes], schedule_id))
+                changed.extend(cur.fetchall())
+            if complete_day is not None:
                 cur.execute('''
                     UPDATE schedule_tasks
-                    SET completed = FALSE, completed_at = NULL
-                    WHERE schedule_id = %s AND day = %s AND task_index = %s
-                    RETURNING task_text
-                ''', (schedule_id, day, task_index))
-            res = cur.fetchone()
-
-            # If no existing row, derive the task text from schedule_json and insert
-            task_text = None
-            if not res:
-                schedule_json = row.get('schedule_json')
-                try:
-                    import json as _json
-                    parsed = _json.loads(schedule_json) if schedule_json else []
-                    # find day object
-                    target = None
-                    for obj in parsed:
-                        d = obj.get('day') if isinstance(obj, dict) else None
-                        if d == day:
-                            target = obj
-                            break
-                    if target is None and 1 <= day <= len(parsed):
-                        target = parsed[day-1]
-                    tasks_list = target.get('tasks') if isinstance(target, dict) else []
-                    if isinstance(tasks_list, list) and 0 <= task_index < len(tasks_list):
-                        task_text = tasks_list[task_index]
-                    else:
-                        task_text = f'Task {task_index+1}'
-                except Exception:
-                    task_text = f'Task {task_index+1}'
-
-                # Insert the task row with completed state
-                if completed:
-                    cur.execute('''
-                        INSERT INTO schedule_tasks (schedule_id, day, task_index, task_text, completed, completed_at)
-                        VALUES (%s, %s, %s, %s, TRUE, CURRENT_TIMESTAMP)
-                        ON CONFLICT (schedule_id, day, task_index) DO UPDATE SET task_text = EXCLUDED.task_text, completed = EXCLUDED.completed, completed_at = EXCLUDED.completed_at
-                        RETURNING task_text
-                    ''', (schedule_id, day, task_index, task_text))
-                else:
-                    cur.execute('''
-                        INSERT INTO schedule_tasks (schedule_id, day, task_index, task_text, completed)
-                        VALUES (%s, %s, %s, %s, FALSE)
-                        ON CONFLICT (schedule_id, day, task_index) DO UPDATE SET task_text = EXCLUDED.task_text, completed = EXCLUDED.completed
-                        RETURNING task_text
-                    ''', (schedule_id, day, task_index, task_text))
-                res = cur.fetchone()
+                    SET completed = TRUE, completed_at = CURRENT_TIMESTAMP
+                    WHERE schedule_id = %s AND day = %s AND completed IS NOT TRUE
+                    RETURNING day, completed
+                ''', (schedule_id, complete_day))
+                changed.extend(cur.fetchall())
 
+            done = sum(1 for r in changed if r['completed'])
+            undone = len(changed) - done
+            msg = None
+            if changed:
+                days = sorted({r['day'] for r in changed})
+                parts = []
+                if done:
+                    parts.append(f"{done} task{'s' if done != 1 else ''} completed")
+                if undone:
+                    parts.append(f"{undone} task{'s' if undone != 1 else ''} unmarked")
+                where = f"Day {days[0]}" if len(days) == 1 else f"Days {days[0]}-{days[-1]}"
+                msg = f"{' and '.join(parts).capitalize()} for {where}"
+                cur.execute(
+                    'INSERT INTO notifications (user_id, message, schedule_id, day, url) VALUES (%s, %s, %s, %s, %s)',
+                    (user_id, msg, schedule_id, days[0], f"/garden/schedule/{schedule_id}#day-{days[0]}")
+                )
             conn.commit()
-            if not res:
-                return {'error': 'Task not found or could not be created'}, 404
-
-            task_text = res.get('task_text')
-
-            # Create notification about status change and include schedule link
-            from backend.models import Notification
-            msg = f"Task {'completed' if completed else 'unmarked'} for Day {day}: {task_text}"
-            url = f"/garden/schedule/{schedule_id}#day-{day}"
-            Notification.create(user_id, msg, schedule_id=schedule_id, day=day, url=url)
-            return {'message': msg}
+            return {'message': msg, 'completed': done, 'unmarked': undone}
         except Exception as e:
             conn.rollback()
-            print(f"Error toggling task: {e}")
+            print(f"Error applying task batch: {e}")
             return {'error': str(e)}, 500
         finally:
             close_db(conn, cur)
 
+    @classmethod
+    def get_completed_days(cls, schedule_id, from_day=1):
+        """Return the set of day numbers (>= from_day) that have at least one completed task"""
+        conn, cur = get_db_cursor()
+        try:
+            cur.execute('SELECT DISTINCT day FROM schedule_tasks WHERE schedule_id = %s AND day >= %s AND completed = TRUE', (schedule_id, from_day))
+            return {r['day'] for r in cur.fetchall()}
+        except Exception as e:
+            print(f"Error fetching completed days: {e}")
+            return set()
+        finally:
+            close_db(conn, cur)
+
+    @classmethod
+    def get_for_day(cls, schedule_id, day):
+        conn, cur = get_db_cursor()
+        try:
+            cur.execute('SELECT id, schedule_id, day, task_index, task_text, completed, completed_at FROM schedule_tasks WHERE schedule_id = %s AND day = %s ORDER BY task_index ASC', (schedule_id, day))
+            return cur.fetchall()
+        except Exception as e:
+            print(f"Error fetching schedule tasks for day: {e}")
+            return []
+        finally:
+            close_db(conn, cur)
+
     @classmethod
     def get_for_schedule(cls, schedule_id):
         conn, cur = get_db_cursor()
@@ -588,7 +950,7 @@ class Notification:
     def get_for_user(cls, user_id, limit=50):
         conn, cur = get_db_cursor()
         try:
-            cur.execute('SELECT id, message, url, is_read, created_at FROM notifications WHERE user_id = %s ORDER BY created_at DESC LIMIT %s', (user_id, limit))
+            cur.execute('SELECT id, message, url, is_read, created_at FROM notifications WHERE user_id = %s AND is_read = FALSE ORDER BY created_at DESC LIMIT %s', (user_id, limit))
             rows = cur.fetchall()
             return rows
         except Exception as e:
@@ -597,11 +959,25 @@ class Notification:
         finally:
             close_db(conn, cur)
 
+    @classmethod
+    def unread_count(cls, user_id):
+        conn, cur = get_db_cursor()
+        try:
+            cur.execute('SELECT unread_count FROM notification_counters WHERE user_id = %s', (user_id,))
+            row = cur.fetchone()
+            return row['unread_count'] if row else 0
+        except Exception as e:
+            print(f"Error fetching unread notification count: {e}")
+            return 0
+        finally:
+            close_db(conn, cur)
+
     @classmethod
     def clear_all_for_user(cls, user_id):
         conn, cur = get_db_cursor()
         try:
-            cur.execute('UPDATE notifications SET is_read = TRUE WHERE user_id = %s', (user_id,))
+            # Only touch unread rows; already-read history is left alone
+            cur.execute('UPDATE notifications SET is_read = TRUE WHERE user_id = %s AND is_read = FALSE', (user_id,))
             conn.commit()
             return True
         except Exception as e:
@@ -612,6 +988,194 @@ class Notification:
             close_db(conn, cur)
 
 
+    @classmethod
+    def purge_read(cls, older_than_days, batch_size=1000, archive=False):
+        """Delete (or move to notifications_archive) read notifications older than N days.
+
+        Works in batches of batch_size rows, committing after each, so the
+        job never holds long locks. Returns the number of rows removed.
+        """
+        total = 0
+        conn, cur = get_db_cursor()
+        try:
+            while True:
+                batch = '''
+                    WITH batch AS (
+                        SELECT id FROM notifications
+                        WHERE is_read = TRUE AND created_at < CURRENT_TIMESTAMP - make_interval(days => %s)
+                        ORDER BY id
+                        LIMIT %s
+                        FOR UPDATE SKIP LOCKED
+                    ), moved AS (
+                        DELETE FROM notifications n USING batch WHERE n.id = batch.id
+                        RETURNING n.id, n.user_id, n.message, n.schedule_id, n.day, n.url, n.is_read, n.created_at
+                    )
+                '''
+                if archive:
+                    cur.execute(batch + '''
+                        , archived AS (
+                            INSERT INTO notifications_archive (id, user_id, message, schedule_id, day, url, is_read, created_at)
+                            SELECT * FROM moved
+                            ON CONFLICT (id) DO NOTHING
+                        )
+                        SELECT COUNT(*) AS n FROM moved
+                    ''', (older_than_days, batch_size))
+                else:
+                    cur.execute(batch + 'SELECT COUNT(*) AS n FROM moved', (older_than_days, batch_size))
+                n = cur.fetchone()['n']
+                conn.commit()
+                total += n
+                if n < batch_size:
+                    break
+            return total
+        except Exception as e:
+            conn.rollback()
+            print(f"Error purging notifications: {e}")
+            return total
+        finally:
+            close_db(conn, cur)
+
+
+class ChatSummary:
+    """Rolling summary of a user's general AI assistant conversation"""
+
+    @classmethod
+    def get_for_user(cls, user_id):
+        conn, cur = get_db_cursor()
+        try:
+            cur.execute('SELECT user_id, summary, last_message_id, updated_at FROM general_chat_summaries WHERE user_id = %s', (user_id,))
+            return cur.fetchone()
+        except Exception as e:
+            print(f"Error fetching chat summary: {e}")
+            return None
+        finally:
+            close_db(conn, cur)
+
+    @classmethod
+    def get_messages_after(cls, user_id, after_id, limit):
+        """Return up to limit general chat messages newer than after_id (oldest first)"""
+        conn, cur = get_db_cursor()
+        try:
+            cur.execute('SELECT id, role, message FROM general_chats WHERE user_id = %s AND id > %s ORDER BY id ASC LIMIT %s',
+                        (user_id, after_id or 0, limit))
+            return cur.fetchall() or []
+        except Exception as e:
+            print(f"Error fetching unsummarized chats: {e}")
+            return []
+        finally:
+            close_db(conn, cur)
+
+    @classmethod
+    def get_recent(cls, user_id, after_id, limit, before_id=None):
+        """Return the last limit messages newer than after_id and older than before_id (oldest first)"""
+        conn, cur = get_db_cursor()
+        try:
+            cur.execute('''
+                SELECT id, role, message FROM general_chats
+                WHERE user_id = %s AND id > %s AND (%s::int IS NULL OR id < %s)
+                ORDER BY id DESC LIMIT %s
+            ''', (user_id, after_id or 0, before_id, before_id, limit))
+            return list(reversed(cur.fetchall() or []))
+        except Exception as e:
+            print(f"Error fetching recent chats: {e}")
+            return []
+        finally:
+            close_db(conn, cur)
+
+    @classmethod
+    def count_pending(cls, user_id):
+        """Number of general chat messages not yet folded into the user's summary"""
+        conn, cur = get_db_cursor()
+        try:
+            cur.execute('''
+                SELECT COUNT(*) AS n FROM general_chats
+                WHERE user_id = %s
+                  AND id > COALESCE((SELECT last_message_id FROM general_chat_summaries WHERE user_id = %s), 0)
+            ''', (user_id, user_id))
+            return cur.fetchone()['n']
+        except Exception as e:
+            print(f"Error counting unsummarized chats: {e}")
+            return 0
+        finally:
+            close_db(conn, cur)
+
+    @classmethod
+    def save(cls, user_id, summary, last_message_id):
+        conn, cur = get_db_cursor()
+        try:
+            cur.execute('''
+                INSERT INTO general_chat_summaries (user_id, summary, last_message_id, updated_at)
+                VALUES (%s, %s, %s, CURRENT_TIMESTAMP)
+                ON CONFLICT (user_id) DO UPDATE
+                SET summary = EXCLUDED.summary, last_message_id = EXCLUDED.last_message_id, updated_at = CURRENT_TIMESTAMP
+                WHERE general_chat_summaries.last_message_id < EXCLUDED.last_message_id
+            ''', (user_id, summary, last_message_id))
+            conn.commit()
+            return True
+        except Exception as e:
+            conn.rollback()
+            print(f"Error saving chat summary: {e}")
+            return False
+        finally:
+            close_db(conn, cur)
+
+
+class AICall:
+    """Aggregates over the ai_calls ledger written by backend/ai_ledger.py"""
+
+    @classmethod
+    def usage_by_feature(cls, days=7, input_price=0.0, output_price=0.0):
+        """Per-feature call counts, p50/p95 latency, tokens and estimated cost over the last `days` days.
+
+        Prices are per million tokens. Cache hits are counted but left out of
+        the latency percentiles, since they never reach Gemini.
+        """
+        conn, cur = get_db_cursor()
+        try:
+            cur.execute('''
+                SELECT feature,
+                       COUNT(*) AS calls,
+                       COUNT(*) FILTER (WHERE cache_hit) AS cache_hits,
+                       COUNT(*) FILTER (WHERE cache_hit = FALSE) AS cache_misses,
+                       COUNT(*) FILTER (WHERE error_class IS NOT NULL) AS errors,
+                       COUNT(*) FILTER (WHERE retries > 0) AS retried,
+                       percentile_cont(0.5) WITHIN GROUP (ORDER BY latency_ms) FILTER (WHERE cache_hit IS NOT TRUE) AS p50_ms,
+                       percentile_cont(0.95) WITHIN GROUP (ORDER BY latency_ms) FILTER (WHERE cache_hit IS NOT TRUE) AS p95_ms,
+                       COALESCE(SUM(prompt_tokens), 0) AS prompt_tokens,
+                       COALESCE(SUM(response_tokens), 0) AS response_tokens
+                FROM ai_calls
+                WHERE created_at >= CURRENT_TIMESTAMP - make_interval(days => %s)
+                GROUP BY feature
+                ORDER BY calls DESC
+            ''', (int(days),))
+            rows = cur.fetchall() or []
+            for r in rows:
+                r['cost'] = round((r['prompt_tokens'] * input_price + r['response_tokens'] * output_price) / 1_000_000, 4)
+            return rows
+        except Exception as e:
+            print(f"Error aggregating AI calls: {e}")
+            return []
+        finally:
+            close_db(conn, cur)
+
+
+class CatalogVersion:
+    """Versions of the plant and product catalogs, bumped by triggers on every change"""
+
+    @classmethod
+    def current(cls):
+        """Return {'plants': n, 'products': m}, or {} when the versions cannot be read"""
+        conn, cur = get_db_cursor()
+        try:
+            cur.execute('SELECT name, version FROM catalog_versions')
+            return {r['name']: r['version'] for r in cur.fetchall()}
+        except Exception as e:
+            print(f"Error reading catalog versions: {e}")
+            return {}
+        finally:
+            close_db(conn, cur)
+
+
 class Product:
     def __init__(self, id=None, name=None, type=None, image_url=None, buy_url=None, price=None, quantity=None, unit=None, brand=None, description=None, created_at=None, updated_at=None):
         self.id = id
@@ -0,0 +1,81 @@
+"""Push new notifications to open browsers.
+
+A trigger on `notifications` sends each insert through PostgreSQL
+NOTIFY. One listener thread per process holds a single LISTEN connection
+and fans the payloads out to per-user subscriber queues, which the SSE
+endpoint drains.
+"""
+import json
+import queue
+import threading
+import time
+from collections import defaultdict
+
+from database.connection import get_db_connection
+
+CHANNEL = 'notifications'
+
+
+class NotificationHub:
+    def __init__(self, channel=CHANNEL, queue_size=100):
+        self.channel = channel
+        self.queue_size = queue_size
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def subscribe(self, user_id):
+        q = queue.Queue(maxsize=self.queue_size)
+        with self._lock:
+            self._subscribers[user_id].add(q)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._listen, daemon=True)
+                self._thread.start()
+        return q
+
+    def unsubscribe(self, user_id, q):
+        with self._lock:
+            subs = self._subscribers.get(user_id)
+            if subs:
+                subs.discard(q)
+                if not subs:
+                    del self._subscribers[user_id]
+
+    def publish(self, payload):
+        """Deliver a decoded NOTIFY payload to every subscriber of its user"""
+        with self._lock:
+            targets = list(self._subscribers.get(payload.get('user_id'), ()))
+        for q in targets:
+            try:
+                q.put_nowait(payload)
+            except queue.Full:
+                # Slow client: drop rather than block the listener
+                pass
+
+    def _listen(self):
+        backoff = 1
+        while True:
+            conn = None
+            try:
+                conn = get_db_connection()
+                conn.autocommit = True
+                conn.execute(f'LISTEN {self.channel}')
+                backoff = 1
+                for note in conn.notifies():
+                    try:
+                        self.publish(json.loads(note.payload))
+                    except ValueError:
+                        continue
+            except Exception as e:
+                print(f"Notification listener error, reconnecting in {backoff}s: {e}")
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 30)
+            finally:
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+
+
+hub = NotificationHub()
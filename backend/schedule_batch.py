@@ -0,0 +1,140 @@
+"""Background batch schedule generation for a whole garden.
+
+Jobs are split into one task per garden item and run on a bounded pool of
+worker threads. Users are served round-robin with a per-user concurrency cap,
+so one large garden cannot starve everyone else. Each schedule and its tasks
+are committed as soon as that item finishes.
+"""
+import threading
+import time
+import uuid
+from collections import defaultdict, deque
+
+from config import Config
+
+
+class BatchScheduler:
+    def __init__(self, workers=4, per_user_limit=2, job_ttl_seconds=3600):
+        self.workers = max(1, workers)
+        self.per_user_limit = max(1, per_user_limit)
+        self.job_ttl_seconds = job_ttl_seconds
+        self._cond = threading.Condition()
+        self._queues = defaultdict(deque)
+        self._order = deque()
+        self._running = defaultdict(int)
+        self._jobs = {}
+        self._threads = []
+
+    def submit(self, user_id, items, stage, mode, api_key, model):
+        """Queue schedule generation for items; returns the job's progress dict.
+
+        If the user already has an unfinished job, that job is returned instead.
+        """
+        with self._cond:
+            self._prune_jobs()
+            for job in self._jobs.values():
+                if job['user_id'] == user_id and job['status'] == 'running':
+                    return self._snapshot(job)
+            job = {
+                'id': uuid.uuid4().hex,
+                'user_id': user_id,
+                'status': 'running' if items else 'done',
+                'total': len(items),
+                'completed': 0,
+                'failed': 0,
+                'schedules': [],
+                'errors': [],
+                'created_at': time.time(),
+                'finished_at': None if items else time.time()
+            }
+            self._jobs[job['id']] = job
+            for item in items:
+                self._queues[user_id].append((job, item, stage, mode, api_key, model))
+            if user_id not in self._order:
+                self._order.append(user_id)
+            self._ensure_workers()
+            self._cond.notify_all()
+            return self._snapshot(job)
+
+    def get_job(self, job_id, user_id):
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if not job or job['user_id'] != user_id:
+                return None
+            return self._snapshot(job)
+
+    def _snapshot(self, job):
+        snap = {k: v for k, v in job.items() if k not in ('schedules', 'errors')}
+        snap['schedules'] = list(job['schedules'])
+        snap['errors'] = list(job['errors'])
+        snap['done'] = job['completed'] + job['failed']
+        return snap
+
+    def _prune_jobs(self):
+        cutoff = time.time() - self.job_ttl_seconds
+        for job_id in [j['id'] for j in self._jobs.values() if j['finished_at'] and j['finished_at'] < cutoff]:
+            del self._jobs[job_id]
+
+    def _ensure_workers(self):
+        while len(self._threads) < self.workers:
+            t = threading.Thread(target=self._worker, daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def _pick(self):
+        """Round-robin over users with queued work and spare per-user capacity"""
+        for _ in range(len(self._order)):
+            user_id = self._order[0]
+            self._order.rotate(-1)
+            queue = self._queues.get(user_id)
+            if not queue:
+                self._order.remove(user_id)
+                self._queues.pop(user_id, None)
+                continue
+            if self._running[user_id] >= self.per_user_limit:
+                continue
+            self._running[user_id] += 1
+            return user_id, queue.popleft()
+        return None
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                picked = self._pick()
+                while picked is None:
+                    self._cond.wait()
+                    picked = self._pick()
+            user_id, task = picked
+            job, item = task[0], task[1]
+            try:
+                schedule_id = self._run(user_id, *task[1:])
+                with self._cond:
+                    job['completed'] += 1
+                    job['schedules'].append({'garden_id': item['garden_id'], 'schedule_id': schedule_id})
+            except Exception as e:
+                print(f"Batch schedule generation failed for garden item {item.get('garden_id')}: {e}")
+                with self._cond:
+                    job['failed'] += 1
+                    job['errors'].append({'garden_id': item.get('garden_id'), 'error': str(e)})
+            finally:
+                with self._cond:
+                    self._running[user_id] -= 1
+                    if job['completed'] + job['failed'] >= job['total']:
+                        job['status'] = 'done'
+                        job['finished_at'] = time.time()
+                    self._cond.notify_all()
+
+    def _run(self, user_id, item, stage, mode, api_key, model):
+        from backend import schedule_gen
+        from backend.models import Schedule
+        plant = item['plant']
+        duration = int(plant.get('duration_days') or 30)
+        days, ai_text, source = schedule_gen.build_schedule_days(mode, api_key, plant, item, stage, duration, model=model,
+                                                                 feature='schedule_batch')
+        schedule = Schedule.create(item['garden_id'], user_id, days, source=source, stage=stage, raw_ai_text=ai_text)
+        if not schedule:
+            raise Exception('Failed to save schedule')
+        return schedule.id
+
+
+batch_scheduler = BatchScheduler(Config.SCHEDULE_BATCH_WORKERS, Config.SCHEDULE_BATCH_PER_USER)
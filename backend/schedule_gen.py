@@ -0,0 +1,286 @@
+"""Day-by-day care schedule generation with Gemini structured output.
+
+The model is asked for a schema-constrained JSON array which is parsed
+incrementally as it streams in. Days that are missing after a truncated or
+failed response are requested again on their own instead of regenerating
+the whole schedule. Long schedules are split into day windows generated
+concurrently.
+"""
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from config import Config
+from backend import ai, schedule_rules
+from backend.schedule_rules import ALLOWED_STAGES, stage_for_day
+
+SCHEDULE_MODES = ('ai', 'rules')
+
+SCHEDULE_SCHEMA = {
+    'type': 'ARRAY',
+    'items': {
+        'type': 'OBJECT',
+        'properties': {
+            'day': {'type': 'INTEGER'},
+            'tasks': {'type': 'ARRAY', 'items': {'type': 'STRING'}}
+        },
+        'required': ['day', 'tasks']
+    }
+}
+
+
+class ScheduleStreamParser:
+    """Incrementally parse a (possibly truncated) JSON array of {day, tasks} objects.
+
+    feed() accepts raw text chunks and returns the day objects completed by
+    that chunk. Objects outside the expected day range, duplicates and
+    malformed entries are dropped.
+    """
+
+    def __init__(self, expected_days=None):
+        self.expected_days = set(expected_days) if expected_days else None
+        self.days = {}
+        self._buf = ''
+        self._pos = None
+        self._decoder = json.JSONDecoder()
+
+    def start_response(self):
+        """Drop buffered text before parsing a new response; parsed days are kept"""
+        self._buf = ''
+        self._pos = None
+
+    def feed(self, chunk):
+        self._buf += chunk or ''
+        return self._drain()
+
+    def _drain(self):
+        completed = []
+        if self._pos is None:
+            start = self._buf.find('[')
+            if start == -1:
+                return completed
+            self._pos = start + 1
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos] in ' \t\r\n,':
+                self._pos += 1
+            if self._pos >= len(self._buf) or self._buf[self._pos] == ']':
+                break
+            try:
+                obj, end = self._decoder.raw_decode(self._buf, self._pos)
+            except ValueError:
+                # Incomplete object: wait for more text
+                break
+            self._pos = end
+            day = clean_day(obj)
+            if not day or day['day'] in self.days:
+                continue
+            if self.expected_days is not None and day['day'] not in self.expected_days:
+                continue
+            self.days[day['day']] = day
+            completed.append(day)
+        return completed
+
+
+def clean_day(obj):
+    """Return a normalized {day, tasks} dict or None if obj is not a usable day entry"""
+    if not isinstance(obj, dict):
+        return None
+    try:
+        day = int(obj.get('day'))
+    except (TypeError, ValueError):
+        return None
+    tasks = obj.get('tasks')
+    if day < 1 or not isinstance(tasks, list):
+        return None
+    tasks = [str(t).strip() for t in tasks if t is not None and str(t).strip()]
+    return {'day': day, 'tasks': tasks}
+
+
+def format_day_ranges(days):
+    """Compact a sorted list of day numbers, e.g. [1, 2, 3, 7] -> '1-3, 7'"""
+    ranges = []
+    for d in sorted(days):
+        if ranges and d == ranges[-1][1] + 1:
+            ranges[-1][1] = d
+        else:
+            ranges.append([d, d])
+    return ', '.join(f"{a}-{b}" if a != b else str(a) for a, b in ranges)
+
+
+def plan_windows(days, window_size):
+    """Split a sorted list of day numbers into consecutive chunks of at most window_size days"""
+    window_size = max(1, int(window_size))
+    return [days[i:i + window_size] for i in range(0, len(days), window_size)]
+
+
+def window_carry_over(plant, item, stage, duration, window):
+    """Short context for a window so it continues where the previous one leaves off.
+
+    Derived from the stage plan and watering cadence rather than from the
+    previous window's output, so all windows can be generated concurrently.
+    """
+    first = window[0]
+    if first <= 1:
+        return ''
+    prev_stage = stage_for_day(stage, first - 1, duration)
+    cur_stage = stage_for_day(stage, first, duration)
+    lines = [
+        f"Days 1-{first - 1} were already planned separately; the plant is at the '{prev_stage}' stage by day {first - 1}.",
+        f"This part starts at day {first} in the '{cur_stage}' stage. Do not repeat one-time setup tasks such as seeding or initial planting."
+    ]
+    interval = (item or {}).get('watering_interval_days')
+    try:
+        interval = int(interval) if interval else None
+    except (TypeError, ValueError):
+        interval = None
+    if interval and interval > 0:
+        next_water = first + (-(first - 1)) % interval
+        lines.append(f"Watering runs every {interval} days counting from day 1; the next watering day is day {next_water}.")
+    return ' '.join(lines)
+
+
+def build_prompt(plant, item, stage, duration, days, carry_over=''):
+    try:
+        plant_json = json.dumps(plant, default=str)
+    except Exception:
+        plant_json = '{}'
+    try:
+        item_json = json.dumps(item, default=str)
+    except Exception:
+        item_json = '{}'
+    return (
+        "You are a helpful assistant that creates detailed, practical, day-by-day care schedules for plants. "
+        "Important constraints: Use ONLY the plant data (PLANT_JSON) and the user's garden item data (ITEM_JSON) provided below. "
+        "Do NOT use any outside knowledge, web searches, or assumptions about plant varieties beyond what is in the JSON. "
+        "If a field is missing, assume safe, minimal care actions.\n\n"
+        f"User-selected current plant stage: {stage}.\n"
+        "Stage requirements: If stage is 'seed', Day 1 must include a task that clearly indicates 'Seeding' and appropriate initial watering. "
+        "If 'seedling', start with seedling/transplant care. If 'vegetative', focus on growth maintenance. "
+        "If 'flowering' or 'fruiting', include tasks relevant to those stages (e.g., support, pruning, harvesting readiness checks). "
+        "Avoid tasks that are inappropriate for the selected stage.\n\n"
+        + (f"Continuity: {carry_over}\n\n" if carry_over else '') +
+        f"The full schedule spans {duration} days, numbered from 1. "
+        f"Return one object per day for EXACTLY these days: {format_day_ranges(days)} ({len(days)} objects), in order. "
+        "Each object is {\"day\": <number>, \"tasks\": [<string>, ...]}. "
+        "Tasks should be concise action items (e.g., \"water 200ml\", \"check soil moisture\", \"fertilize once\").\n\n"
+        f"Context (use only these):\nPLANT_JSON: {plant_json}\n\nITEM_JSON: {item_json}\n\n"
+        "Tailor tasks to the plant and item fields (for example: watering_interval_days, duration_days, type, quantity, planted_on) "
+        "and the selected stage. Do not reference other plants or external sources."
+    )
+
+
+def generate_days(api_key, plant, item, stage, duration, days, model=None, carry_over='', feature='schedule'):
+    """Generate the given day numbers, re-requesting only the days still missing after each round.
+
+    Returns (day_objects_sorted, raw_text). Client errors from the API
+    (bad key, unknown model, ...) are raised immediately; transient failures
+    just leave their days missing for the next round. An open circuit ends
+    the rounds early and leaves the remaining days missing.
+    """
+    wanted = sorted(set(days))
+    parser = ScheduleStreamParser(expected_days=wanted)
+    raw_parts = []
+    rounds = 1 + max(0, Config.SCHEDULE_FILL_ROUNDS)
+    for attempt in range(rounds):
+        missing = [d for d in wanted if d not in parser.days]
+        if not missing:
+            break
+        prompt = build_prompt(plant, item, stage, duration, missing, carry_over=carry_over)
+        parser.start_response()
+        try:
+            for chunk in ai.stream_json(api_key, prompt, SCHEDULE_SCHEMA, model=model, timeout=Config.SCHEDULE_STREAM_TIMEOUT,
+                                        feature=feature, retries=attempt):
+                raw_parts.append(chunk)
+                parser.feed(chunk)
+        except ai.CircuitOpenError:
+            print(f"Schedule generation round {attempt + 1} skipped: Gemini circuit breaker is open")
+            break
+        except requests.HTTPError as e:
+            status = getattr(e.response, 'status_code', None)
+            if status in (400, 401, 403, 404):
+                body = ''
+                try:
+                    body = e.response.text
+                except Exception:
+                    body = ''
+                raise Exception(f'Gemini API returned {status}: {body}')
+            print(f"Schedule generation round {attempt + 1} failed: {e}")
+            if attempt + 1 < rounds:
+                time.sleep(0.5 * (2 ** attempt))
+        except Exception as e:
+            print(f"Schedule generation round {attempt + 1} failed: {e}")
+            if attempt + 1 < rounds:
+                time.sleep(0.5 * (2 ** attempt))
+    return [parser.days[d] for d in sorted(parser.days)], ''.join(raw_parts)
+
+
+def generate_windowed(api_key, plant, item, stage, duration, days, model=None, feature='schedule'):
+    """Generate day numbers in SCHEDULE_WINDOW_DAYS windows on a bounded thread pool and stitch them.
+
+    Wall-clock time scales with the window size rather than the schedule
+    length; each window re-requests only its own missing days.
+    """
+    wanted = sorted(set(days))
+    windows = plan_windows(wanted, Config.SCHEDULE_WINDOW_DAYS)
+    if len(windows) <= 1:
+        return generate_days(api_key, plant, item, stage, duration, wanted, model=model,
+                             carry_over=window_carry_over(plant, item, stage, duration, wanted) if wanted else '',
+                             feature=feature)
+
+    def run(w):
+        return generate_days(api_key, plant, item, stage, duration, w, model,
+                             window_carry_over(plant, item, stage, duration, w), feature)
+
+    results = []
+    if ai.gemini_circuit.state == 'half_open':
+        # Only one trial call gets through; let it decide the circuit before fanning out
+        results.append(run(windows[0]))
+        windows = windows[1:]
+    workers = max(1, min(Config.SCHEDULE_WINDOW_WORKERS, len(windows)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results.extend(pool.map(run, windows))
+
+    stitched = {}
+    raw_parts = []
+    for window_days, raw_text in results:
+        raw_parts.append(raw_text)
+        for d in window_days:
+            stitched.setdefault(d['day'], d)
+    missing = [d for d in wanted if d not in stitched]
+    if missing:
+        print(f"Warning: windowed schedule generation is missing {len(missing)} day(s): {format_day_ranges(missing)}")
+    return [stitched[d] for d in sorted(stitched)], '\n'.join(raw_parts)
+
+
+def generate_schedule(api_key, plant, item, stage, duration, model=None, feature='schedule'):
+    """Generate a full schedule of `duration` days; returns (day_objects, raw_text)"""
+    return generate_windowed(api_key, plant, item, stage, duration, range(1, int(duration) + 1), model=model, feature=feature)
+
+
+def build_schedule_days(mode, api_key, plant, item, stage, duration, days=None, model=None, feature='schedule'):
+    """Build schedule days with the requested mode, falling back to the rule engine.
+
+    Returns (day_objects, raw_ai_text, source) where source is 'ai', 'rules'
+    or 'ai+rules' when AI output was incomplete and rule-based days filled
+    the gaps. Rules are used directly when requested, when no API key is
+    configured or when the Gemini circuit breaker is open. feature labels
+    the calls in the ai_calls ledger.
+    """
+    wanted = sorted(set(days)) if days is not None else list(range(1, int(duration) + 1))
+    if mode == 'rules' or not api_key or ai.gemini_circuit.state == 'open':
+        return schedule_rules.build_schedule(plant, item, stage, duration, wanted), None, 'rules'
+    try:
+        ai_days, raw_text = generate_windowed(api_key, plant, item, stage, duration, wanted, model=model, feature=feature)
+    except Exception as e:
+        print(f"AI schedule generation failed, using rule-based schedule: {e}")
+        return schedule_rules.build_schedule(plant, item, stage, duration, wanted), None, 'rules'
+    got = {d['day'] for d in ai_days}
+    missing = [d for d in wanted if d not in got]
+    if not ai_days:
+        return schedule_rules.build_schedule(plant, item, stage, duration, wanted), raw_text, 'rules'
+    if missing:
+        filled = ai_days + schedule_rules.build_schedule(plant, item, stage, duration, missing)
+        return sorted(filled, key=lambda d: d['day']), raw_text, 'ai+rules'
+    return ai_days, raw_text, 'ai'
@@ -0,0 +1,116 @@
+"""Deterministic, rule-based care schedules.
+
+Builds a day-by-day plan from the plant type, duration, selected stage and the
+garden item's watering interval and quantity using per-type templates. Used as
+an instant alternative to AI generation and as its fallback.
+"""
+
+ALLOWED_STAGES = ('seed', 'seedling', 'vegetative', 'flowering', 'fruiting', 'mature')
+
+# Recurring care cadence (in days) per plant category; None disables the task
+TEMPLATES = {
+    'vegetable': {'water_every': 2, 'water_ml': 250, 'fertilize_every': 14, 'inspect_every': 3, 'prune_every': None,
+                  'keywords': ('vegetable', 'veg', 'tomato', 'pepper', 'chili', 'lettuce', 'leafy', 'spinach', 'bean', 'pea',
+                               'cucumber', 'squash', 'carrot', 'root', 'onion', 'potato', 'crop')},
+    'herb': {'water_every': 2, 'water_ml': 150, 'fertilize_every': 21, 'inspect_every': 4, 'prune_every': 7,
+             'keywords': ('herb', 'basil', 'mint', 'coriander', 'cilantro', 'parsley', 'thyme', 'rosemary', 'oregano', 'tulsi')},
+    'fruit': {'water_every': 3, 'water_ml': 500, 'fertilize_every': 21, 'inspect_every': 4, 'prune_every': 30,
+              'keywords': ('fruit', 'berry', 'strawberry', 'citrus', 'lemon', 'mango', 'banana', 'melon', 'grape')},
+    'flower': {'water_every': 2, 'water_ml': 200, 'fertilize_every': 14, 'inspect_every': 4, 'prune_every': 10,
+               'keywords': ('flower', 'ornamental', 'rose', 'marigold', 'hibiscus', 'jasmine', 'sunflower', 'annual', 'bulb')},
+    'succulent': {'water_every': 10, 'water_ml': 100, 'fertilize_every': 45, 'inspect_every': 7, 'prune_every': None,
+                  'keywords': ('succulent', 'cactus', 'cacti', 'aloe', 'jade')},
+    'tree': {'water_every': 4, 'water_ml': 1000, 'fertilize_every': 45, 'inspect_every': 7, 'prune_every': 60,
+             'keywords': ('tree', 'shrub', 'bush', 'perennial', 'woody', 'hedge', 'bonsai')},
+    'houseplant': {'water_every': 5, 'water_ml': 200, 'fertilize_every': 30, 'inspect_every': 7, 'prune_every': 30,
+                   'keywords': ('indoor', 'houseplant', 'foliage', 'fern', 'palm', 'monstera', 'pothos')},
+    'default': {'water_every': 3, 'water_ml': 200, 'fertilize_every': 21, 'inspect_every': 5, 'prune_every': None,
+                'keywords': ()}
+}
+
+# One-time tasks on the first day a stage is reached
+STAGE_START_TASKS = {
+    'seed': ['Seeding: sow seeds at the depth shown on the packet', 'Water gently until the soil is evenly moist'],
+    'seedling': ['Check seedlings and thin or transplant any that are crowded', 'Give seedlings bright, indirect light'],
+    'vegetative': ['Check stems and new leaves for healthy growth', 'Loosen the topsoil around the base'],
+    'flowering': ['Add stakes or supports for heavy stems', 'Switch to a bloom-friendly fertilizer'],
+    'fruiting': ['Support branches carrying fruit', 'Start checking fruits for ripeness'],
+    'mature': ['Assess overall plant health and shape']
+}
+
+# Extra recurring tasks while in a stage: (every_n_days, task)
+STAGE_RECURRING_TASKS = {
+    'seed': [(1, 'Keep the soil surface moist; do not let it dry out')],
+    'seedling': [(2, 'Check seedlings for damping-off or leggy growth')],
+    'vegetative': [],
+    'flowering': [(5, 'Remove spent flowers')],
+    'fruiting': [(3, 'Harvest any ripe produce')],
+    'mature': [(14, 'Remove dead or yellowing leaves')]
+}
+
+
+def stage_for_day(stage, day, duration):
+    """Spread the stages from the selected one up to 'mature' evenly over the schedule"""
+    idx = ALLOWED_STAGES.index(stage) if stage in ALLOWED_STAGES else 0
+    remaining = len(ALLOWED_STAGES) - idx
+    step = min(remaining - 1, (max(day, 1) - 1) * remaining // max(int(duration), 1))
+    return ALLOWED_STAGES[idx + step]
+
+
+def category_for(plant_type):
+    text = (plant_type or '').lower()
+    for name, tpl in TEMPLATES.items():
+        if any(k in text for k in tpl['keywords']):
+            return name
+    return 'default'
+
+
+def _positive_int(value):
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        return None
+    return value if value > 0 else None
+
+
+def build_schedule(plant, item, stage, duration, days=None):
+    """Return a list of {day, tasks} dicts for the given day numbers (default: the whole duration)"""
+    plant = plant or {}
+    item = item or {}
+    duration = max(1, int(duration))
+    stage = stage if stage in ALLOWED_STAGES else 'seed'
+    tpl = TEMPLATES[category_for(plant.get('type'))]
+    water_every = _positive_int(item.get('watering_interval_days')) or tpl['water_every']
+    quantity = _positive_int(item.get('quantity')) or 1
+    name = plant.get('name') or 'the plant'
+
+    if quantity > 1:
+        water_task = f"Water all {quantity} {name} plants (about {tpl['water_ml']} ml each)"
+    else:
+        water_task = f"Water {name} (about {tpl['water_ml']} ml)"
+
+    schedule = []
+    for day in sorted(set(days)) if days is not None else range(1, duration + 1):
+        day_stage = stage_for_day(stage, day, duration)
+        tasks = []
+        if day == 1 or stage_for_day(stage, day - 1, duration) != day_stage:
+            tasks.extend(STAGE_START_TASKS[day_stage])
+        if (day - 1) % water_every == 0:
+            tasks.append(water_task)
+        else:
+            tasks.append('Check soil moisture')
+        for every, task in STAGE_RECURRING_TASKS[day_stage]:
+            if every > 1 and day % every == 0:
+                tasks.append(task)
+            elif every == 1 and task not in tasks:
+                tasks.append(task)
+        if tpl['fertilize_every'] and day_stage != 'seed' and day % tpl['fertilize_every'] == 0:
+            tasks.append('Apply a balanced fertilizer at half strength')
+        if tpl['inspect_every'] and day % tpl['inspect_every'] == 0:
+            tasks.append('Inspect leaves for pests and disease')
+        if tpl['prune_every'] and day_stage not in ('seed', 'seedling') and day % tpl['prune_every'] == 0:
+            tasks.append('Prune damaged or overgrown growth')
+        if day == duration:
+            tasks.append('Review the season and plan the next planting')
+        schedule.append({'day': day, 'tasks': tasks})
+    return schedule
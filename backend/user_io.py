@@ -0,0 +1,164 @@
+"""Bulk user provisioning and streaming user export.
+
+Imports read CSV/JSONL rows (username, email, password, role) in chunks.
+Rows whose username or email is already taken are skipped before hashing.
+Password hashing, the expensive part, runs on one process pool shared by
+every import in the process (a few passwords are hashed inline). Hashed rows
+are loaded with COPY into a staging table and inserted with ON CONFLICT DO
+NOTHING, and any row that was not inserted is reported. Exports never
+include password hashes.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from werkzeug.security import generate_password_hash
+
+from backend.catalog_io import stream_rows
+from database.connection import get_db_connection
+
+ROLES = ('user', 'sub_admin', 'market_sub_admin')
+EXPORT_COLUMNS = ('id', 'username', 'email', 'role', 'created_at')
+MAX_REPORTED_ERRORS = 1000
+# Chunks with fewer passwords than this are hashed inline, without the pool
+POOL_MIN_PASSWORDS = 32
+
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def _hash_pool(workers=None):
+    """The process pool shared by every import in this process, started on first use"""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None:
+            _pool_workers = workers or max(1, (os.cpu_count() or 2) - 1)
+            # spawn: forking a multi-threaded web server process is not safe
+            _pool = ProcessPoolExecutor(max_workers=_pool_workers, mp_context=multiprocessing.get_context('spawn'))
+        return _pool
+
+
+def hash_passwords(passwords, workers=None):
+    """Hash passwords inline for a handful, on the shared process pool otherwise"""
+    if len(passwords) < POOL_MIN_PASSWORDS:
+        return [generate_password_hash(p) for p in passwords]
+    pool = _hash_pool(workers)
+    return list(pool.map(generate_password_hash, passwords, chunksize=max(1, len(passwords) // (_pool_workers * 4))))
+
+
+def validate(row):
+    """Return (username, email, password, role) or raise ValueError, using the admin form's rules"""
+    if isinstance(row, Exception):
+        raise row
+    username = str(row.get('username') or '').strip()
+    email = str(row.get('email') or '').strip()
+    password = str(row.get('password') or '')
+    role = str(row.get('role') or 'user').strip() or 'user'
+    if not username or not email or not password:
+        raise ValueError('username, email and password are required')
+    if len(username) > 50 or len(email) > 100:
+        raise ValueError('username or email is too long')
+    if '@' not in email:
+        raise ValueError('email is not valid')
+    if len(password) < 6:
+        raise ValueError('password must be at least 6 characters')
+    if role not in ROLES:
+        raise ValueError(f"role must be one of {', '.join(ROLES)}")
+    return username, email, password, role
+
+
+def import_users(rows, workers=None, chunk_size=500):
+    """Create users from (line_no, row) pairs.
+
+    Returns {'created', 'error_count', 'errors': [{'line', 'error'}]}. Rows whose
+    username or email is already in use, or repeats an earlier row, are reported
+    as errors rather than failing the import.
+    """
+    errors = []
+    error_count = 0
+
+    def reject(line_no, message):
+        nonlocal error_count
+        error_count += 1
+        if len(errors) < MAX_REPORTED_ERRORS:
+            errors.append({'line': line_no, 'error': message})
+
+    conn = get_db_connection()
+    try:
+        cur = conn.cursor()
+        cur.execute('''
+            CREATE TEMP TABLE user_staging (line_no INTEGER, username TEXT, email TEXT, password_hash TEXT, role TEXT)
+            ON COMMIT DROP
+        ''')
+
+        def flush(chunk):
+            # Skip rows that would conflict before paying for their password hash
+            cur.execute(
+                'SELECT username, email FROM users WHERE username = ANY(%s) OR email = ANY(%s)',
+                ([c[1] for c in chunk], [c[2] for c in chunk])
+            )
+            taken_names, taken_emails = set(), set()
+            for r in cur.fetchall():
+                taken_names.add(r['username'])
+                taken_emails.add(r['email'])
+            fresh = []
+            for c in chunk:
+                if c[1] in taken_names or c[2] in taken_emails:
+                    reject(c[0], 'username or email already exists')
+                elif c[1] in seen_names or c[2] in seen_emails:
+                    reject(c[0], 'username or email repeats an earlier row')
+                else:
+                    seen_names.add(c[1])
+                    seen_emails.add(c[2])
+                    fresh.append(c)
+            hashes = hash_passwords([c[3] for c in fresh], workers)
+            with cur.copy('COPY user_staging (line_no, username, email, password_hash, role) FROM STDIN') as copy:
+                for c, h in zip(fresh, hashes):
+                    copy.write_row((c[0], c[1], c[2], h, c[4]))
+
+        seen_names, seen_emails = set(), set()
+        chunk = []
+        for line_no, row in rows:
+            try:
+                chunk.append((line_no,) + validate(row))
+            except ValueError as e:
+                reject(line_no, str(e))
+                continue
+            if len(chunk) >= chunk_size:
+                flush(chunk)
+                chunk = []
+        if chunk:
+            flush(chunk)
+
+        cur.execute('''
+            WITH inserted AS (
+                INSERT INTO users (username, email, password_hash, role)
+                SELECT username, email, password_hash, role FROM user_staging ORDER BY line_no
+                ON CONFLICT DO NOTHING
+                RETURNING username
+            )
+            SELECT s.line_no FROM user_staging s
+            WHERE NOT EXISTS (SELECT 1 FROM inserted i WHERE i.username = s.username)
+            ORDER BY s.line_no
+        ''')
+        conflicts = [r['line_no'] for r in cur.fetchall()]
+        cur.execute('SELECT COUNT(*) AS n FROM user_staging')
+        staged = cur.fetchone()['n']
+        conn.commit()
+        for line_no in conflicts:
+            reject(line_no, 'username or email already exists')
+        errors.sort(key=lambda e: e['line'])
+        return {'created': staged - len(conflicts), 'error_count': error_count, 'errors': errors}
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def export_users(fmt='csv', batch_size=2000):
+    """Yield users (without password hashes) as CSV or JSONL via a server-side cursor"""
+    return stream_rows(f"SELECT {', '.join(EXPORT_COLUMNS)} FROM users WHERE deleted_at IS NULL ORDER BY id",
+                       EXPORT_COLUMNS, fmt, cursor_name='users_export', batch_size=batch_size)
@@ -0,0 +1,262 @@
+"""Deleting users together with everything they own.
+
+Deleting a user from the admin panel only sets users.deleted_at, so the
+account disappears from login and the admin list at once. The purge then
+removes the user's history table by table, batch_size rows per short
+transaction, so a user with years of chats and notifications never holds
+long locks. The users row itself goes last. Foreign keys with ON DELETE
+CASCADE (added by init_database) catch anything the purge does not list,
+and remove_orphans() cleans up rows left behind before those keys existed.
+"""
+import os
+import shutil
+import threading
+
+from config import Config
+from database.connection import get_db_connection
+
+UPLOAD_ROOT = os.path.join('frontend', 'static', 'uploads')
+
+# (table, column, referenced table); every key is ON DELETE CASCADE
+FOREIGN_KEYS = [
+    ('user_gardens', 'user_id', 'users'),
+    ('schedules', 'user_id', 'users'),
+    ('schedules', 'garden_id', 'user_gardens'),
+    ('schedule_chats', 'schedule_id', 'schedules'),
+    ('schedule_chats', 'user_id', 'users'),
+    ('general_chats', 'user_id', 'users'),
+    ('general_chat_summaries', 'user_id', 'users'),
+    ('notifications', 'user_id', 'users'),
+    ('notifications_archive', 'user_id', 'users'),
+    ('notification_counters', 'user_id', 'users'),
+]
+
+# Keys added by earlier versions and since dropped. A cascade from plants
+# would wipe a catalog plant out of every user's garden.
+RETIRED_FOREIGN_KEYS = [('user_gardens', 'plant_id')]
+
+# Referencing columns that no existing index leads with; cascades scan them
+FOREIGN_KEY_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_schedules_user_id ON schedules (user_id)",
+    "CREATE INDEX IF NOT EXISTS idx_schedule_chats_user ON schedule_chats (user_id)",
+    "CREATE INDEX IF NOT EXISTS idx_notifications_archive_user ON notifications_archive (user_id)",
+]
+
+# Tables emptied for a purged user, children before parents; %s is the user id
+PURGE_STEPS = [
+    ('notifications', 'user_id = %s'),
+    ('notifications_archive', 'user_id = %s'),
+    ('general_chats', 'user_id = %s'),
+    ('schedule_chats', 'schedule_id IN (SELECT id FROM schedules WHERE user_id = %s)'),
+    ('schedule_chats', 'user_id = %s'),
+    ('schedule_tasks', 'schedule_id IN (SELECT id FROM schedules WHERE user_id = %s)'),
+    ('schedule_days', 'schedule_id IN (SELECT id FROM schedules WHERE user_id = %s)'),
+    ('schedules', 'user_id = %s'),
+    ('user_gardens', 'user_id = %s'),
+]
+
+# pg_try_advisory_lock namespace so two purgers never work on the same user
+PURGE_LOCK_NAMESPACE = 4501
+
+
+def constraint_name(table, column):
+    return f'fk_{table}_{column}'
+
+
+def ensure_foreign_keys(conn, cur):
+    """Add missing cascading foreign keys as NOT VALID, then try to validate them.
+
+    NOT VALID keys are enforced for new rows straight away without scanning
+    the table. Validation fails while orphans exist; remove_orphans() cleans
+    them up and validates again. Returns the number of keys left unvalidated.
+    """
+    for table, column in RETIRED_FOREIGN_KEYS:
+        try:
+            cur.execute(f'ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {constraint_name(table, column)}')
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            print(f"⚠️ Warning: failed to drop {constraint_name(table, column)}: {e}")
+    for stmt in FOREIGN_KEY_INDEXES:
+        try:
+            cur.execute(stmt)
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            print(f"⚠️ Warning: failed to run '{stmt}': {e}")
+    cur.execute('SELECT conname FROM pg_constraint WHERE conname = ANY(%s)',
+                ([constraint_name(t, c) for t, c, _ in FOREIGN_KEYS],))
+    existing = {r['conname'] for r in cur.fetchall()}
+    for table, column, ref in FOREIGN_KEYS:
+        name = constraint_name(table, column)
+        if name in existing:
+            continue
+        try:
+            cur.execute(f'ALTER TABLE {table} ADD CONSTRAINT {name} FOREIGN KEY ({column}) REFERENCES {ref}(id) ON DELETE CASCADE NOT VALID')
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            print(f"⚠️ Warning: failed to add foreign key {name}: {e}")
+    return validate_foreign_keys(conn, cur)
+
+
+def validate_foreign_keys(conn, cur):
+    cur.execute('SELECT conname FROM pg_constraint WHERE conname = ANY(%s) AND NOT convalidated',
+                ([constraint_name(t, c) for t, c, _ in FOREIGN_KEYS],))
+    pending = {r['conname'] for r in cur.fetchall()}
+    failed = 0
+    for table, column, _ in FOREIGN_KEYS:
+        name = constraint_name(table, column)
+        if name not in pending:
+            continue
+        try:
+            cur.execute(f'ALTER TABLE {table} VALIDATE CONSTRAINT {name}')
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            failed += 1
+            print(f"⚠️ Foreign key {name} not validated ({e}); run: python -m backend.jobs orphans")
+    return failed
+
+
+def _delete_in_batches(conn, cur, table, where, params, batch_size):
+    total = 0
+    while True:
+        cur.execute(
+            f'DELETE FROM {table} WHERE ctid = ANY(ARRAY(SELECT ctid FROM {table} WHERE {where} LIMIT %s))',
+            (*params, batch_size)
+        )
+        deleted = cur.rowcount
+        conn.commit()
+        total += deleted
+        if deleted < batch_size:
+            return total
+
+
+def remove_upload_dirs(schedule_ids):
+    for schedule_id in schedule_ids:
+        path = os.path.join(UPLOAD_ROOT, f'schedule_{schedule_id}')
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def purge_user(conn, cur, user_id, batch_size):
+    """Remove a soft-deleted user's rows and uploads; returns rows deleted, or None if locked"""
+    cur.execute('SELECT pg_try_advisory_lock(%s, %s) AS locked', (PURGE_LOCK_NAMESPACE, user_id))
+    locked = cur.fetchone()['locked']
+    conn.commit()
+    if not locked:
+        return None
+    try:
+        cur.execute('SELECT id FROM schedules WHERE user_id = %s', (user_id,))
+        schedule_ids = [r['id'] for r in cur.fetchall()]
+        total = 0
+        for table, where in PURGE_STEPS:
+            total += _delete_in_batches(conn, cur, table, where, (user_id,), batch_size)
+        cur.execute('DELETE FROM users WHERE id = %s AND deleted_at IS NOT NULL', (user_id,))
+        total += cur.rowcount
+        conn.commit()
+        remove_upload_dirs(schedule_ids)
+        return total
+    finally:
+        conn.rollback()
+        cur.execute('SELECT pg_advisory_unlock(%s, %s)', (PURGE_LOCK_NAMESPACE, user_id))
+        conn.commit()
+
+
+def purge_deleted_users(batch_size=None):
+    """Purge every soft-deleted user, oldest first. Returns (users purged, rows deleted)"""
+    batch_size = batch_size or Config.USER_PURGE_BATCH_SIZE
+    conn = get_db_connection()
+    users = rows = 0
+    skipped = set()
+    try:
+        cur = conn.cursor()
+        while True:
+            cur.execute('SELECT id FROM users WHERE deleted_at IS NOT NULL AND NOT (id = ANY(%s::int[])) ORDER BY deleted_at, id LIMIT 100',
+                        (list(skipped),))
+            ids = [r['id'] for r in cur.fetchall()]
+            conn.commit()
+            if not ids:
+                return users, rows
+            for user_id in ids:
+                deleted = purge_user(conn, cur, user_id, batch_size)
+                if deleted is None:
+                    # Another purger holds this user
+                    skipped.add(user_id)
+                    continue
+                users += 1
+                rows += deleted
+                print(f"✅ Purged user {user_id} ({deleted} rows)")
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+_background_lock = threading.Lock()
+
+
+def purge_in_background(batch_size=None):
+    """Start a daemon thread running purge_deleted_users unless one is already running.
+
+    Users deleted while a run is finishing may wait for the next run; the
+    purge-users job picks them up too.
+    """
+    if not _background_lock.acquire(blocking=False):
+        return False
+
+    def run():
+        try:
+            purge_deleted_users(batch_size)
+        except Exception as e:
+            print(f"Error purging deleted users: {e}")
+        finally:
+            _background_lock.release()
+
+    threading.Thread(target=run, daemon=True).start()
+    return True
+
+
+def remove_orphans(batch_size=None):
+    """Delete rows whose parent row no longer exists, and upload dirs of missing schedules.
+
+    Runs the foreign key list parents-first, so removing an orphaned garden
+    item also clears its schedules. Validates the foreign keys afterwards.
+    Returns {'table.column': rows deleted, 'upload_dirs': n, 'unvalidated': n}.
+    """
+    batch_size = batch_size or Config.USER_PURGE_BATCH_SIZE
+    conn = get_db_connection()
+    report = {}
+    try:
+        cur = conn.cursor()
+        for table, column, ref in FOREIGN_KEYS:
+            where = f'{column} IS NOT NULL AND NOT EXISTS (SELECT 1 FROM {ref} p WHERE p.id = {table}.{column})'
+            report[f'{table}.{column}'] = _delete_in_batches(conn, cur, table, where, (), batch_size)
+        report['upload_dirs'] = _remove_orphan_upload_dirs(cur)
+        conn.commit()
+        report['unvalidated'] = validate_foreign_keys(conn, cur)
+        return report
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def _remove_orphan_upload_dirs(cur):
+    if not os.path.isdir(UPLOAD_ROOT):
+        return 0
+    ids = []
+    for name in os.listdir(UPLOAD_ROOT):
+        suffix = name[len('schedule_'):]
+        if name.startswith('schedule_') and suffix.isdigit():
+            ids.append(int(suffix))
+    if not ids:
+        return 0
+    cur.execute('SELECT id FROM schedules WHERE id = ANY(%s)', (ids,))
+    live = {r['id'] for r in cur.fetchall()}
+    missing = [i for i in ids if i not in live]
+    remove_upload_dirs(missing)
+    return len(missing)
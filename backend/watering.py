@@ -0,0 +1,87 @@
+"""Watering reminders for all gardens.
+
+next_watering_due is kept per garden item: garden edits reschedule their own
+row, and the periodic sweep here recomputes it in id-range batches (repairing
+drift and backfilling old rows) and then writes one reminder per due item in
+a single set-based statement. Everything runs inside PostgreSQL, so no rows
+are shipped to Python.
+"""
+from database.connection import get_db_cursor, close_db
+from backend.models import NEXT_WATERING_DUE_SQL
+
+
+def refresh_due_dates(batch_size=50000):
+    """Recompute next_watering_due for every garden row; returns the number of rows changed"""
+    conn, cur = get_db_cursor()
+    changed = 0
+    try:
+        cur.execute('SELECT MIN(id) AS lo, MAX(id) AS hi FROM user_gardens')
+        bounds = cur.fetchone()
+        if not bounds or bounds['lo'] is None:
+            return 0
+        start = bounds['lo']
+        while start <= bounds['hi']:
+            cur.execute(f'''
+                UPDATE user_gardens
+                SET next_watering_due = {NEXT_WATERING_DUE_SQL}
+                WHERE id >= %s AND id < %s
+                  AND next_watering_due IS DISTINCT FROM ({NEXT_WATERING_DUE_SQL})
+            ''', (start, start + batch_size))
+            changed += cur.rowcount
+            conn.commit()
+            start += batch_size
+        return changed
+    except Exception as e:
+        conn.rollback()
+        print(f"Error refreshing watering due dates: {e}")
+        return changed
+    finally:
+        close_db(conn, cur)
+
+
+def send_reminders(batch_size=50000):
+    """Create one notification per item due today or overdue that hasn't been reminded today"""
+    conn, cur = get_db_cursor()
+    sent = 0
+    try:
+        while True:
+            cur.execute('''
+                WITH batch AS (
+                    SELECT id FROM user_gardens
+                    WHERE next_watering_due <= CURRENT_DATE
+                      AND watering_reminded_on IS DISTINCT FROM CURRENT_DATE
+                    ORDER BY id
+                    LIMIT %s
+                    FOR UPDATE SKIP LOCKED
+                ), due AS (
+                    -- Every claimed row is marked, even one whose plant is gone, so none is claimed twice
+                    UPDATE user_gardens ug
+                    SET watering_reminded_on = CURRENT_DATE
+                    FROM batch
+                    WHERE ug.id = batch.id
+                    RETURNING ug.id, ug.user_id, ug.next_watering_due,
+                              COALESCE(ug.nickname, (SELECT p.name FROM plants p WHERE p.id = ug.plant_id), 'your plant') AS name
+                ), sent AS (
+                    INSERT INTO notifications (user_id, message, url)
+                    SELECT user_id,
+                           'Time to water ' || name || CASE WHEN next_watering_due < CURRENT_DATE
+                               THEN ' (' || (CURRENT_DATE - next_watering_due) || ' days overdue)' ELSE '' END,
+                           '/garden/edit/' || id
+                    FROM due
+                    RETURNING id
+                )
+                SELECT (SELECT COUNT(*) FROM batch) AS claimed, (SELECT COUNT(*) FROM sent) AS n
+            ''', (batch_size,))
+            res = cur.fetchone()
+            conn.commit()
+            sent += res['n']
+            # A short batch means nothing due is left (or other workers hold the rest)
+            if res['claimed'] < batch_size:
+                break
+        return sent
+    except Exception as e:
+        conn.rollback()
+        print(f"Error sending watering reminders: {e}")
+        return sent
+    finally:
+        close_db(conn, cur)
@@ -0,0 +1,5 @@
+"""Load-testing benchmarks: synthetic data, a fake Gemini server and scripted scenarios.
+
+    python -m benchmarks.run --scale small --out before.json
+    python -m benchmarks.compare before.json after.json
+"""
@@ -0,0 +1,71 @@
+"""Compare two benchmark reports written by benchmarks.run.
+
+Prints p50/p95/throughput per scenario and exits with status 1 when any
+scenario's p95 latency grew, or its throughput fell, by more than
+--threshold percent (default 10).
+
+    python -m benchmarks.compare before.json after.json --threshold 15
+"""
+import argparse
+import json
+import sys
+
+
+def _change(old, new):
+    if old in (None, 0) or new is None:
+        return None
+    return (new - old) / old * 100
+
+
+def compare(before, after, threshold=10.0):
+    """Return (rows, regressions) for scenarios present in both reports"""
+    rows = []
+    regressions = []
+    for name, old in before['scenarios'].items():
+        new = after['scenarios'].get(name)
+        if new is None:
+            continue
+        p95 = _change(old['latency_ms']['p95'], new['latency_ms']['p95'])
+        rps = _change(old['throughput_rps'], new['throughput_rps'])
+        rows.append((name, old, new, p95, rps))
+        if p95 is not None and p95 > threshold:
+            regressions.append(f'{name}: p95 +{p95:.1f}%')
+        if rps is not None and rps < -threshold:
+            regressions.append(f'{name}: throughput {rps:.1f}%')
+        if new['errors'] > old['errors']:
+            regressions.append(f"{name}: errors {old['errors']} -> {new['errors']}")
+    return rows, regressions
+
+
+def _fmt(value, suffix=''):
+    return '-' if value is None else f'{value:+.1f}{suffix}'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.compare')
+    parser.add_argument('before')
+    parser.add_argument('after')
+    parser.add_argument('--threshold', type=float, default=10.0, help='Allowed change in percent')
+    args = parser.parse_args(argv)
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+
+    print(f"before: {before['meta'].get('commit')}  after: {after['meta'].get('commit')}")
+    print(f"{'scenario':<16} {'p50 ms':>17} {'p95 ms':>17} {'rps':>15} {'Δp95':>8} {'Δrps':>8}")
+    rows, regressions = compare(before, after, args.threshold)
+    for name, old, new, p95, rps in rows:
+        print(f"{name:<16} {old['latency_ms']['p50'] or 0:>8} → {new['latency_ms']['p50'] or 0:<6} "
+              f"{old['latency_ms']['p95'] or 0:>8} → {new['latency_ms']['p95'] or 0:<6} "
+              f"{old['throughput_rps'] or 0:>6} → {new['throughput_rps'] or 0:<6} {_fmt(p95, '%'):>8} {_fmt(rps, '%'):>8}")
+    if regressions:
+        print('\n❌ Regressions beyond ±{:g}%:'.format(args.threshold))
+        for r in regressions:
+            print(f'  {r}')
+        sys.exit(1)
+    print('\n✅ No regressions')
+
+
+if __name__ == '__main__':
+    main()
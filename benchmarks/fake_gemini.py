@@ -0,0 +1,181 @@
+"""Local stand-in for the Gemini API used by the benchmarks.
+
+Serves generateContent and streamGenerateContent (?alt=sse) under
+/v1beta/models/<model>. Latency is configurable (plus jitter), as is the
+fraction of requests that fail with 503. Schedule prompts are answered with
+exactly the days they ask for, so schedule generation behaves as it does
+against the real API. Replies include usageMetadata for the AI call ledger.
+
+Run standalone:
+    python -m benchmarks.fake_gemini --port 8765 --latency-ms 300 --failure-rate 0.05
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_DAYS_PATTERN = re.compile(r'EXACTLY these days: ([0-9,\s-]+) \(')
+
+
+def parse_day_ranges(text):
+    """Inverse of schedule_gen.format_day_ranges: '1-3, 7' -> [1, 2, 3, 7]"""
+    days = []
+    for part in text.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if '-' in part:
+            a, b = part.split('-', 1)
+            days.extend(range(int(a), int(b) + 1))
+        else:
+            days.append(int(part))
+    return days
+
+
+def _prompt_text(body):
+    texts = []
+    for content in body.get('contents') or []:
+        for part in content.get('parts') or []:
+            if isinstance(part, dict) and part.get('text'):
+                texts.append(part['text'])
+    return '\n'.join(texts)
+
+
+def schedule_reply(prompt):
+    m = _DAYS_PATTERN.search(prompt)
+    days = parse_day_ranges(m.group(1)) if m else list(range(1, 8))
+    return json.dumps([
+        {'day': d, 'tasks': ['check soil moisture', f'water {150 + (d % 5) * 10}ml'] + (['fertilize once'] if d % 7 == 0 else [])}
+        for d in days
+    ])
+
+
+def text_reply(prompt):
+    return ('Keep the soil evenly moist, give the plant at least six hours of light '
+            'and check the leaves for pests every few days.')
+
+
+class FakeGemini:
+    def __init__(self, host='127.0.0.1', port=0, latency_ms=200, jitter_ms=50, failure_rate=0.0,
+                 stream_chunks=8, seed=None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.failure_rate = failure_rate
+        self.stream_chunks = max(1, stream_chunks)
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.failures = 0
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}/v1beta/models'
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def stats(self):
+        return {'requests': self.requests, 'failures': self.failures, 'latency_ms': self.latency_ms,
+                'jitter_ms': self.jitter_ms, 'failure_rate': self.failure_rate}
+
+    def _decide(self):
+        """Return (delay seconds, fail?) for one request"""
+        with self._lock:
+            self.requests += 1
+            delay = max(0.0, self.latency_ms + self._random.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+            fail = self._random.random() < self.failure_rate
+            if fail:
+                self.failures += 1
+        return delay, fail
+
+    def _handler_class(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, fmt, *args):
+                pass
+
+            def _send(self, status, payload, content_type='application/json'):
+                data = payload.encode('utf-8') if isinstance(payload, str) else payload
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                try:
+                    body = json.loads(self.rfile.read(length) or b'{}')
+                except ValueError:
+                    return self._send(400, json.dumps({'error': {'message': 'invalid JSON'}}))
+                delay, fail = fake._decide()
+                if fail:
+                    time.sleep(delay / 2)
+                    return self._send(503, json.dumps({'error': {'code': 503, 'message': 'fake overload'}}))
+                prompt = _prompt_text(body)
+                structured = (body.get('generationConfig') or {}).get('responseMimeType') == 'application/json'
+                reply = schedule_reply(prompt) if structured else text_reply(prompt)
+                usage = {'promptTokenCount': max(1, len(prompt) // 4), 'candidatesTokenCount': max(1, len(reply) // 4)}
+                if ':streamGenerateContent' in self.path:
+                    return self._stream(reply, usage, delay)
+                time.sleep(delay)
+                self._send(200, json.dumps({
+                    'candidates': [{'content': {'parts': [{'text': reply}], 'role': 'model'}}],
+                    'usageMetadata': usage
+                }))
+
+            def _stream(self, reply, usage, delay):
+                n = fake.stream_chunks
+                size = max(1, -(-len(reply) // n))
+                chunks = [reply[i:i + size] for i in range(0, len(reply), size)]
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Connection', 'close')
+                self.end_headers()
+                for i, chunk in enumerate(chunks):
+                    time.sleep(delay / len(chunks))
+                    event = {'candidates': [{'content': {'parts': [{'text': chunk}], 'role': 'model'}}]}
+                    if i == len(chunks) - 1:
+                        event['usageMetadata'] = usage
+                    self.wfile.write(f'data: {json.dumps(event)}\r\n\r\n'.encode('utf-8'))
+                    self.wfile.flush()
+                self.close_connection = True
+
+        return Handler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.fake_gemini')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency-ms', type=float, default=200)
+    parser.add_argument('--jitter-ms', type=float, default=50)
+    parser.add_argument('--failure-rate', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args(argv)
+    fake = FakeGemini(args.host, args.port, args.latency_ms, args.jitter_ms, args.failure_rate, seed=args.seed)
+    print(f"Fake Gemini listening on {fake.base_url} (set GEMINI_BASE_URL to this)")
+    try:
+        fake._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,184 @@
+"""Micro-benchmarks for the hot model methods on datasets of growing size.
+
+For each scale the bench_ dataset is re-seeded, then every method is timed
+directly (no HTTP, no Flask) on random bench users. The report gives the
+latency percentiles and SQL statements per call at each scale, and each
+method's p50 growth from the smallest to the largest scale. A method whose
+time grows with the table sizes rather than with the user's own rows is
+missing an index or loading too much. The bench_ dataset is removed afterwards.
+
+    python -m benchmarks.models_bench --scales small,medium,large --iterations 200 --out results/models.json
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timezone
+
+from benchmarks import seed
+from benchmarks.run import git_commit
+from benchmarks.scenarios import percentile
+from database.connection import QueryStats, get_db_connection, query_stats
+
+
+def _round(value):
+    return round(value, 2) if value is not None else None
+
+
+def _new_schedule(sample):
+    """Insert an empty schedule for create_many to fill (outside the timed call)"""
+    conn = get_db_connection()
+    try:
+        cur = conn.cursor()
+        cur.execute("INSERT INTO schedules (garden_id, user_id, source, stage) VALUES (%s, %s, 'rules', 'seed') RETURNING id",
+                    (sample['garden_id'], sample['user_id']))
+        schedule_id = cur.fetchone()['id']
+        conn.commit()
+        return schedule_id
+    finally:
+        conn.close()
+
+
+def bench_get_garden(sample, params, rnd):
+    from backend.models import User
+    return lambda: User.get_garden(sample['user_id'])
+
+
+def bench_toggle(sample, params, rnd):
+    from backend.models import ScheduleTask
+    schedule_id, day, task_index = rnd.choice(sample['tasks'])
+    return lambda: ScheduleTask.toggle(sample['user_id'], schedule_id, day, task_index, rnd.random() < 0.5)
+
+
+def bench_create_many(sample, params, rnd):
+    from backend.models import ScheduleTask
+    schedule_id = _new_schedule(sample)
+    days = [{'day': d, 'tasks': [seed.TASKS[(d + t) % len(seed.TASKS)] for t in range(params['tasks_per_day'])]}
+            for d in range(1, params['schedule_days'] + 1)]
+    return lambda: ScheduleTask.create_many(schedule_id, days)
+
+
+def bench_notifications(sample, params, rnd):
+    from backend.models import Notification
+    return lambda: Notification.get_for_user(sample['user_id'])
+
+
+def bench_plants(sample, params, rnd):
+    from backend.models import Plant
+    return lambda: Plant.get_all()
+
+
+# name -> factory(sample, params, rnd) returning the call to time; setup in the factory is not timed
+BENCHES = {
+    'User.get_garden': bench_get_garden,
+    'ScheduleTask.toggle': bench_toggle,
+    'ScheduleTask.create_many': bench_create_many,
+    'Notification.get_for_user': bench_notifications,
+    'Plant.get_all': bench_plants,
+}
+
+
+def _samples(limit):
+    samples = []
+    for u in seed.bench_users(limit=limit):
+        if u['gardens'] and u['tasks']:
+            samples.append({'user_id': u['id'], 'garden_id': u['gardens'][0], 'tasks': u['tasks']})
+    return samples
+
+
+def run_bench(name, samples, params, iterations=100, warmup=5, random_seed=0):
+    """Time `iterations` calls of one benchmark; returns latency percentiles and statements per call"""
+    rnd = random.Random(random_seed)
+    factory = BENCHES[name]
+    for _ in range(warmup):
+        factory(rnd.choice(samples), params, rnd)()
+    timings = []
+    queries = 0
+    for _ in range(iterations):
+        call = factory(rnd.choice(samples), params, rnd)
+        stats = QueryStats(name)
+        token = query_stats.set(stats)
+        try:
+            start = time.perf_counter()
+            call()
+            timings.append(time.perf_counter() - start)
+        finally:
+            query_stats.reset(token)
+        queries += stats.count
+    ms = sorted(t * 1000 for t in timings)
+    return {
+        'iterations': iterations,
+        'queries_per_call': round(queries / iterations, 2) if iterations else None,
+        'latency_ms': {
+            'mean': _round(sum(ms) / len(ms)) if ms else None,
+            'p50': _round(percentile(ms, 50)),
+            'p95': _round(percentile(ms, 95)),
+            'p99': _round(percentile(ms, 99)),
+            'max': _round(ms[-1] if ms else None),
+        },
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.models_bench')
+    parser.add_argument('--scales', default='small,medium', help='Comma-separated, from: ' + ', '.join(seed.SCALES))
+    parser.add_argument('--benches', default=','.join(BENCHES), help='Comma-separated subset of: ' + ', '.join(BENCHES))
+    parser.add_argument('--iterations', type=int, default=100)
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--random-seed', type=int, default=42)
+    parser.add_argument('--out', help='Write the JSON report here as well as to stdout')
+    args = parser.parse_args(argv)
+
+    scales = [s.strip() for s in args.scales.split(',') if s.strip()]
+    names = [n.strip() for n in args.benches.split(',') if n.strip()]
+    unknown = [s for s in scales if s not in seed.SCALES] + [n for n in names if n not in BENCHES]
+    if unknown:
+        parser.error(f"unknown scale or benchmark: {', '.join(unknown)}")
+
+    from backend.app import init_database
+    init_database()
+    results = {name: {} for name in names}
+    seeded = {}
+    try:
+        for scale in scales:
+            params = seed.SCALES[scale]
+            print(f'Seeding {scale} dataset {params}', file=sys.stderr)
+            seeded[scale] = seed.seed(random_seed=args.random_seed, **params)
+            samples = _samples(limit=100)
+            for i, name in enumerate(names):
+                result = run_bench(name, samples, params, args.iterations, args.warmup, args.random_seed + i)
+                results[name][scale] = result
+                print(f"  {name:<28} p50 {result['latency_ms']['p50']:>8} ms  p95 {result['latency_ms']['p95']:>8} ms  "
+                      f"{result['queries_per_call']} queries/call", file=sys.stderr)
+    finally:
+        seed.reset()
+
+    for name, by_scale in results.items():
+        first, last = by_scale.get(scales[0]), by_scale.get(scales[-1])
+        if len(scales) > 1 and first and last and first['latency_ms']['p50']:
+            by_scale['p50_growth'] = round(last['latency_ms']['p50'] / first['latency_ms']['p50'], 2)
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'commit': git_commit(),
+            'scales': scales,
+            'iterations': args.iterations,
+            'warmup': args.warmup,
+            'random_seed': args.random_seed,
+            'seeded': seeded,
+        },
+        'benches': results,
+    }
+    text = json.dumps(report, indent=2, default=str)
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, 'w') as f:
+            f.write(text + '\n')
+    print(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,201 @@
+"""Query-plan regression check: no sequential scans on large tables.
+
+Each registered probe calls a model method on a bench user while every
+statement it runs is captured with its parameters. Each captured statement
+is then EXPLAINed with the same parameters, and any Seq Scan on a table with
+at least --min-rows rows (by pg_class.reltuples) is reported. The exit status
+is 1 when there is one, so a missing index fails a CI job instead of a
+production request. Probes that are meant to read a whole table list it in
+allow_seq_scan.
+
+    python -m benchmarks.plans --scale medium
+    python -m benchmarks.plans --no-seed --min-rows 5000
+"""
+import argparse
+import sys
+
+from psycopg import sql
+
+from benchmarks import seed
+from database.connection import get_db_connection, query_capture
+
+EXPLAINABLE = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE')
+
+# [(name, fn(sample), allowed seq scan tables)]
+PROBES = []
+
+
+def probe(name, allow_seq_scan=()):
+    def register(fn):
+        PROBES.append((name, fn, frozenset(allow_seq_scan)))
+        return fn
+    return register
+
+
+@probe('User.get_by_username')
+def _get_by_username(s):
+    from backend.models import User
+    User.get_by_username(s['username'])
+
+
+@probe('User.search')
+def _search(s):
+    from backend.models import User
+    User.search(q=s['username'][:8])
+
+
+@probe('User.get_garden')
+def _get_garden(s):
+    from backend.models import User
+    User.get_garden(s['user_id'])
+
+
+@probe('Schedule.get_by_garden')
+def _get_by_garden(s):
+    from backend.models import Schedule
+    Schedule.get_by_garden(s['garden_id'])
+
+
+@probe('ScheduleTask.get_for_schedule')
+def _get_for_schedule(s):
+    from backend.models import ScheduleTask
+    ScheduleTask.get_for_schedule(s['schedule_id'])
+
+
+@probe('ScheduleTask.toggle')
+def _toggle(s):
+    from backend.models import ScheduleTask
+    ScheduleTask.toggle(s['user_id'], s['schedule_id'], s['day'], s['task_index'], True)
+
+
+@probe('ScheduleTask.create_many')
+def _create_many(s):
+    from backend.models import ScheduleTask
+    # Rewrite day 1 with its own tasks: same statements, no visible change
+    tasks = [t['task_text'] for t in ScheduleTask.get_for_day(s['schedule_id'], 1)]
+    ScheduleTask.create_many(s['schedule_id'], [{'day': 1, 'tasks': tasks}])
+
+
+@probe('Notification.get_for_user')
+def _notifications(s):
+    from backend.models import Notification
+    Notification.get_for_user(s['user_id'])
+
+
+@probe('Notification.unread_count')
+def _unread_count(s):
+    from backend.models import Notification
+    Notification.unread_count(s['user_id'])
+
+
+@probe('Plant.get_all', allow_seq_scan=('plants',))
+def _plants(s):
+    from backend.models import Plant
+    Plant.get_all()
+
+
+def capture(fn, sample):
+    """Run fn(sample) and return the distinct explainable (query, params) it executed"""
+    captured = []
+    token = query_capture.set(captured)
+    try:
+        fn(sample)
+    finally:
+        query_capture.reset(token)
+    seen = set()
+    statements = []
+    for query, params in captured:
+        text = query if isinstance(query, str) else repr(query)
+        if text in seen:
+            continue
+        seen.add(text)
+        if isinstance(query, str) and not query.lstrip().upper().startswith(EXPLAINABLE):
+            continue
+        statements.append((query, params))
+    return statements
+
+
+def seq_scans(plan):
+    """Relation names of every Seq Scan node in an EXPLAIN (FORMAT JSON) plan tree"""
+    found = []
+    if plan.get('Node Type') == 'Seq Scan':
+        found.append(plan.get('Relation Name'))
+    for child in plan.get('Plans') or []:
+        found.extend(seq_scans(child))
+    return found
+
+
+def large_tables(cur, min_rows):
+    cur.execute('''
+        SELECT c.relname, c.reltuples::bigint AS rows FROM pg_class c
+        WHERE c.relkind = 'r' AND c.relnamespace = 'public'::regnamespace AND c.reltuples >= %s
+    ''', (min_rows,))
+    return {r['relname']: r['rows'] for r in cur.fetchall()}
+
+
+def check(sample, min_rows=10000, probes=None):
+    """Return (results, violations); violations are (probe, table, rows, query)"""
+    results = []
+    violations = []
+    conn = get_db_connection()
+    try:
+        cur = conn.cursor()
+        big = large_tables(cur, min_rows)
+        for name, fn, allowed in probes or PROBES:
+            statements = capture(fn, sample)
+            scanned = []
+            for query, params in statements:
+                explain = (sql.SQL('EXPLAIN (FORMAT JSON) ') + query) if isinstance(query, sql.Composable) \
+                    else 'EXPLAIN (FORMAT JSON) ' + query
+                try:
+                    cur.execute(explain, params)
+                    plan = cur.fetchone()['QUERY PLAN'][0]['Plan']
+                except Exception as e:
+                    print(f"Warning: could not EXPLAIN a {name} statement: {e}", file=sys.stderr)
+                    continue
+                finally:
+                    conn.rollback()
+                for table in seq_scans(plan):
+                    scanned.append(table)
+                    if table in big and table not in allowed:
+                        violations.append((name, table, big[table], ' '.join(str(query).split())[:300]))
+            results.append({'probe': name, 'statements': len(statements), 'seq_scans': sorted(set(scanned))})
+        return results, violations
+    finally:
+        conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.plans')
+    seed.add_scale_arguments(parser)
+    parser.add_argument('--no-seed', action='store_true', help='Reuse the existing bench_ dataset')
+    parser.add_argument('--min-rows', type=int, default=10000, help='Tables with at least this many rows count as large')
+    args = parser.parse_args(argv)
+
+    from backend.app import init_database
+    init_database()
+    if not args.no_seed:
+        print(f'Seeding {args.scale} dataset', file=sys.stderr)
+        seed.seed(random_seed=args.random_seed, **seed.scale_from_args(args))
+    users = [u for u in seed.bench_users(limit=10) if u['schedules'] and u['tasks']]
+    if not users:
+        sys.exit('No bench_ users with schedules found; run without --no-seed first')
+    user = users[0]
+    schedule_id, day, task_index = user['tasks'][0]
+    sample = {'user_id': user['id'], 'username': user['username'], 'garden_id': user['gardens'][0],
+              'schedule_id': schedule_id, 'day': day, 'task_index': task_index}
+
+    results, violations = check(sample, args.min_rows)
+    for r in results:
+        scans = ', '.join(r['seq_scans']) or '-'
+        print(f"{r['probe']:<30} {r['statements']:>3} statement(s)  seq scans: {scans}")
+    if violations:
+        print(f'\n❌ Sequential scans on tables with >= {args.min_rows} rows:')
+        for name, table, rows, query in violations:
+            print(f'  {name}: {table} (~{rows} rows) in: {query}')
+        sys.exit(1)
+    print('\n✅ No sequential scans on large tables')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+"""Run the benchmark scenarios and write a JSON report.
+
+By default this seeds the bench_ dataset, starts a fake Gemini server and
+the app (python -m benchmarks.serve) on local ports, runs each scenario in
+turn and stops both. Pass --url to benchmark an app that is already running;
+it must then be configured with GEMINI_BASE_URL pointing at a fake server
+(python -m benchmarks.fake_gemini) to keep AI scenarios off the real API.
+
+    python -m benchmarks.run --scale medium --requests 500 --concurrency 16 --out results/abc123.json
+"""
+import argparse
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+import requests
+
+from benchmarks import scenarios, seed
+from benchmarks.fake_gemini import FakeGemini
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def git_commit():
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True, timeout=10)
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT,
+                               capture_output=True, text=True, timeout=10)
+        commit = out.stdout.strip() or None
+        return f'{commit}-dirty' if commit and dirty.stdout.strip() else commit
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def wait_healthy(base_url, timeout=60, proc=None):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc is not None and proc.poll() is not None:
+            raise RuntimeError(f'app exited with code {proc.returncode} before becoming healthy')
+        try:
+            if requests.get(base_url + '/api/health', timeout=2).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.25)
+    raise RuntimeError(f'{base_url} did not become healthy within {timeout}s')
+
+
+def start_app(gemini_url, port):
+    env = dict(os.environ, GEMINI_BASE_URL=gemini_url, GEMINI_API_KEY='bench-key')
+    # Keep the server quiet; its output would interleave with ours
+    return subprocess.Popen([sys.executable, '-m', 'benchmarks.serve', '--port', str(port)], cwd=ROOT, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.run')
+    seed.add_scale_arguments(parser)
+    parser.add_argument('--url', help='Benchmark an already running app instead of starting one')
+    parser.add_argument('--no-seed', action='store_true', help='Reuse the existing bench_ dataset')
+    parser.add_argument('--scenarios', default=','.join(scenarios.SCENARIOS),
+                        help='Comma-separated subset of: ' + ', '.join(scenarios.SCENARIOS))
+    parser.add_argument('--requests', type=int, default=200, help='Requests per scenario')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--warmup', type=int, default=2, help='Unrecorded requests per client')
+    parser.add_argument('--latency-ms', type=float, default=200, help='Fake Gemini latency')
+    parser.add_argument('--jitter-ms', type=float, default=50)
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='Fraction of Gemini calls that fail with 503')
+    parser.add_argument('--out', help='Write the JSON report here as well as to stdout')
+    args = parser.parse_args(argv)
+
+    names = [n.strip() for n in args.scenarios.split(',') if n.strip()]
+    unknown = [n for n in names if n not in scenarios.SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(unknown)}")
+
+    params = seed.scale_from_args(args)
+    fake = app = None
+    try:
+        if args.url:
+            base_url = args.url.rstrip('/')
+        else:
+            fake = FakeGemini(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                              failure_rate=args.failure_rate, seed=args.random_seed).start()
+            port = _free_port()
+            base_url = f'http://127.0.0.1:{port}'
+            app = start_app(fake.base_url, port)
+            print(f'Starting app on {base_url} (Gemini at {fake.base_url})', file=sys.stderr)
+        # The served app runs init_database, so wait for it before seeding
+        wait_healthy(base_url, proc=app)
+        counts = None
+        if not args.no_seed:
+            print(f'Seeding {args.scale} dataset {params}', file=sys.stderr)
+            counts = seed.seed(random_seed=args.random_seed, **params)
+        users = seed.bench_users(limit=max(args.concurrency, 1) * 4)
+        if not users:
+            raise SystemExit('No bench_ users found; run without --no-seed first')
+
+        results = {}
+        for i, name in enumerate(names):
+            print(f'Running {name} ({args.requests} requests, concurrency {args.concurrency})', file=sys.stderr)
+            results[name] = scenarios.run_scenario(name, base_url, users, args.requests, args.concurrency,
+                                                   args.warmup, seed=args.random_seed + i)
+        report = {
+            'meta': {
+                'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                'commit': git_commit(),
+                'python': platform.python_version(),
+                'url': base_url if args.url else None,
+                'scale': args.scale,
+                'params': params,
+                'random_seed': args.random_seed,
+                'requests': args.requests,
+                'concurrency': args.concurrency,
+                'warmup': args.warmup,
+                'seeded': counts,
+                'gemini': fake.stats() if fake else None,
+            },
+            'scenarios': results,
+        }
+    finally:
+        if app is not None:
+            app.terminate()
+            try:
+                app.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                app.kill()
+        if fake is not None:
+            fake.stop()
+
+    text = json.dumps(report, indent=2, default=str)
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, 'w') as f:
+            f.write(text + '\n')
+    print(text)
+
+
+if __name__ == '__main__':
+    main()
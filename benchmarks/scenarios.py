@@ -0,0 +1,197 @@
+"""Scripted request scenarios for the load benchmark.
+
+Each scenario is one HTTP request made as a logged-in bench user against
+the seeded dataset. run_scenario() drives a scenario from several client
+threads and returns throughput and latency percentiles.
+"""
+import math
+import random
+import struct
+import threading
+import time
+import zlib
+
+import requests
+
+from benchmarks.seed import PASSWORD
+
+QUESTIONS = (
+    'How often should I water tomatoes?',
+    'What is the best soil for herbs?',
+    'How do I keep aphids off roses?',
+    'When should I repot a succulent?',
+    'How much sun does basil need?',
+)
+
+def _tiny_png():
+    """A valid 1x1 RGBA PNG"""
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+    header = struct.pack('>IIBBBBB', 1, 1, 8, 6, 0, 0, 0)
+    return b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header) + chunk(b'IDAT', zlib.compress(b'\x00\x00\x00\x00\x00')) + chunk(b'IEND', b'')
+
+
+TINY_PNG = _tiny_png()
+
+
+class Client:
+    def __init__(self, base_url, timeout=120):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def request(self, method, path, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        kwargs.setdefault('allow_redirects', False)
+        return self.session.request(method, self.base_url + path, **kwargs)
+
+    def login(self, username, password=PASSWORD):
+        resp = self.request('POST', '/login', data={'username': username, 'password': password})
+        if resp.status_code != 302 or '/login' in resp.headers.get('Location', ''):
+            raise RuntimeError(f'login failed for {username}: HTTP {resp.status_code}')
+
+
+def dashboard(client, user, rnd):
+    return client.request('GET', '/dashboard')
+
+
+def toggle(client, user, rnd):
+    schedule_id, day, task_index = rnd.choice(user['tasks'])
+    return client.request('POST', '/garden/schedule/task/toggle', json={
+        'schedule_id': schedule_id, 'day': day, 'task_index': task_index, 'completed': rnd.random() < 0.5
+    })
+
+
+def chat(client, user, rnd):
+    return client.request('POST', '/api/ai/chat', json={'message': rnd.choice(QUESTIONS)})
+
+
+def schedule_chat(client, user, rnd):
+    return client.request('POST', f"/api/schedule/{rnd.choice(user['schedules'])}/chat",
+                          json={'message': rnd.choice(QUESTIONS)})
+
+
+def schedule_create(client, user, rnd):
+    return client.request('POST', f"/garden/schedule/create/{rnd.choice(user['gardens'])}",
+                          data={'mode': 'ai', 'stage': 'seed'})
+
+
+def catalog(client, user, rnd):
+    return client.request('GET', '/api/plants')
+
+
+def upload(client, user, rnd):
+    return client.request('POST', f"/api/schedule/{rnd.choice(user['schedules'])}/chat/upload",
+                          files={'image': ('leaf.png', TINY_PNG, 'image/png')})
+
+
+SCENARIOS = {
+    'dashboard': dashboard,
+    'toggle': toggle,
+    'chat': chat,
+    'schedule_chat': schedule_chat,
+    'schedule_create': schedule_create,
+    'catalog': catalog,
+    'upload': upload,
+}
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    k = max(0, min(len(sorted_values) - 1, math.ceil(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[k]
+
+
+def summarize(latencies, errors, elapsed):
+    ms = sorted(v * 1000 for v in latencies)
+    return {
+        'requests': len(latencies) + errors,
+        'errors': errors,
+        'duration_s': round(elapsed, 3),
+        'throughput_rps': round(len(latencies) / elapsed, 2) if elapsed > 0 else None,
+        'latency_ms': {
+            'mean': round(sum(ms) / len(ms), 2) if ms else None,
+            'p50': _round(percentile(ms, 50)),
+            'p90': _round(percentile(ms, 90)),
+            'p95': _round(percentile(ms, 95)),
+            'p99': _round(percentile(ms, 99)),
+            'max': _round(ms[-1] if ms else None),
+        },
+    }
+
+
+def _round(value):
+    return round(value, 2) if value is not None else None
+
+
+def run_scenario(name, base_url, users, total_requests=200, concurrency=8, warmup=2, seed=0):
+    """Run total_requests requests of one scenario from `concurrency` logged-in clients.
+
+    Each client thread logs in as a different bench user and makes `warmup`
+    unrecorded requests first. A request counts as an error on an exception,
+    an HTTP status >= 400, or a redirect back to the login page.
+    """
+    fn = SCENARIOS[name]
+    users = [u for u in users if u['tasks'] and u['schedules']] or users
+    remaining = [total_requests]
+    lock = threading.Lock()
+    latencies = []
+    errors = []
+    ready = threading.Barrier(concurrency + 1)
+
+    def take():
+        with lock:
+            if remaining[0] <= 0:
+                return False
+            remaining[0] -= 1
+            return True
+
+    def worker(i):
+        rnd = random.Random(seed * 1000 + i)
+        user = users[i % len(users)]
+        client = Client(base_url)
+        try:
+            client.login(user['username'])
+            for _ in range(warmup):
+                fn(client, user, rnd)
+        except Exception as e:
+            with lock:
+                errors.append(f'setup: {e}')
+            ready.wait()
+            return
+        ready.wait()
+        local = []
+        local_errors = []
+        while take():
+            start = time.perf_counter()
+            try:
+                resp = fn(client, user, rnd)
+                failed = resp.status_code >= 400 or '/login' in resp.headers.get('Location', '')
+                if failed:
+                    local_errors.append(f'HTTP {resp.status_code}')
+            except Exception as e:
+                failed = True
+                local_errors.append(type(e).__name__)
+            if not failed:
+                local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+            errors.extend(local_errors)
+
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(concurrency)]
+    for t in threads:
+        t.start()
+    ready.wait()
+    started = time.perf_counter()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+    result = summarize(latencies, len([e for e in errors if not e.startswith('setup:')]), elapsed)
+    if errors:
+        counts = {}
+        for e in errors:
+            counts[e] = counts.get(e, 0) + 1
+        result['error_kinds'] = counts
+    return result
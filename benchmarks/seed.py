@@ -0,0 +1,215 @@
+"""Seed synthetic benchmark data with COPY.
+
+All seeded users and plants are named with the bench_ prefix. reset() removes
+them, and the cascading foreign keys take their gardens, schedules, chats
+and notifications along. Point DB_NAME at a dedicated database anyway.
+
+    python -m benchmarks.seed --scale medium
+    python -m benchmarks.seed --reset
+"""
+import argparse
+import random
+import time
+from datetime import date, datetime, timedelta
+
+from werkzeug.security import generate_password_hash
+
+from database.connection import get_db_connection
+
+PREFIX = 'bench_'
+LIKE_PREFIX = PREFIX.replace('_', '\\_') + '%'
+PASSWORD = 'bench-password'
+
+SCALES = {
+    'small': {'users': 20, 'plants': 50, 'gardens_per_user': 3, 'schedule_days': 30, 'tasks_per_day': 3,
+              'chats_per_schedule': 10, 'general_chats_per_user': 20, 'notifications_per_user': 30},
+    'medium': {'users': 200, 'plants': 300, 'gardens_per_user': 8, 'schedule_days': 60, 'tasks_per_day': 3,
+               'chats_per_schedule': 20, 'general_chats_per_user': 100, 'notifications_per_user': 200},
+    'large': {'users': 2000, 'plants': 1000, 'gardens_per_user': 12, 'schedule_days': 90, 'tasks_per_day': 4,
+              'chats_per_schedule': 30, 'general_chats_per_user': 300, 'notifications_per_user': 1000},
+}
+
+PLANT_TYPES = ('vegetable', 'herb', 'flower', 'fruit', 'succulent', 'houseplant')
+TASKS = ('water 200ml', 'check soil moisture', 'rotate pot', 'inspect leaves for pests', 'fertilize once',
+         'prune dead leaves', 'mist leaves', 'loosen topsoil')
+
+
+def _copy(cur, table, columns, rows):
+    with cur.copy(f"COPY {table} ({', '.join(columns)}) FROM STDIN") as copy:
+        for row in rows:
+            copy.write_row(row)
+
+
+def reset(conn=None):
+    """Delete every bench_ user and plant (and, through the foreign keys, everything they own)"""
+    from backend.user_purge import remove_upload_dirs
+    own = conn is None
+    conn = conn or get_db_connection()
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT s.id FROM schedules s JOIN users u ON u.id = s.user_id WHERE u.username LIKE %s", (LIKE_PREFIX,))
+        schedule_ids = [r['id'] for r in cur.fetchall()]
+        cur.execute("DELETE FROM users WHERE username LIKE %s", (LIKE_PREFIX,))
+        users = cur.rowcount
+        cur.execute("DELETE FROM plants WHERE name LIKE %s", (LIKE_PREFIX,))
+        plants = cur.rowcount
+        conn.commit()
+        remove_upload_dirs(schedule_ids)
+        return users, plants
+    finally:
+        if own:
+            conn.close()
+
+
+def seed(users=20, plants=50, gardens_per_user=3, schedule_days=30, tasks_per_day=3, chats_per_schedule=10,
+         general_chats_per_user=20, notifications_per_user=30, random_seed=42):
+    """Replace the bench_ dataset with one of the given size; returns row counts per table"""
+    rnd = random.Random(random_seed)
+    gardens_per_user = min(gardens_per_user, plants)
+    started = time.monotonic()
+    conn = get_db_connection()
+    counts = {}
+    try:
+        reset(conn)
+        cur = conn.cursor()
+        # One hash for every user: hashing is deliberately slow and not what we measure
+        password_hash = generate_password_hash(PASSWORD)
+        _copy(cur, 'users', ('username', 'email', 'password_hash', 'role'),
+              ((f'{PREFIX}{i}', f'{PREFIX}{i}@example.test', password_hash, 'user') for i in range(users)))
+        _copy(cur, 'plants', ('name', 'scientific_name', 'duration_days', 'type', 'photo_url', 'description'),
+              ((f'{PREFIX}plant_{i}', f'Benchmarkia {PREFIX}{i}', schedule_days, PLANT_TYPES[i % len(PLANT_TYPES)],
+                f'https://example.test/plants/{i}.jpg', f'Synthetic plant {i} for benchmarks.') for i in range(plants)))
+        cur.execute("SELECT id FROM users WHERE username LIKE %s ORDER BY id", (LIKE_PREFIX,))
+        user_ids = [r['id'] for r in cur.fetchall()]
+        cur.execute("SELECT id FROM plants WHERE name LIKE %s ORDER BY id", (LIKE_PREFIX,))
+        plant_ids = [r['id'] for r in cur.fetchall()]
+
+        today = date.today()
+        garden_rows = []
+        for u, user_id in enumerate(user_ids):
+            for g in range(gardens_per_user):
+                interval = rnd.choice((2, 3, 4, 7))
+                last_watered = datetime.combine(today - timedelta(days=rnd.randint(0, 6)), datetime.min.time())
+                garden_rows.append((user_id, plant_ids[(u + g) % len(plant_ids)], f'bench plant {g}', 1, interval,
+                                    today - timedelta(days=rnd.randint(0, schedule_days)), last_watered,
+                                    last_watered.date() + timedelta(days=interval)))
+        _copy(cur, 'user_gardens', ('user_id', 'plant_id', 'nickname', 'quantity', 'watering_interval_days',
+                                    'planted_on', 'last_watered', 'next_watering_due'), garden_rows)
+        cur.execute('SELECT id, user_id FROM user_gardens WHERE user_id = ANY(%s) ORDER BY id', (user_ids,))
+        gardens = cur.fetchall()
+
+        # Schedules started between 0 and schedule_days days ago, so "today" varies per item
+        _copy(cur, 'schedules', ('garden_id', 'user_id', 'source', 'stage', 'duration_days', 'created_at'),
+              ((g['id'], g['user_id'], 'rules', 'seed', schedule_days,
+                datetime.combine(today - timedelta(days=rnd.randint(0, schedule_days)), datetime.min.time()))
+               for g in gardens))
+        cur.execute('SELECT id, garden_id, user_id, created_at FROM schedules WHERE user_id = ANY(%s) ORDER BY id', (user_ids,))
+        schedules = cur.fetchall()
+        cur.execute('''
+            UPDATE user_gardens ug SET current_schedule_id = s.id
+            FROM schedules s WHERE s.garden_id = ug.id AND s.user_id = ANY(%s)
+        ''', (user_ids,))
+
+        _copy(cur, 'schedule_days', ('schedule_id', 'day', 'task_count'),
+              ((s['id'], d, tasks_per_day) for s in schedules for d in range(1, schedule_days + 1)))
+        task_rows = []
+        for s in schedules:
+            elapsed = (today - s['created_at'].date()).days
+            for d in range(1, schedule_days + 1):
+                for t in range(tasks_per_day):
+                    # Most past tasks are done, a few are overdue
+                    done = d <= elapsed and rnd.random() < 0.85
+                    task_rows.append((s['id'], d, t, TASKS[(d + t) % len(TASKS)], done))
+        _copy(cur, 'schedule_tasks', ('schedule_id', 'day', 'task_index', 'task_text', 'completed'), task_rows)
+        cur.execute('''
+            UPDATE schedule_days d SET tasks_before = (d.day - 1) * d.task_count
+            WHERE d.schedule_id IN (SELECT id FROM schedules WHERE user_id = ANY(%s))
+        ''', (user_ids,))
+
+        _copy(cur, 'schedule_chats', ('schedule_id', 'user_id', 'role', 'message'),
+              ((s['id'], s['user_id'], 'user' if i % 2 == 0 else 'assistant', f'bench chat message {i}')
+               for s in schedules for i in range(chats_per_schedule)))
+        _copy(cur, 'general_chats', ('user_id', 'role', 'message'),
+              ((user_id, 'user' if i % 2 == 0 else 'assistant', f'bench assistant message {i}')
+               for user_id in user_ids for i in range(general_chats_per_user)))
+        _copy(cur, 'notifications', ('user_id', 'message', 'is_read'),
+              ((user_id, f'Bench notification {i}', i >= 5)
+               for user_id in user_ids for i in range(notifications_per_user)))
+        conn.commit()
+        cur.execute('ANALYZE')
+        conn.commit()
+        counts = {
+            'users': len(user_ids), 'plants': len(plant_ids), 'user_gardens': len(gardens),
+            'schedules': len(schedules), 'schedule_tasks': len(task_rows),
+            'schedule_chats': len(schedules) * chats_per_schedule,
+            'general_chats': len(user_ids) * general_chats_per_user,
+            'notifications': len(user_ids) * notifications_per_user,
+            'seconds': round(time.monotonic() - started, 2)
+        }
+        return counts
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def bench_users(limit=None):
+    """Return [{'id', 'username', 'gardens': [...], 'schedules': [...], 'tasks': [(schedule_id, day, task_index)]}]"""
+    conn = get_db_connection()
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT id, username FROM users WHERE username LIKE %s ORDER BY id LIMIT %s", (LIKE_PREFIX, limit))
+        users = {r['id']: {'id': r['id'], 'username': r['username'], 'gardens': [], 'schedules': [], 'tasks': []}
+                 for r in cur.fetchall()}
+        ids = list(users)
+        cur.execute('SELECT id, user_id, current_schedule_id FROM user_gardens WHERE user_id = ANY(%s) ORDER BY id', (ids,))
+        for r in cur.fetchall():
+            users[r['user_id']]['gardens'].append(r['id'])
+            if r['current_schedule_id']:
+                users[r['user_id']]['schedules'].append(r['current_schedule_id'])
+        cur.execute('''
+            SELECT s.user_id, t.schedule_id, t.day, t.task_index
+            FROM schedules s JOIN schedule_tasks t ON t.schedule_id = s.id
+            WHERE s.user_id = ANY(%s) AND t.day <= 7
+        ''', (ids,))
+        for r in cur.fetchall():
+            users[r['user_id']]['tasks'].append((r['schedule_id'], r['day'], r['task_index']))
+        return list(users.values())
+    finally:
+        conn.close()
+
+
+def add_scale_arguments(parser):
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small')
+    for key in SCALES['small']:
+        parser.add_argument('--' + key.replace('_', '-'), type=int, default=None)
+    parser.add_argument('--random-seed', type=int, default=42)
+
+
+def scale_from_args(args):
+    params = dict(SCALES[args.scale])
+    for key in params:
+        value = getattr(args, key)
+        if value is not None:
+            params[key] = value
+    return params
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.seed')
+    add_scale_arguments(parser)
+    parser.add_argument('--reset', action='store_true', help='Only delete the bench_ dataset')
+    args = parser.parse_args(argv)
+    if args.reset:
+        users, plants = reset()
+        print(f"✅ Removed {users} bench user(s) and {plants} bench plant(s)")
+        return
+    from backend.app import init_database
+    init_database()
+    counts = seed(random_seed=args.random_seed, **scale_from_args(args))
+    print(f"✅ Seeded {counts}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,23 @@
+"""Run the app for a benchmark: no debugger, no reloader, threaded.
+
+The runner starts this in a separate process so the server does not share a
+GIL with the load generator. Set GEMINI_BASE_URL and GEMINI_API_KEY in the
+environment before starting it.
+"""
+import argparse
+
+from backend.app import create_app, init_database
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.serve')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5055)
+    args = parser.parse_args(argv)
+    init_database()
+    app = create_app()
+    app.run(host=args.host, port=args.port, debug=False, use_reloader=False, threaded=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -14,6 +14,59 @@ class Config:
     DB_USER = os.getenv('DB_USER', 'postgres')
     DB_PASSWORD = os.getenv('DB_PASSWORD', '123')
     DB_PORT = os.getenv('DB_PORT', '5432')
+
+    # Global AI assistant memory: fold older messages into a rolling summary
+    CHAT_SUMMARY_EVERY = int(os.getenv('CHAT_SUMMARY_EVERY', '8'))
+    CHAT_RECENT_TURNS = int(os.getenv('CHAT_RECENT_TURNS', '6'))
+    CHAT_SUMMARY_MAX_CHARS = int(os.getenv('CHAT_SUMMARY_MAX_CHARS', '1500'))
+    # Most messages folded into the summary by one refresh (older backlogs catch up over several)
+    CHAT_SUMMARY_FOLD_MAX = int(os.getenv('CHAT_SUMMARY_FOLD_MAX', '40'))
+
+    # Gemini endpoint; the benchmarks point this at a local stub (benchmarks/fake_gemini.py)
+    GEMINI_BASE_URL = os.getenv('GEMINI_BASE_URL', 'https://generativelanguage.googleapis.com/v1beta/models')
+
+    # Response cache for generic assistant questions (set AI_CACHE_MAX_ENTRIES=0 to disable)
+    AI_CACHE_TTL_SECONDS = int(os.getenv('AI_CACHE_TTL_SECONDS', '86400'))
+    AI_CACHE_MAX_ENTRIES = int(os.getenv('AI_CACHE_MAX_ENTRIES', '2000'))
+    AI_CACHE_MAX_QUESTION_CHARS = int(os.getenv('AI_CACHE_MAX_QUESTION_CHARS', '300'))
+
+    # Stop calling Gemini for a cooldown period after repeated upstream failures
+    AI_CIRCUIT_FAILURES = int(os.getenv('AI_CIRCUIT_FAILURES', '3'))
+    AI_CIRCUIT_RESET_SECONDS = int(os.getenv('AI_CIRCUIT_RESET_SECONDS', '60'))
+
+    # AI call ledger: rows are written in batches off the request path.
+    # Prices (USD per million tokens) are only used for the admin cost estimate.
+    AI_LEDGER_BATCH_SIZE = int(os.getenv('AI_LEDGER_BATCH_SIZE', '200'))
+    AI_LEDGER_FLUSH_SECONDS = float(os.getenv('AI_LEDGER_FLUSH_SECONDS', '2'))
+    AI_PRICE_INPUT_PER_MTOK = float(os.getenv('AI_PRICE_INPUT_PER_MTOK', '0.10'))
+    AI_PRICE_OUTPUT_PER_MTOK = float(os.getenv('AI_PRICE_OUTPUT_PER_MTOK', '0.40'))
+
+    # Schedule generation: extra rounds that request only the days still missing
+    SCHEDULE_FILL_ROUNDS = int(os.getenv('SCHEDULE_FILL_ROUNDS', '2'))
+    SCHEDULE_STREAM_TIMEOUT = int(os.getenv('SCHEDULE_STREAM_TIMEOUT', '120'))
+    # Long schedules are generated in day windows on a bounded thread pool
+    SCHEDULE_WINDOW_DAYS = int(os.getenv('SCHEDULE_WINDOW_DAYS', '30'))
+    SCHEDULE_WINDOW_WORKERS = int(os.getenv('SCHEDULE_WINDOW_WORKERS', '4'))
+    # Whole-garden batch generation: total concurrent items and per-user cap
+    SCHEDULE_BATCH_WORKERS = int(os.getenv('SCHEDULE_BATCH_WORKERS', '4'))
+    SCHEDULE_BATCH_PER_USER = int(os.getenv('SCHEDULE_BATCH_PER_USER', '2'))
+
+    # Retention for read notifications (python -m backend.jobs notifications)
+    NOTIFICATION_RETENTION_DAYS = int(os.getenv('NOTIFICATION_RETENTION_DAYS', '90'))
+    NOTIFICATION_ARCHIVE = os.getenv('NOTIFICATION_ARCHIVE', 'false').lower() in ('1', 'true', 'yes')
+
+    # Instrumentation: log statements slower than SLOW_QUERY_MS and requests running
+    # more than REQUEST_QUERY_WARN statements; /metrics needs "Bearer METRICS_TOKEN" if set
+    SLOW_QUERY_MS = int(os.getenv('SLOW_QUERY_MS', '200'))
+    REQUEST_QUERY_WARN = int(os.getenv('REQUEST_QUERY_WARN', '25'))
+    METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+    # Deleted users are purged in the background, this many rows per transaction
+    USER_PURGE_BATCH_SIZE = int(os.getenv('USER_PURGE_BATCH_SIZE', '1000'))
+
+    # Rendered dashboard catalog/marketplace HTML, keyed by catalog version (0 disables)
+    FRAGMENT_CACHE_MAX_ENTRIES = int(os.getenv('FRAGMENT_CACHE_MAX_ENTRIES', '50'))
+    FRAGMENT_CACHE_TTL_SECONDS = int(os.getenv('FRAGMENT_CACHE_TTL_SECONDS', '86400'))
     
     @property
     def DATABASE_URL(self):
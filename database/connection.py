@@ -1,9 +1,96 @@
+import contextvars
+import time
+
 import psycopg
 from psycopg.rows import dict_row
 from config import Config
 
 config = Config()
 
+
+class QueryStats:
+    """Queries run while handling one request (see backend/metrics.py)"""
+
+    def __init__(self, route):
+        self.route = route
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = {}
+
+    def record(self, query, seconds):
+        self.count += 1
+        self.seconds += seconds
+        self.statements[query] = self.statements.get(query, 0) + 1
+
+    def most_repeated(self):
+        if not self.statements:
+            return None, 0
+        return max(self.statements.items(), key=lambda kv: kv[1])
+
+
+# Stats for the current request, or None outside a request
+query_stats = contextvars.ContextVar('query_stats', default=None)
+# Callables (query, seconds, stats) run after every statement
+query_observers = []
+# A list to collect (query, params) of every statement into, or None (see benchmarks/plans.py)
+query_capture = contextvars.ContextVar('query_capture', default=None)
+
+
+def _query_text(query):
+    return query if isinstance(query, str) else str(query)
+
+
+def _observe(query, seconds, params=None):
+    captured = query_capture.get()
+    if captured is not None:
+        captured.append((query, params))
+    text = _query_text(query)
+    stats = query_stats.get()
+    if stats is not None:
+        stats.record(text, seconds)
+    if seconds * 1000 >= config.SLOW_QUERY_MS:
+        route = stats.route if stats is not None else '-'
+        print(f"🐢 Slow query ({seconds * 1000:.0f} ms) on {route}: {' '.join(text.split())[:500]}")
+    for observer in query_observers:
+        try:
+            observer(text, seconds, stats)
+        except Exception as e:
+            print(f"Query observer failed: {e}")
+
+
+class InstrumentedCursor(psycopg.Cursor):
+    """Cursor that times every statement and reports it to _observe"""
+
+    def execute(self, query, params=None, **kwargs):
+        start = time.perf_counter()
+        try:
+            return super().execute(query, params, **kwargs)
+        finally:
+            _observe(query, time.perf_counter() - start, params)
+
+    def executemany(self, query, params_seq, **kwargs):
+        if query_capture.get() is not None:
+            params_seq = list(params_seq)
+        start = time.perf_counter()
+        try:
+            return super().executemany(query, params_seq, **kwargs)
+        finally:
+            # Only the first parameter set is kept when capturing
+            first = params_seq[0] if isinstance(params_seq, list) and params_seq else None
+            _observe(query, time.perf_counter() - start, first)
+
+
+class InstrumentedServerCursor(psycopg.ServerCursor):
+    """Named cursor variant; only the DECLARE is timed, not the fetches"""
+
+    def execute(self, query, params=None, **kwargs):
+        start = time.perf_counter()
+        try:
+            return super().execute(query, params, **kwargs)
+        finally:
+            _observe(query, time.perf_counter() - start, params)
+
+
 def get_db_connection():
     """Get database connection using psycopg v3"""
     try:
@@ -15,6 +102,8 @@ def get_db_connection():
             port=config.DB_PORT,
             row_factory=dict_row  # psycopg v3 way for dict rows
         )
+        conn.cursor_factory = InstrumentedCursor
+        conn.server_cursor_factory = InstrumentedServerCursor
         return conn
     except psycopg.Error as e:
         print(f"Database connection error: {e}")
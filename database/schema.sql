@@ -10,6 +10,13 @@ CREATE TABLE IF NOT EXISTS users (
 );
 -- Ensure role column exists for older installations
 ALTER TABLE users ADD COLUMN IF NOT EXISTS role VARCHAR(20) DEFAULT 'user' NOT NULL;
+-- Set when an admin deletes the user; backend/user_purge.py removes the rows later
+ALTER TABLE users ADD COLUMN IF NOT EXISTS deleted_at TIMESTAMP NULL;
+CREATE INDEX IF NOT EXISTS idx_users_deleted_at ON users (deleted_at) WHERE deleted_at IS NOT NULL;
+-- Admin user search: case-insensitive prefix match on username/email, role filter, keyset by id
+CREATE INDEX IF NOT EXISTS idx_users_username_lower ON users (lower(username) text_pattern_ops);
+CREATE INDEX IF NOT EXISTS idx_users_email_lower ON users (lower(email) text_pattern_ops);
+CREATE INDEX IF NOT EXISTS idx_users_role_id ON users (role, id);
 
 -- Plants table
 CREATE TABLE IF NOT EXISTS plants (
@@ -29,9 +36,20 @@ CREATE TABLE IF NOT EXISTS schedules (
     id SERIAL PRIMARY KEY,
     garden_id INTEGER NOT NULL,
     user_id INTEGER NOT NULL,
-    schedule_json TEXT NOT NULL,
+    schedule_json TEXT NULL,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
+-- How the schedule was built ('ai', 'rules', 'ai+rules') and the stage it started from
+ALTER TABLE schedules ADD COLUMN IF NOT EXISTS source VARCHAR(20) DEFAULT 'ai';
+ALTER TABLE schedules ADD COLUMN IF NOT EXISTS stage VARCHAR(20);
+-- Days/tasks live in schedule_days/schedule_tasks; schedule_json is legacy and
+-- emptied by the migration in init_database. Raw AI output is kept for auditing.
+ALTER TABLE schedules ALTER COLUMN schedule_json DROP NOT NULL;
+ALTER TABLE schedules ADD COLUMN IF NOT EXISTS raw_ai_text TEXT;
+ALTER TABLE schedules ADD COLUMN IF NOT EXISTS duration_days INTEGER;
+-- Schedule history per garden item, newest first
+CREATE INDEX IF NOT EXISTS idx_schedules_garden_id ON schedules (garden_id, id DESC);
+-- user_gardens.current_schedule_id (latest schedule per item) is added and backfilled in init_database
 
 -- Tasks for schedules (persistent checklist)
 CREATE TABLE IF NOT EXISTS schedule_tasks (
@@ -46,6 +64,18 @@ CREATE TABLE IF NOT EXISTS schedule_tasks (
     UNIQUE (schedule_id, day, task_index)
 );
 
+-- One row per schedule day (days may have no tasks)
+CREATE TABLE IF NOT EXISTS schedule_days (
+    schedule_id INTEGER NOT NULL REFERENCES schedules(id) ON DELETE CASCADE,
+    day INTEGER NOT NULL,
+    task_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (schedule_id, day)
+);
+
+-- Progress counters on schedules/schedule_days, the triggers on schedule_tasks
+-- that maintain them and their one-time backfill are added in init_database
+-- (backend/app.py, SCHEDULE_PROGRESS_*)
+
 -- User notifications (persistent)
 CREATE TABLE IF NOT EXISTS notifications (
     id SERIAL PRIMARY KEY,
@@ -61,3 +91,105 @@ CREATE TABLE IF NOT EXISTS notifications (
 ALTER TABLE notifications ADD COLUMN IF NOT EXISTS schedule_id INTEGER NULL;
 ALTER TABLE notifications ADD COLUMN IF NOT EXISTS day INTEGER NULL;
 ALTER TABLE notifications ADD COLUMN IF NOT EXISTS url TEXT NULL;
+UPDATE notifications SET is_read = FALSE WHERE is_read IS NULL;
+ALTER TABLE notifications ALTER COLUMN is_read SET NOT NULL;
+-- Unread list and counts per user without sorting the user's whole history
+CREATE INDEX IF NOT EXISTS idx_notifications_user_read_created ON notifications (user_id, is_read, created_at DESC);
+
+-- Read notifications moved out by the retention job (python -m backend.jobs notifications --archive)
+CREATE TABLE IF NOT EXISTS notifications_archive (
+    id INTEGER PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    message TEXT NOT NULL,
+    schedule_id INTEGER NULL,
+    day INTEGER NULL,
+    url TEXT NULL,
+    is_read BOOLEAN NOT NULL DEFAULT TRUE,
+    created_at TIMESTAMP,
+    archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Per-user unread counter, kept in sync by statement-level triggers on notifications.
+-- Filled from existing rows only when the table is first created; after that the
+-- triggers own it, and a rebuild would race with other processes' updates.
+DO $$
+BEGIN
+    IF to_regclass('notification_counters') IS NULL THEN
+        CREATE TABLE notification_counters (
+            user_id INTEGER PRIMARY KEY,
+            unread_count INTEGER NOT NULL DEFAULT 0
+        );
+        INSERT INTO notification_counters (user_id, unread_count)
+        SELECT user_id, COUNT(*) FROM notifications WHERE is_read = FALSE GROUP BY user_id;
+    END IF;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION notification_counters_apply() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO notification_counters AS c (user_id, unread_count)
+        SELECT user_id, COUNT(*) FROM new_rows WHERE is_read = FALSE GROUP BY user_id
+        ON CONFLICT (user_id) DO UPDATE SET unread_count = c.unread_count + EXCLUDED.unread_count;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE notification_counters c
+        SET unread_count = GREATEST(0, c.unread_count - o.n)
+        FROM (SELECT user_id, COUNT(*) AS n FROM old_rows WHERE is_read = FALSE GROUP BY user_id) o
+        WHERE c.user_id = o.user_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS notifications_counter_insert ON notifications;
+CREATE TRIGGER notifications_counter_insert AFTER INSERT ON notifications
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notification_counters_apply();
+DROP TRIGGER IF EXISTS notifications_counter_update ON notifications;
+CREATE TRIGGER notifications_counter_update AFTER UPDATE ON notifications
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notification_counters_apply();
+DROP TRIGGER IF EXISTS notifications_counter_delete ON notifications;
+CREATE TRIGGER notifications_counter_delete AFTER DELETE ON notifications
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notification_counters_apply();
+
+-- Push each new notification to listening app processes (see backend/notify.py)
+CREATE OR REPLACE FUNCTION notifications_notify() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('notifications', json_build_object(
+        'id', NEW.id, 'user_id', NEW.user_id, 'message', left(NEW.message, 2000), 'url', NEW.url
+    )::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS notifications_push ON notifications;
+CREATE TRIGGER notifications_push AFTER INSERT ON notifications
+    FOR EACH ROW EXECUTE FUNCTION notifications_notify();
+
+-- One row per Gemini call (or cache hit), written in batches by backend/ai_ledger.py
+CREATE TABLE IF NOT EXISTS ai_calls (
+    id BIGSERIAL PRIMARY KEY,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    feature VARCHAR(40) NOT NULL,
+    endpoint TEXT NULL,
+    user_id INTEGER NULL,
+    model VARCHAR(100) NULL,
+    prompt_tokens INTEGER NULL,
+    response_tokens INTEGER NULL,
+    latency_ms INTEGER NOT NULL DEFAULT 0,
+    retries INTEGER NOT NULL DEFAULT 0,
+    cache_hit BOOLEAN NULL,
+    error_class VARCHAR(100) NULL
+);
+CREATE INDEX IF NOT EXISTS idx_ai_calls_created_feature ON ai_calls (created_at, feature);
+
+-- Rolling summary of each user's general AI assistant conversation
+CREATE TABLE IF NOT EXISTS general_chat_summaries (
+    user_id INTEGER PRIMARY KEY,
+    summary TEXT NOT NULL DEFAULT '',
+    last_message_id INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
@@ -1,8 +1,8 @@
-from database.connection import get_db_cursor, close_db
+# Print all users as CSV (id, username, email, role, created_at); password hashes are never included.
+# Rows are streamed through a server-side cursor, so this works on large tables.
+import sys
 
-conn, cur = get_db_cursor()
-cur.execute("SELECT * FROM users;")
-rows = cur.fetchall()
-for row in rows:
-    print(row)
-close_db(conn, cur)
+from backend.user_io import export_users
+
+for part in export_users('csv'):
+    sys.stdout.write(part)